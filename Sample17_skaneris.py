@@ -1,3 +1,4 @@
+import argparse
 import re
 import sys
 from collections import Counter
@@ -5,8 +6,8 @@ from collections import Counter
 tokens = [
     ("COMMENT",   r";[^\n]*"),
     ("NUMBER",    r"\b\d+\b"),
-    ("HEX_NUMBER", r"\b[0-9A-F]+[Hh]\b"),
-    ("KEYWORD",   r"\b(struc|ends|equ|dw|dd|db|dup|IFNDEF|ENDIF)\b"),
+    ("HEX_NUMBER", r"\b[0-9][0-9A-Fa-f]*[Hh]\b"),
+    ("KEYWORD",   r"\b(?i:struc|ends|equ|dw|dd|db|dup|IFNDEF|ENDIF)\b"),
     ("IDENTIFICATOR",     r"[A-Za-z_][A-Za-z0-9_]*"),
     ("OPERATOR",  r"=|\?|\+|\-"),
     ("SKLIAUSTAI",     r"[()\[\],]"), 
@@ -18,30 +19,76 @@ tokens = [
 tokens_regex = "|".join(f"(?P<{name}>{pattern})" for name, pattern in tokens)
 lexer = re.compile(tokens_regex).match
 
-def scanner(code):
+# Sąlyginio kompiliavimo paieška neaktyviame bloke: komentarai praryjami,
+# kad juose esantys IFNDEF/ENDIF nebūtų skaičiuojami
+conditional_search = re.compile(r";[^\n]*|\b(?i:(IFNDEF)|(ENDIF))\b").finditer
+guard_match = re.compile(r"[ \t]*([A-Za-z_][A-Za-z0-9_]*)").match
+
+
+# Grąžina poziciją po IFNDEF atitinkančio ENDIF arba None, jei jo nėra
+def skip_inactive(code, position):
+    depth = 1
+    for match in conditional_search(code, position):
+        if match.group(1):
+            depth += 1
+        elif match.group(2):
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+# defined - apibrėžtų simbolių aibė. Jei ji nurodyta, IFNDEF/ENDIF įvertinami
+# skenuojant: neaktyvūs blokai praleidžiami netokenizuojant, o aktyvių blokų
+# IFNDEF/ENDIF tokenai išmetami, todėl parseris gauna tik aktyvią konfigūraciją.
+# Į skipped (jei nurodytas) įrašomos praleistų blokų (IFNDEF eilutė, ENDIF eilutė).
+# Vienodi identifikatoriai grąžinami kaip vienas eilutės objektas (tik šio skenavimo
+# ribose, todėl ilgai veikiantis procesas vardų nekaupia).
+def scanner(code, defined=None, skipped=None):
     tokens = []
     line_num = 1
     position = 0
+    active_depth = 0
+    identifiers = {} # tekstas -> kanoninis objektas
     next = lexer(code)
     while next:
         kind = next.lastgroup
         value = next.group()
+        position = next.end()
         if kind == "NEWLINE":
             line_num += 1
         elif kind == "SKIP":
             pass
+        elif defined is not None and kind == "KEYWORD" and value.upper() == "ENDIF" and active_depth:
+            active_depth -= 1
+        elif defined is not None and kind == "KEYWORD" and value.upper() == "IFNDEF" \
+                and (guard := guard_match(code, position)):
+            if guard.group(1) not in defined:
+                active_depth += 1
+                position = guard.end()
+            elif (end := skip_inactive(code, guard.end())) is not None:
+                first_line = line_num
+                line_num += code.count("\n", position, end)
+                position = end
+                if skipped is not None:
+                    skipped.append((first_line, line_num))
+            else:
+                tokens.append((kind, value, line_num)) # nėra ENDIF - klaidą praneš parseris
+        elif kind == "IDENTIFICATOR":
+            tokens.append((kind, identifiers.setdefault(value, value), line_num))
         else:
             tokens.append((kind, value, line_num))
-        position = next.end()
         next = lexer(code, position)
     return tokens
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Naudojimas: python scanner.py failas.trm")
-        sys.exit(1)
+    arg_parser = argparse.ArgumentParser(description="Sample17 skeneris.")
+    arg_parser.add_argument("file", help="failas.trm")
+    arg_parser.add_argument("-D", dest="defined", action="append", metavar="SIMBOLIS",
+                            help="apibrėžtas simbolis: IFNDEF SIMBOLIS blokai praleidžiami")
+    args = arg_parser.parse_args()
     
-    file_name = sys.argv[1]
+    file_name = args.file
     
     try:
         with open(file_name, "r", encoding="utf-8") as f:
@@ -50,9 +97,19 @@ if __name__ == "__main__":
         print(f"Klaida: failas '{file_name}' nerastas.")
         sys.exit(1)
     
-    tokens = scanner(code)
+    defined = set(args.defined) if args.defined else None
+    try:
+        from line_classifier import scan
+    except ImportError: # be NumPy skenuojamas visas tekstas
+        tokens, lines = scanner(code, defined), None
+    else:
+        tokens, lines = scan(code, defined)
     counts = Counter(kind for kind, _, _ in tokens)
+    if lines and lines["comment_tokens"]:
+        counts["COMMENT"] += lines["comment_tokens"] # komentarų eilutės netokenizuotos
     
     print("Skanerio rezultatai:")
     for token_type, count in counts.items():
         print(f"{token_type:15s}: {count}")
+    if lines:
+        print(f"Eilutės: kodo {lines['code']}, komentarų {lines['comment']}, tuščios {lines['blank']}")
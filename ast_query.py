@@ -0,0 +1,307 @@
+# Užklausos parser_Sample17 medžiams su trumpa selektorių kalba.
+# Užklausa vykdoma per NodeIndex (rūšis -> mazgai, mazgas -> tėvas): imami paskutinio
+# žingsnio rūšies mazgai ir tikrinami jų protėviai, todėl laikas priklauso nuo
+# tos rūšies mazgų skaičiaus, o ne nuo viso medžio dydžio.
+#
+# <selector>  ::= [ "/" | "//" ] <step> { ( "/" | "//" ) <step> }
+# <step>      ::= ( <kind> | "*" ) { "[" <predicate> "]" }
+# <predicate> ::= ( "@value" | "@line" | <kind> ) [ <op> <operand> ]
+# <op>        ::= "=" | "!=" | "~" | "<" | ">" | "<=" | ">="
+#
+# "/" - tiesioginis vaikas, "//" - bet kuris palikuonis. Predikatas <kind> reiškia
+# "turi tokios rūšies vaiką" (su <op> - ir to vaiko reikšmė atitinka). "~" - reguliarioji
+# išraiška (re.search). Operandai su tarpais ar skyrikliais rašomi kabutėse.
+# Pavyzdžiai:
+#   //STRUCT_MEMBER[DATA_TYPE=dd]
+#   //CONDITIONAL_BLOCK[@value=NOVK]//ASSIGNMENT[@value~"^VK_F"]
+#   /STRUCT_DEF[@line>100]/STRUCT_MEMBER[DUP]
+import argparse
+import re
+import sys
+
+from parser_Sample17 import NodeIndex, Parser
+from Sample17_skaneris import scanner
+
+selector_tokens = [
+    ("AXIS", r"//|/"),
+    ("OPEN", r"\["),
+    ("CLOSE", r"\]"),
+    ("OP", r"!=|<=|>=|=|~|<|>"),
+    ("STRING", r"\"[^\"]*\"|'[^']*'"),
+    ("ATTRIBUTE", r"@[A-Za-z_]+"),
+    ("WORD", r"[^\s/\[\]=!~<>\"'@]+"),
+    ("SKIP", r"\s+"),
+    ("NEATPAŽINTA", r"."),
+]
+selector_lexer = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in selector_tokens)).finditer
+
+ATTRIBUTES = ("@value", "@line")
+DESCEND_COST = 16 # kiek kartų paieška žemyn brangesnė už protėvių tikrinimą
+ORDERING = {
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+class QueryError(Exception):
+    pass
+
+
+class Predicate:
+    def __init__(self, target, op=None, operand=None, ignore_case=True):
+        self.target = target # "@value", "@line" arba vaiko rūšis
+        self.op = op
+        self.operand = operand
+        if op == "~":
+            try:
+                self.pattern = re.compile(operand, re.IGNORECASE if ignore_case else 0)
+            except re.error as e:
+                raise QueryError(f"Bloga reguliarioji išraiška '{operand}': {e}")
+        elif op in ORDERING:
+            try:
+                self.number = int(operand, 0)
+            except ValueError:
+                raise QueryError(f"Operatoriui '{op}' reikia skaičiaus, gauta '{operand}'.")
+        self.folded = operand.casefold() if operand is not None and ignore_case else operand
+        self.ignore_case = ignore_case
+
+    def _compare(self, value):
+        if value is None:
+            return False
+        if self.op in ORDERING:
+            try:
+                number = value if isinstance(value, int) else int(value, 0)
+            except ValueError:
+                return False
+            return ORDERING[self.op](number, self.number)
+        value = str(value)
+        if self.op == "~":
+            return self.pattern.search(value) is not None
+        if self.ignore_case:
+            value = value.casefold()
+        return (value == self.folded) == (self.op == "=")
+
+    def matches(self, node):
+        if self.target == "@value":
+            return node.value is not None if self.op is None else self._compare(node.value)
+        if self.target == "@line":
+            return node.line is not None if self.op is None else self._compare(node.line)
+        for child in node.children:
+            if child.kind == self.target and (self.op is None or self._compare(child.value)):
+                return True
+        return False
+
+
+class Step:
+    def __init__(self, axis, kind, predicates):
+        self.axis = axis # "/" arba "//" (santykis su ankstesniu žingsniu)
+        self.kind = kind
+        self.predicates = predicates
+
+    def matches(self, node):
+        if self.kind != "*" and node.kind != self.kind:
+            return False
+        for predicate in self.predicates:
+            if not predicate.matches(node):
+                return False
+        return True
+
+    # Predikatas "@value=X", pagal kurį kandidatus galima imti iš reikšmių indekso
+    def value_predicate(self):
+        for predicate in self.predicates:
+            if predicate.target == "@value" and predicate.op == "=":
+                return predicate
+        return None
+
+
+# Selektoriaus eilutė -> žingsnių sąrašas
+def parse_selector(selector, ignore_case=True):
+    tokens = [(match.lastgroup, match.group()) for match in selector_lexer(selector)
+              if match.lastgroup != "SKIP"]
+    for kind, value in tokens:
+        if kind == "NEATPAŽINTA":
+            raise QueryError(f"Selektoriuje neatpažintas simbolis '{value}'.")
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else "EOF"
+
+    def expect(kind):
+        nonlocal position
+        if peek() != kind:
+            got = tokens[position][1] if position < len(tokens) else "pabaiga"
+            raise QueryError(f"Selektoriuje lauktas {kind}, gauta '{got}'.")
+        position += 1
+        value = tokens[position - 1][1]
+        return value[1:-1] if kind == "STRING" else value
+
+    def operand():
+        return expect("STRING") if peek() == "STRING" else expect("WORD")
+
+    steps = []
+    axis = "//"
+    if peek() == "AXIS":
+        axis = expect("AXIS")
+    while True:
+        kind = expect("WORD")
+        predicates = []
+        while peek() == "OPEN":
+            expect("OPEN")
+            target = expect("ATTRIBUTE") if peek() == "ATTRIBUTE" else expect("WORD")
+            if target.startswith("@") and target not in ATTRIBUTES:
+                raise QueryError(f"Nežinomas atributas '{target}' (galimi: {', '.join(ATTRIBUTES)}).")
+            op = value = None
+            if peek() == "OP":
+                op = expect("OP")
+                value = operand()
+            expect("CLOSE")
+            predicates.append(Predicate(target, op, value, ignore_case))
+        steps.append(Step(axis, kind, predicates))
+        if peek() == "EOF":
+            return steps
+        axis = expect("AXIS")
+
+
+class Query:
+    def __init__(self, index, ignore_case=True):
+        self.index = index
+        self.ignore_case = ignore_case
+
+    # Grąžina atitinkančius mazgus medžio tvarka. context - mazgas, kurio viduje ieškoma
+    # (numatyta - šaknis); pirmas žingsnis su "/" - tiesioginis context vaikas.
+    # Paprastai pradedama nuo paskutinio žingsnio kandidatų ir tikrinami jų protėviai.
+    # Jei ankstesnis žingsnis daug selektyvesnis (pvz., "@value=X"), pradedama nuo jo,
+    # o vėlesni žingsniai ieškomi žemyn (tai brangiau, todėl DESCEND_COST kartų).
+    def select(self, selector, context=None):
+        steps = parse_selector(selector, self.ignore_case) if isinstance(selector, str) else selector
+        self.index.complete()
+        anchor = context if context is not None else self.index.root
+        candidates = [self._candidates(step) for step in steps]
+        pivot = len(steps) - 1
+        if pivot > 0:
+            best = min(range(pivot), key=lambda position: len(candidates[position]))
+            if len(candidates[best]) * DESCEND_COST < len(candidates[pivot]):
+                pivot = best
+
+        step = steps[pivot]
+        results = [node for node in candidates[pivot] if step.matches(node)]
+        if pivot > 0 or step.axis != "//" or anchor is not self.index.root:
+            memo = {}
+            results = [node for node in results if self._path_matches(node, steps, pivot, anchor, memo)]
+
+        for step in steps[pivot + 1:]:
+            found = {}
+            for node in results:
+                for child in (node.children if step.axis == "/" else self._descendants(node)):
+                    if step.matches(child):
+                        found[id(child)] = child
+            results = sorted(found.values(), key=lambda node: self.index.order[id(node)])
+        return results
+
+    @staticmethod
+    def _descendants(node):
+        stack = list(reversed(node.children))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    # Žingsnio kandidatai: visi mazgai, rūšies mazgai arba (jei yra "@value=X") -
+    # rūšies mazgai su ta reikšme
+    def _candidates(self, step):
+        if step.kind == "*":
+            return self.index.nodes
+        predicate = step.value_predicate()
+        if predicate is not None:
+            return self.index.kind_with_value(step.kind, predicate.operand.casefold())
+        return self.index.kind(step.kind)
+
+    def first(self, selector, context=None):
+        results = self.select(selector, context)
+        return results[0] if results else None
+
+    # Ar mazgas (jau atitinkantis steps[position]) yra reikiamoje vietoje medyje
+    def _path_matches(self, node, steps, position, anchor, memo):
+        step = steps[position]
+        parent = self.index.parent(node)
+        if position == 0:
+            return self._anchored(parent, step.axis, anchor)
+        if step.axis == "/":
+            return parent is not None and self._matches(parent, steps, position - 1, anchor, memo)
+        while parent is not None:
+            if self._matches(parent, steps, position - 1, anchor, memo):
+                return True
+            parent = self.index.parent(parent)
+        return False
+
+    def _matches(self, node, steps, position, anchor, memo):
+        key = (id(node), position)
+        result = memo.get(key)
+        if result is None:
+            result = memo[key] = steps[position].matches(node) and \
+                self._path_matches(node, steps, position, anchor, memo)
+        return result
+
+    def _anchored(self, parent, axis, anchor):
+        if axis == "/":
+            return parent is anchor
+        if anchor is self.index.root:
+            return True # "//" nuo šaknies - bet kuris mazgas
+        while parent is not None:
+            if parent is anchor:
+                return True
+            parent = self.index.parent(parent)
+        return False
+
+
+# Patogumo funkcija: užklausa medžiui, kuriam indeksas dar nesukurtas
+def select(tree, selector, ignore_case=True):
+    return Query(NodeIndex(tree), ignore_case).select(selector)
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Užklausos .trm failo AST medžiui.")
+    arg_parser.add_argument("file", help="failas.trm")
+    arg_parser.add_argument("selector", help="selektorius, pvz., //STRUCT_MEMBER[DATA_TYPE=dd]")
+    arg_parser.add_argument("--case-sensitive", action="store_true", help="skirti raidžių dydį")
+    arg_parser.add_argument("--count", action="store_true", help="išvesti tik rezultatų skaičių")
+    arg_parser.add_argument("-D", dest="defined", action="append", metavar="SIMBOLIS",
+                            help="apibrėžtas simbolis: IFNDEF SIMBOLIS blokai praleidžiami")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            code = f.read()
+    except FileNotFoundError:
+        print(f"Klaida: failas '{args.file}' nerastas.")
+        return 1
+
+    try:
+        steps = parse_selector(args.selector, not args.case_sensitive)
+    except QueryError as e:
+        print(f"Klaida: {e}")
+        return 1
+
+    tokens = [token for token in scanner(code, set(args.defined) if args.defined else None)
+              if token[0] != "COMMENT"]
+    parser = Parser(tokens, index=True)
+    parser.parse_program()
+    results = Query(parser.index, not args.case_sensitive).select(steps)
+
+    if args.count:
+        print(len(results))
+        return 0
+    for node in results:
+        line = node.line if node.line is not None else "-"
+        value = f" {node.value}" if node.value is not None else ""
+        print(f"{line:>6} {node.kind}{value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
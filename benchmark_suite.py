@@ -0,0 +1,276 @@
+# Priekinės dalies (skenerių, parserių, semantinės analizės) greičio testų rinkinys.
+# Įvestys - fiksuotos pakopos (small, medium, large, pathological), sugeneruotos
+# su program_generator.py pastoviais seed'ais arba sukonstruotos rankiniu būdu.
+# Kiekvienam etapui pateikiama mediana, p95, tokenai/s, mazgai/s ir atminties
+# smailė. Rezultatai lyginami su bazine linija (JSON); jei mediana sulėtėjo
+# daugiau nei leidžiama, grąžinamas klaidos kodas.
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+LAB4_DIRECTORY = os.path.join(ROOT_DIRECTORY, "lab4")
+# lab4/parser.py turi būti pirmesnis už šakninį (archyvinį) parser.py
+sys.path.insert(0, LAB4_DIRECTORY)
+
+from compiler import tokenize
+from diagnostics import DiagnosticsEngine
+from parser import Parser as CParser
+from semantic_analyzer import SemanticAnalyzer
+
+from constant_evaluator import ConstantEvaluator
+from parser_Sample17 import Parser as TrmParser
+from program_generator import create_generator
+from Sample17_skaneris import scanner
+
+DEFAULT_BASELINE = os.path.join(ROOT_DIRECTORY, "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.20
+BASELINE_VERSION = 1
+
+# pakopa: (C sakinių skaičius, .trm elementų skaičius, kartojimų skaičius)
+TIERS = {
+    "small": (100, 200, 15),
+    "medium": (2000, 4000, 7),
+    "large": (15000, 40000, 3),
+    "pathological": (None, None, 5),
+}
+
+
+def generated_source(language, statements, seed):
+    generator = create_generator(language, seed=seed)
+    return "".join(generator.generate(items=statements))
+
+
+# Kraštutiniai atvejai: labai gilūs skliaustai, daug ilgų išraiškų,
+# giliai įdėti IFNDEF blokai ir struktūra su daug narių.
+# SemanticAnalyzer ir ConstantEvaluator išraiškas apeina rekursyviai, todėl viena
+# grandinė turi tilpti į Python rekursijos ribą - grandinių daug, bet jos trumpesnės.
+def pathological_c():
+    nested = "(" * 200 + "1" + " + 1)" * 200
+    long_sum = " + ".join(f"a * {i}" for i in range(300))
+    lines = ["int main() {", "    int a = 3;"]
+    lines += [f"    int n{i} = {nested};" for i in range(20)]
+    lines += [f"    int s{i} = {long_sum};" for i in range(60)]
+    lines.append('    printf("%d", s0);')
+    lines.append("    return 0;")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def pathological_trm():
+    lines = ["BASE = 1"]
+    lines += [f"LONG{i} = " + " + ".join(f"BASE + {j}" for j in range(150)) for i in range(60)]
+    lines += [f"DEEP{i} = " + "(" * 150 + "BASE" + " + 1)" * 150 for i in range(20)]
+    lines += [f"IFNDEF G{i}" for i in range(150)] + ["INNER = 1"] + ["ENDIF"] * 150
+    lines.append("BIG struc")
+    lines += [f"    f{i} dw ?" for i in range(5000)]
+    lines.append("BIG ends")
+    return "\n".join(lines) + "\n"
+
+
+def tier_sources(tier):
+    c_statements, trm_elements, _ = TIERS[tier]
+    if tier == "pathological":
+        return pathological_c(), pathological_trm()
+    return generated_source("c", c_statements, 17), generated_source("trm", trm_elements, 17)
+
+
+def count_nodes(root):
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) not in seen:
+            seen.add(id(node))
+            stack.extend(node.children)
+    return len(seen)
+
+
+def _quiet():
+    return DiagnosticsEngine(quiet=True)
+
+
+# Etapų įvestys (tokenai, AST) paruošiamos vieną kartą ir į matavimą neįeina
+def build_stages(c_code, trm_code):
+    c_tokens = tokenize(c_code, _quiet())
+    c_ast = CParser(c_tokens, _quiet()).parse()
+    trm_tokens = [token for token in scanner(trm_code) if token[0] != "COMMENT"]
+    trm_ast = TrmParser(trm_tokens).parse_program()
+
+    c_token_count = sum(1 for token in c_tokens if token[0] not in ("NEWLINE", "SKIP", "COMMENT"))
+    c_node_count = count_nodes(c_ast)
+    trm_node_count = count_nodes(trm_ast)
+
+    def evaluate_constants():
+        evaluator = ConstantEvaluator()
+        evaluator.add_program(trm_ast)
+        evaluator.evaluate_all()
+
+    return [
+        # (etapas, funkcija, tokenai, mazgai, įvesties baitai)
+        ("c.lexer", lambda: tokenize(c_code, _quiet()), c_token_count, None, len(c_code)),
+        ("c.parser", lambda: CParser(c_tokens, _quiet()).parse(), c_token_count, c_node_count, len(c_code)),
+        ("c.semantic", lambda: SemanticAnalyzer(_quiet()).analyze(c_ast), None, c_node_count, len(c_code)),
+        ("trm.scanner", lambda: scanner(trm_code), len(trm_tokens), None, len(trm_code)),
+        ("trm.parser", lambda: TrmParser(trm_tokens).parse_program(), len(trm_tokens), trm_node_count, len(trm_code)),
+        ("trm.parser.lazy", lambda: TrmParser(trm_tokens, lazy=True).parse_program(), len(trm_tokens), None,
+         len(trm_code)),
+        ("trm.constants", evaluate_constants, None, trm_node_count, len(trm_code)),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def measure(function, repeats):
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    # Atmintis matuojama atskiru paleidimu, kad tracemalloc neiškraipytų laikų
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return sorted(times), peak
+
+
+def run_suite(tiers, repeats=None, stages=None, log=None):
+    results = {}
+    for tier in tiers:
+        c_code, trm_code = tier_sources(tier)
+        tier_repeats = repeats or TIERS[tier][2]
+        for name, function, tokens, nodes, size in build_stages(c_code, trm_code):
+            if stages and not any(name.startswith(prefix) for prefix in stages):
+                continue
+            times, peak = measure(function, tier_repeats)
+            median = statistics.median(times)
+            record = {
+                "median_ms": round(median * 1000, 3),
+                "p95_ms": round(percentile(times, 0.95) * 1000, 3),
+                "min_ms": round(times[0] * 1000, 3),
+                "repeats": tier_repeats,
+                "bytes": size,
+                "peak_bytes": peak,
+            }
+            if tokens:
+                record["tokens"] = tokens
+                record["tokens_per_s"] = round(tokens / median)
+            if nodes:
+                record["nodes"] = nodes
+                record["nodes_per_s"] = round(nodes / median)
+            results[f"{tier}/{name}"] = record
+            if log is not None:
+                log(format_row(f"{tier}/{name}", record))
+    return results
+
+
+def format_header():
+    return (f"{'etapas':32s} {'mediana ms':>11s} {'p95 ms':>10s} {'tokenai/s':>11s} "
+            f"{'mazgai/s':>10s} {'atmintis KB':>12s}")
+
+
+def format_row(name, record):
+    tokens = f"{record['tokens_per_s']:,}" if "tokens_per_s" in record else "-"
+    nodes = f"{record['nodes_per_s']:,}" if "nodes_per_s" in record else "-"
+    return (f"{name:32s} {record['median_ms']:11.3f} {record['p95_ms']:10.3f} {tokens:>11s} "
+            f"{nodes:>10s} {record['peak_bytes'] / 1024:12.1f}")
+
+
+# Grąžina sąrašą (etapas, bazinė mediana, dabartinė, santykis) tų, kurie sulėtėjo per daug
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, record in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or not previous.get("median_ms"):
+            continue
+        ratio = record["median_ms"] / previous["median_ms"]
+        if ratio > 1 + threshold:
+            regressions.append((name, previous["median_ms"], record["median_ms"], ratio))
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        return None
+    if baseline.get("version") != BASELINE_VERSION:
+        return None
+    return baseline
+
+
+def save_baseline(path, results):
+    data = {
+        "version": BASELINE_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Skenerių, parserių ir semantinės analizės greičio testai.")
+    arg_parser.add_argument("--tier", action="append", choices=sorted(TIERS),
+                            help="kurias pakopas vykdyti (numatyta - visas)")
+    arg_parser.add_argument("--stage", action="append",
+                            help="vykdyti tik etapus su šiuo prefiksu, pvz., c.parser arba trm")
+    arg_parser.add_argument("--repeats", type=int, default=None, help="kartojimų skaičius kiekvienam etapui")
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="bazinės linijos JSON failas")
+    arg_parser.add_argument("--save-baseline", action="store_true", help="įrašyti rezultatus kaip bazinę liniją")
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="leidžiamas medianos sulėtėjimas (0.2 = 20%%)")
+    arg_parser.add_argument("--json", metavar="FAILAS", help="rezultatus įrašyti į JSON failą")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    tiers = args.tier or list(TIERS)
+
+    print(format_header())
+    results = run_suite(tiers, repeats=args.repeats, stages=args.stage, log=print)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBazinė linija įrašyta: {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"\nBazinės linijos nėra ({args.baseline}); palyginimas praleistas.")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if not regressions:
+        print(f"\nSulėtėjimų virš {args.threshold:.0%} nerasta.")
+        return 0
+    print(f"\nSULĖTĖJIMAI (riba {args.threshold:.0%}):")
+    for name, before, after, ratio in regressions:
+        print(f"  {name}: {before:.3f} ms -> {after:.3f} ms ({ratio:.2f}x)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
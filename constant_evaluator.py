@@ -0,0 +1,178 @@
+# Konstantų skaičiavimas WINDOWS.INC tipo failams (Sample17.trm).
+# Iš ASSIGNMENT mazgų sudaromas priklausomybių grafas, reikšmės skaičiuojamos
+# topologine tvarka ir įsimenamos. Pakeitus vieną apibrėžimą, perskaičiuojamos
+# tik nuo jo priklausančios konstantos.
+import sys
+
+from parser_Sample17 import Parser
+from Sample17_skaneris import scanner
+
+
+class ConstantEvaluator:
+    def __init__(self):
+        self.definitions = {}   # vardas -> reikšmės AST mazgas
+        self.dependencies = {}  # vardas -> vardai, kuriuos naudoja jo reikšmė
+        self.dependents = {}    # vardas -> vardai, kurių reikšmės naudoja jį
+        self.values = {}        # apskaičiuotos reikšmės (None - nepavyko)
+        self.errors = []
+
+    def _error(self, message):
+        self.errors.append(f"[KONSTANTOS KLAIDA] {message}")
+
+    # Surenka visus ASSIGNMENT mazgus (taip pat ir CONDITIONAL_BLOCK viduje)
+    def add_program(self, ast_root_node):
+        stack = [ast_root_node]
+        assignments = []
+        while stack:
+            node = stack.pop()
+            if node.kind == "ASSIGNMENT":
+                assignments.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        # MASM leidžia "=" konstantą perapibrėžti, galioja paskutinis apibrėžimas
+        for node in assignments:
+            self.define(node.value, node.children[0])
+
+    # Prideda arba pakeičia apibrėžimą ir pažymi pasenusias reikšmes
+    def define(self, name, value_node):
+        for dependency in self.dependencies.get(name, ()):
+            self.dependents[dependency].discard(name)
+
+        used_names = self._collect_identifiers(value_node)
+        self.definitions[name] = value_node
+        self.dependencies[name] = used_names
+        for dependency in used_names:
+            self.dependents.setdefault(dependency, set()).add(name)
+
+        self._invalidate(name)
+
+    def _collect_identifiers(self, node):
+        names = set()
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.kind == "VALUE_IDENTIFIER":
+                names.add(current.value)
+            stack.extend(current.children)
+        return names
+
+    # Išmeta įsimintas reikšmes vardui ir visiems nuo jo priklausantiems
+    def _invalidate(self, name):
+        stack = [name]
+        seen = {name}
+        while stack:
+            current = stack.pop()
+            self.values.pop(current, None)
+            for dependent in self.dependents.get(current, ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    stack.append(dependent)
+
+    # Apskaičiuoja vieną konstantą. Priklausomybės apeinamos iteratyviu DFS
+    # (postorder = topologinė tvarka), todėl ilgos grandinės neviršija rekursijos ribos.
+    def evaluate(self, name):
+        if name in self.values:
+            return self.values[name]
+        if name not in self.definitions:
+            return None
+
+        in_progress = set()
+        path = []
+        stack = [(name, False)]
+        while stack:
+            current, expanded = stack.pop()
+            if expanded:
+                in_progress.discard(current)
+                path.pop()
+                if current not in self.values: # ciklo nariai jau pažymėti
+                    self.values[current] = self._compute(current)
+                continue
+            if current in self.values:
+                continue
+
+            in_progress.add(current)
+            path.append(current)
+            stack.append((current, True))
+            for dependency in sorted(self.dependencies[current]):
+                if dependency in self.values or dependency not in self.definitions:
+                    continue
+                if dependency in in_progress:
+                    cycle = path[path.index(dependency):] + [dependency]
+                    self._error(f"Ciklinė priklausomybė: {' -> '.join(cycle)}")
+                    for member in cycle:
+                        self.values[member] = None
+                    continue
+                stack.append((dependency, False))
+
+        return self.values[name]
+
+    def evaluate_all(self):
+        for name in self.definitions:
+            self.evaluate(name)
+        return {name: self.values[name] for name in self.definitions}
+
+    # Apskaičiuoja atskirą reikšmės išraišką (pvz., "dup" kiekį), naudodama žinomas konstantas
+    def evaluate_expression(self, node):
+        for name in self._collect_identifiers(node):
+            self.evaluate(name)
+        return self._evaluate_node(node)
+
+    def _compute(self, name):
+        try:
+            return self._evaluate_node(self.definitions[name])
+        except ValueError as e:
+            self._error(f"Konstantos '{name}' reikšmės apskaičiuoti nepavyko: {e}")
+            return None
+
+    # Reikšmė apskaičiuojama tik tada, kai visos priklausomybės jau žinomos
+    def _evaluate_node(self, node):
+        if node.kind == "VALUE_NUMBER":
+            return int(node.value)
+        elif node.kind == "VALUE_HEX_NUMBER":
+            return int(node.value[:-1], 16)
+        elif node.kind == "VALUE_IDENTIFIER":
+            if node.value not in self.definitions:
+                raise ValueError(f"nežinomas identifikatorius '{node.value}'")
+            value = self.values.get(node.value)
+            if value is None:
+                raise ValueError(f"'{node.value}' reikšmė nežinoma")
+            return value
+        elif node.kind == "NEGATE":
+            return -self._evaluate_node(node.children[0])
+        elif node.kind == "BIN_OP":
+            left = self._evaluate_node(node.children[0])
+            right = self._evaluate_node(node.children[1])
+            return left + right if node.value == "+" else left - right
+        raise ValueError(f"nepalaikomas reikšmės tipas {node.kind}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Naudojimas: python constant_evaluator.py failas.trm [KONSTANTA ...]")
+        sys.exit(1)
+
+    file_name = sys.argv[1]
+
+    try:
+        with open(file_name, "r", encoding="utf-8") as f:
+            code = f.read()
+    except FileNotFoundError:
+        print(f"Klaida: failas '{file_name}' nerastas.")
+        sys.exit(1)
+
+    tokens = [token for token in scanner(code) if token[0] != "COMMENT"]
+    ast = Parser(tokens).parse()
+    if ast is None:
+        print("Analizavimas nepavyko.")
+        sys.exit(1)
+
+    evaluator = ConstantEvaluator()
+    evaluator.add_program(ast)
+
+    names = sys.argv[2:] or list(evaluator.definitions)
+    for name in names:
+        value = evaluator.evaluate(name)
+        print(f"{name:30s} = {value if value is not None else '?'}")
+
+    for error in evaluator.errors:
+        print(error, file=sys.stderr)
@@ -0,0 +1,200 @@
+# MASM antraščių (Sample17.trm) eksportas į importuojamą Python modulį.
+# Konstantos tampa modulio lygio int reikšmėmis, o kiekvienai STRUCT_DEF
+# sugeneruojama klasė su iš anksto sukompiliuotu struct.Struct ir pavadintais
+# laukais, skaitomais tiesiai iš memoryview (be kopijavimo).
+import keyword
+import sys
+
+from constant_evaluator import ConstantEvaluator
+from parser_Sample17 import Parser
+from Sample17_skaneris import scanner
+
+# MASM duomenų tipai -> struct formato simboliai (little-endian, be lygiavimo)
+DATA_TYPE_FORMATS = {"db": ("B", 1), "dw": ("H", 2), "dd": ("I", 4)}
+
+# Sugeneruotos klasės atributai, su kuriais laukų vardai neturi sutapti
+RESERVED_NAMES = {"struct_codec", "struct_size", "field_names", "unpack", "iter_unpack", "view_all"}
+
+# Sugeneruoto modulio vardai, kurių konstantos ir klasės neturi perrašyti
+MODULE_NAMES = {"struct", "_field", "_Record", "STRUCTS"}
+
+MODULE_HEADER = '''# Sugeneruota iš {source} su header_exporter.py. Nekeisti rankomis.
+import struct
+
+
+def _field(codec, offset, single=True):
+    unpack_from = codec.unpack_from
+    if single:
+        def getter(self):
+            return unpack_from(self._view, self._offset + offset)[0]
+    else:
+        def getter(self):
+            return unpack_from(self._view, self._offset + offset)
+    return property(getter)
+
+
+class _Record:
+    __slots__ = ("_view", "_offset")
+
+    def __init__(self, buffer, offset=0):
+        self._view = memoryview(buffer)
+        self._offset = offset
+
+    def unpack(self):
+        return self.struct_codec.unpack_from(self._view, self._offset)
+
+    # Visi įrašai iš karto (struct.iter_unpack), grąžinami kaip tuple
+    @classmethod
+    def iter_unpack(cls, buffer):
+        return cls.struct_codec.iter_unpack(buffer)
+
+    # Įrašų "langai" į tą patį buferį - laukai skaitomi tik prireikus
+    @classmethod
+    def view_all(cls, buffer):
+        view = memoryview(buffer)
+        size = cls.struct_size
+        return [cls(view, offset) for offset in range(0, len(view) - size + 1, size)]
+
+'''
+
+
+class ExportError(Exception):
+    pass
+
+
+def _python_name(name, reserved=()):
+    if keyword.iskeyword(name) or name in reserved:
+        return name + "_"
+    return name
+
+
+class HeaderExporter:
+    def __init__(self, source_name="<trm>"):
+        self.source_name = source_name
+        self.evaluator = ConstantEvaluator()
+        self.struct_sizes = {}
+        self.warnings = []
+
+    def export(self, ast_root_node):
+        self.evaluator.add_program(ast_root_node)
+        values = self.evaluator.evaluate_all()
+
+        structs = []
+        stack = [ast_root_node]
+        while stack:
+            node = stack.pop()
+            if node.kind == "STRUCT_DEF":
+                structs.append(node)
+            else:
+                stack.extend(reversed(node.children))
+
+        lines = [MODULE_HEADER.format(source=self.source_name)]
+        struct_names = {node.value for node in structs}
+
+        lines.append("# Konstantos")
+        for name, value in values.items():
+            if value is None:
+                self.warnings.append(f"Konstanta '{name}' praleista: reikšmė nežinoma.")
+                continue
+            if name in struct_names:
+                self.warnings.append(f"Konstanta '{name}' praleista: sutampa su struktūros vardu.")
+                continue
+            lines.append(f"{_python_name(name, MODULE_NAMES)} = {value}")
+        lines.append("")
+
+        for node in structs:
+            lines.extend(self._export_struct(node))
+
+        exported = [node.value for node in structs]
+        lines.append("")
+        lines.append(f"STRUCTS = {{{', '.join(f'{name!r}: {_python_name(name, MODULE_NAMES)}' for name in exported)}}}")
+        return "\n".join(lines) + "\n"
+
+    def _export_struct(self, node):
+        formats = []
+        fields = []           # (vardas, formatas, poslinkis, ar vienas elementas)
+        offset = 0
+        for member in node.children:
+            data_type = member.children[0].value.lower()
+            type_format, type_size = DATA_TYPE_FORMATS[data_type]
+            count = 1
+            dup = next((c for c in member.children if c.kind == "DUP"), None)
+            if dup is not None:
+                count = self._dup_count(node.value, dup.children[0])
+
+            if count == 1:
+                member_format, single = type_format, True
+            elif type_format == "B":
+                member_format, single = f"{count}s", True
+            else:
+                member_format, single = f"{count}{type_format}", False
+            member_size = count * type_size
+
+            if member.value is None:
+                formats.append(f"{member_size}x") # bevardis narys - tik vieta
+            else:
+                formats.append(member_format)
+                fields.append((_python_name(member.value, RESERVED_NAMES), member_format, offset, single))
+            offset += member_size
+
+        self.struct_sizes[node.value] = offset
+        class_name = _python_name(node.value, MODULE_NAMES)
+        lines = [
+            "",
+            f"class {class_name}(_Record):",
+            f"    __slots__ = ()",
+            f"    struct_codec = struct.Struct({'<' + ''.join(formats)!r})",
+            f"    struct_size = {offset}",
+            f"    field_names = ({''.join(f'{name!r}, ' for name, _, _, _ in fields)})",
+        ]
+        for name, member_format, field_offset, single in fields:
+            single_arg = "" if single else ", single=False"
+            lines.append(f"    {name} = _field(struct.Struct({'<' + member_format!r}), {field_offset}{single_arg})")
+        return lines
+
+    def _dup_count(self, struct_name, count_node):
+        if count_node.kind == "SIZEOF":
+            if count_node.value not in self.struct_sizes:
+                raise ExportError(f"Struktūroje '{struct_name}': nežinomas dydis 'size {count_node.value}'.")
+            return self.struct_sizes[count_node.value]
+        try:
+            return self.evaluator.evaluate_expression(count_node)
+        except ValueError as e:
+            raise ExportError(f"Struktūroje '{struct_name}': {e}")
+
+
+def parse_file(file_name):
+    with open(file_name, "r", encoding="utf-8") as f:
+        code = f.read()
+    tokens = [token for token in scanner(code) if token[0] != "COMMENT"]
+    return Parser(tokens).parse()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Naudojimas: python header_exporter.py failas.trm modulis.py")
+        sys.exit(1)
+
+    try:
+        ast = parse_file(sys.argv[1])
+    except FileNotFoundError:
+        print(f"Klaida: failas '{sys.argv[1]}' nerastas.")
+        sys.exit(1)
+    if ast is None:
+        print("Analizavimas nepavyko.")
+        sys.exit(1)
+
+    exporter = HeaderExporter(sys.argv[1])
+    try:
+        module_source = exporter.export(ast)
+    except ExportError as e:
+        print(f"Klaida: {e}")
+        sys.exit(1)
+
+    with open(sys.argv[2], "w", encoding="utf-8") as f:
+        f.write(module_source)
+
+    for warning in exporter.warnings:
+        print(f"Įspėjimas: {warning}", file=sys.stderr)
+    print(f"Sukurtas {sys.argv[2]}: {len(exporter.evaluator.definitions)} konstantų, "
+          f"{len(exporter.struct_sizes)} struktūrų.")
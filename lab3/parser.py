@@ -299,7 +299,7 @@ int main() {
 
         # Literals
         ("NUMBER", r"\b\d+\b"),
-        ("STRING_LITERAL", r'"(\\"|[^"])*"'),
+        ("STRING_LITERAL", r'"[^"\\]*(?:\\[\s\S][^"\\]*)*"|"'), # be grįžimų; neuždaryta - tik '"'
         
         # Identifiers (turi būti tikrinami po raktinių žodžių)
         ("IDENTIFICATOR", r"[A-Za-z_][A-Za-z0-9_]*"),
@@ -307,7 +307,7 @@ int main() {
         # Whitespace and control (Svarbu: NEWLINE turi būti atskiras tokenas linijų numeracijai)
         ("NEWLINE", r"\n"),
         ("SKIP", r"[ \t]+"),
-        ("COMMENT", r"//.*|/\*[\s\S]*?\*/"), # Pridedamas ir blokinio komentaro palaikymas
+        ("COMMENT", r"//.*|/\*[\s\S]*?\*/|/\*"), # Pridedamas ir blokinio komentaro palaikymas; neuždarytas - tik "/*"
         
         # Neatpažinti simboliai
         ("NEATPAŽINTA", r"."),
@@ -331,6 +331,10 @@ int main() {
         if kind == "NEWLINE":
             line_num += 1
             all_tokens.append((kind, value, line_num)) # Įtraukiame NEWLINE, kad būtų galima praleisti
+        elif value == '"' or value == "/*":
+            what = "neuždaryta eilutės konstanta" if kind == "STRING_LITERAL" else "neuždarytas blokinis komentaras"
+            print(f"Leksinė klaida eilutėje {line_num}: {what}")
+            sys.exit(1)
         elif kind in ("SKIP", "COMMENT"):
             all_tokens.append((kind, value, line_num)) # Įtraukiame ir juos, kad parseris galėtų juos praleisti
         elif kind == "NEATPAŽINTA":
@@ -0,0 +1,165 @@
+# lab4/artifact_cache.py Kompiliavimo rezultatų talpykla.
+# Įrašo raktas: šaltinio maiša + įtrauktų antraščių maišos + kompiliatoriaus
+# modulių "pirštų atspaudas". Kiekvienas įrašas - atskiras failas, pavadintas
+# raktu, todėl paieška yra O(1). Rašoma į laikiną failą ir pervadinama
+# (os.replace), todėl lygiagretūs procesai niekada nemato pusiau įrašyto failo.
+# Bendras dydis ribojamas išmetant seniausiai naudotus įrašus (LRU pagal mtime).
+import glob
+import hashlib
+import os
+import pickle
+import re
+import sys
+import tempfile
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ENTRY_SUFFIX = ".artifact"
+
+_fingerprint = None
+
+
+# Visų lab4 modulių turinio maiša: pakeitus kompiliatorių, seni įrašai nebetinka
+def compiler_fingerprint():
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_FORMAT_VERSION}:{sys.version_info[:2]}".encode())
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(directory, "*.py"))):
+            digest.update(os.path.basename(path).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+
+include_search = re.compile(r"^[ \t]*#[ \t]*include[ \t]*<[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*>", re.MULTILINE).finditer
+
+
+# Antraščių pavadinimai iš #include <x> eilučių (be pilnos analizės)
+def include_names(code):
+    return [match.group(1) for match in include_search(code)]
+
+
+# #include <x> antraštė ieškoma šaltinio kataloge: pirma "x", paskui "x.h"
+def find_header(name, directory):
+    for candidate in (name, name + ".h"):
+        path = os.path.join(directory, candidate)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+# Įtrauktų antraščių (ir jų pačių įtrauktų) maišos; nerasta antraštė
+# į raktą įeina tik pavadinimu.
+def header_digests(code, source_path):
+    directory = os.path.dirname(os.path.abspath(source_path)) if source_path else os.getcwd()
+    digests = []
+    seen = set()
+    pending = list(reversed(include_names(code)))
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        header_path = find_header(name, directory)
+        try:
+            if header_path is None:
+                raise FileNotFoundError(name)
+            with open(header_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            digests.append(f"{name}:-")
+            continue
+        digests.append(f"{name}:{hashlib.sha256(data).hexdigest()}")
+        pending.extend(reversed(include_names(data.decode("utf-8", "replace"))))
+    return digests
+
+
+class ArtifactCache:
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, code, source_path=None, options=""):
+        digest = hashlib.sha256()
+        digest.update(compiler_fingerprint().encode())
+        digest.update(options.encode())
+        digest.update(hashlib.sha256(code.encode("utf-8")).digest())
+        for header in header_digests(code, source_path):
+            digest.update(header.encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            # Sugadintas įrašas laikomas praleistu ir pašalinamas
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        if entry.get("version") != CACHE_FORMAT_VERSION:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path) # LRU: paskutinio naudojimo laikas
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["artifacts"]
+
+    def put(self, key, artifacts):
+        data = pickle.dumps({"version": CACHE_FORMAT_VERSION, "artifacts": artifacts},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            self._remove(temp_path)
+            raise
+        self._evict()
+
+    # Išmeta seniausiai naudotus įrašus, kol bendras dydis telpa į ribą
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    info = entry.stat()
+                except FileNotFoundError:
+                    continue # kitas procesas jau pašalino
+                entries.append((info.st_mtime, info.st_size, entry.path))
+                total += info.st_size
+
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,211 @@
+# lab4/batch.py Daugelio failų kompiliavimas procesų telkinyje.
+# Failai nuskaitomi iš anksto keliose gijose (I/O nelaukia CPU), o analizė
+# paskirstoma procesams, nes ji riboja GIL. Kiekvieno failo rezultatas
+# išvedamas iš karto viena JSON eilute, pabaigoje - bendra suvestinė.
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from diagnostics import DiagnosticsEngine, ERROR, NOTE, TooManyErrors, WARNING
+from precompiled_header import PrecompiledHeaders
+from semantic_analyzer import SemanticAnalyzer
+
+SOURCE_PATTERN = "*.c"
+READ_THREADS = 4
+
+# Darbinio proceso antraštės pagal katalogą: kiekviena antraštė analizuojama kartą procesui
+_headers = {}
+
+
+# Katalogai išskleidžiami rekursyviai (*.c), kiti argumentai laikomi glob šablonais
+def expand_inputs(inputs):
+    paths = []
+    missing = []
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(glob.glob(os.path.join(item, "**", SOURCE_PATTERN), recursive=True))
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+        if not matches:
+            missing.append(item)
+        for path in matches:
+            key = os.path.abspath(path)
+            if key not in seen and os.path.isfile(path):
+                seen.add(key)
+                paths.append(path)
+    return paths, missing
+
+
+# Konteineryje procesui gali būti prieinama mažiau branduolių nei os.cpu_count()
+def available_cpus():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def read_source(path):
+    start = time.perf_counter()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            code = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return None, str(e), time.perf_counter() - start
+    return code, None, time.perf_counter() - start
+
+
+# Vykdoma darbiniame procese: grąžina tik smulkų, lengvai perduodamą rezultatą
+def compile_job(path, code, optimize=False, max_errors=None, warn_unused=False):
+    # Importuojama čia, nes compiler.py pats importuoja šį modulį
+    from compiler import compile_source
+
+    directory = os.path.dirname(os.path.abspath(path))
+    headers = _headers.get(directory)
+    if headers is None:
+        headers = _headers[directory] = PrecompiledHeaders(directory)
+    diagnostics = DiagnosticsEngine(file_name=path, quiet=True, max_errors=max_errors)
+    start = time.perf_counter()
+    try:
+        compile_source(code, diagnostics, optimize=optimize, analyzer=SemanticAnalyzer(diagnostics),
+                       warn_unused=warn_unused, headers=headers)
+    except TooManyErrors:
+        pass
+    except Exception as e:
+        # Pvz., RecursionError labai giliai įdėtoms išraiškoms: failas laikomas nepavykusiu,
+        # o likę failai kompiliuojami toliau
+        diagnostics.error("driver", f"Vidinė kompiliatoriaus klaida: {type(e).__name__}: {e}")
+    elapsed = time.perf_counter() - start
+    return {
+        "ok": not diagnostics.has_errors(),
+        "errors": diagnostics.counts[ERROR],
+        "warnings": diagnostics.counts[WARNING],
+        "compile_ms": round(elapsed * 1000, 3),
+        "diagnostics": [d.to_dict(path) for d in diagnostics.diagnostics if d.severity != NOTE],
+    }
+
+
+class BatchCompiler:
+    def __init__(self, jobs=None, fail_fast=False, optimize=False, max_errors=None, stream=None,
+                 warn_unused=False):
+        self.jobs = jobs or available_cpus()
+        self.fail_fast = fail_fast
+        self.optimize = optimize
+        self.max_errors = max_errors
+        self.warn_unused = warn_unused
+        self.stream = stream or sys.stdout
+        self.summary = {"files": 0, "succeeded": 0, "failed": 0, "skipped": 0,
+                        "errors": 0, "warnings": 0, "bytes": 0}
+
+    def _emit(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def _finish(self, path, size, read_ms, result):
+        record = {"file": path, "bytes": size, "read_ms": round(read_ms * 1000, 3)}
+        record.update(result)
+        self._emit(record)
+        self.summary["files"] += 1
+        self.summary["bytes"] += size
+        self.summary["errors"] += result["errors"]
+        self.summary["warnings"] += result["warnings"]
+        self.summary["succeeded" if result["ok"] else "failed"] += 1
+        return result["ok"]
+
+    # Failas, kurio nepavyko nuskaityti ar kurio darbinis procesas žlugo
+    def _failure(self, error):
+        return {"ok": False, "errors": 1, "warnings": 0, "compile_ms": 0.0,
+                "diagnostics": [{"severity": ERROR, "phase": "driver", "message": error}]}
+
+    def run(self, paths):
+        start = time.perf_counter()
+        if self.jobs == 1:
+            self._run_serial(paths)
+        else:
+            self._run_pool(paths)
+        wall = time.perf_counter() - start
+
+        self.summary["skipped"] = len(paths) - self.summary["files"]
+        self.summary.update({
+            "jobs": self.jobs,
+            "wall_s": round(wall, 4),
+            "files_per_s": round(self.summary["files"] / wall, 1) if wall else None,
+            "mb_per_s": round(self.summary["bytes"] / wall / 1e6, 3) if wall else None,
+        })
+        self._emit({"summary": self.summary})
+        return self.summary["failed"] == 0 and self.summary["skipped"] == 0
+
+    def _run_serial(self, paths):
+        for path in paths:
+            code, error, read_time = read_source(path)
+            if error is not None:
+                ok = self._finish(path, 0, read_time, self._failure(error))
+            else:
+                ok = self._finish(path, len(code.encode("utf-8")), read_time,
+                                  compile_job(path, code, self.optimize, self.max_errors, self.warn_unused))
+            if not ok and self.fail_fast:
+                return
+
+    # Skaitymai ir kompiliavimai ribojami "langu", kad atmintyje nebūtų viso korpuso
+    def _run_pool(self, paths):
+        window = self.jobs * 2
+        pending_paths = deque(paths)
+        reads = deque()
+        running = {}
+        stop = False
+
+        with ThreadPoolExecutor(max_workers=READ_THREADS) as readers, \
+             ProcessPoolExecutor(max_workers=self.jobs) as workers:
+            while not stop and (pending_paths or reads or running):
+                while pending_paths and len(reads) < window:
+                    path = pending_paths.popleft()
+                    reads.append((path, readers.submit(read_source, path)))
+
+                # Paruošti (nuskaityti) failai perduodami procesams eilės tvarka
+                while reads and len(running) < window and (reads[0][1].done() or not running):
+                    path, read_future = reads.popleft()
+                    code, error, read_time = read_future.result()
+                    if error is not None:
+                        if not self._finish(path, 0, read_time, self._failure(error)) and self.fail_fast:
+                            stop = True
+                            break
+                        continue
+                    future = workers.submit(compile_job, path, code, self.optimize, self.max_errors,
+                                            self.warn_unused)
+                    running[future] = (path, len(code.encode("utf-8")), read_time)
+
+                if stop or not running:
+                    continue
+                # Laukiama, kol baigsis kompiliavimas arba bus nuskaitytas kitas failas
+                waiting = set(running)
+                if reads and len(running) < window:
+                    waiting.add(reads[0][1])
+                done, _ = wait(waiting, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future not in running:
+                        continue
+                    path, size, read_time = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e: # pvz., darbinis procesas nutrauktas
+                        result = self._failure(f"Darbinio proceso klaida: {type(e).__name__}: {e}")
+                    if not self._finish(path, size, read_time, result) and self.fail_fast:
+                        stop = True
+
+            if stop:
+                # Dar vykdomų failų rezultatai nebelaukiami - jie įskaitomi kaip praleisti
+                readers.shutdown(wait=False, cancel_futures=True)
+                workers.shutdown(wait=True, cancel_futures=True)
+
+
+def run_batch(inputs, jobs=None, fail_fast=False, optimize=False, max_errors=None, warn_unused=False):
+    paths, missing = expand_inputs(inputs)
+    for item in missing:
+        print(f"Klaida: '{item}' neatitinka jokio failo.", file=sys.stderr)
+    compiler = BatchCompiler(jobs=jobs, fail_fast=fail_fast, optimize=optimize, max_errors=max_errors,
+                             warn_unused=warn_unused)
+    ok = compiler.run(paths)
+    return 0 if ok and not missing else 1
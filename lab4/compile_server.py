@@ -0,0 +1,386 @@
+# lab4/compile_server.py Ilgai veikiantis kompiliavimo serveris (Unix lizdas).
+# Kiekvienas CLI paleidimas moka už interpretatoriaus paleidimą, importus ir
+# reguliariųjų išraiškų kompiliavimą. Serveris visa tai laiko "šiltą": užklausos
+# (scan/parse/analyze) siunčiamos per Unix lizdą, CPU darbas atliekamas procesų
+# telkinyje (moduliai jame importuoti vieną kartą), o pastarųjų failų rezultatai
+# laikomi LRU talpykloje pagal turinio maišą.
+#
+# Protokolas: kiekviena žinutė - 4 baitų ilgis (big-endian) ir tiek baitų JSON.
+# Užklausa: {"op": "scan"|"parse"|"analyze"|"stats"|"shutdown",
+#            "path": "...", arba "source": "...", "language": "c"|"trm",
+#            "ast": false, "cache": true}
+# Atsakymas: {"ok": true, "result": {...}, "cached": false} arba {"ok": false, "error": "..."}
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import statistics
+import struct
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from artifact_cache import header_digests
+from batch import available_cpus
+from profiler import count_nodes
+
+DEFAULT_SOCKET = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"lab4-compiler-{os.getuid()}.sock")
+DEFAULT_CACHE_ENTRIES = 256
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+HEADER = struct.Struct(">I")
+OPERATIONS = ("scan", "parse", "analyze")
+
+# Sample17 (.trm) moduliai yra tėviniame kataloge; pridedami gale, kad
+# lab4/parser.py liktų pirmesnis už šakninį parser.py
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_message(message):
+    data = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(len(data)) + data
+
+
+def _check_length(length):
+    if length > MAX_MESSAGE_BYTES:
+        raise ProtocolError(f"Per didelė žinutė ({length} B).")
+
+
+async def read_message(reader):
+    header = await reader.readexactly(HEADER.size)
+    (length,) = HEADER.unpack(header)
+    _check_length(length)
+    message = json.loads(await reader.readexactly(length))
+    if not isinstance(message, dict):
+        raise ProtocolError("Užklausa turi būti JSON objektas.")
+    return message
+
+
+# --- Darbiniai procesai ---
+
+def _init_worker():
+    if ROOT_DIRECTORY not in sys.path:
+        sys.path.append(ROOT_DIRECTORY)
+    # Importai ir lekserių kompiliavimas įvyksta vieną kartą, proceso paleidimo metu
+    import compiler
+    import parser_Sample17
+    import Sample17_skaneris
+
+
+# Darbinio proceso antraštės pagal katalogą (kaip batch.py): kiekviena antraštė
+# analizuojama kartą procesui, o pakeitimus aptinka pats PrecompiledHeaders
+_headers = {}
+
+
+def _ping():
+    return os.getpid()
+
+
+def _ast_to_json(node):
+    return [node.kind, node.value, [_ast_to_json(child) for child in node.children]]
+
+
+def _run_c(op, source, file_name, include_ast):
+    from compiler import compile_source, tokenize
+    from diagnostics import DiagnosticsEngine, NOTE, TooManyErrors
+    from parser import Parser
+
+    from precompiled_header import PrecompiledHeaders
+
+    diagnostics = DiagnosticsEngine(file_name=file_name, quiet=True)
+    result = {}
+    ast = None
+    try:
+        if op == "analyze":
+            # "source" užklausų antraštės ieškomos darbo kataloge, kaip ir header_digests
+            directory = os.path.dirname(os.path.abspath(file_name)) if file_name != "<source>" else os.getcwd()
+            headers = _headers.get(directory)
+            if headers is None:
+                headers = _headers[directory] = PrecompiledHeaders(directory)
+            ast = compile_source(source, diagnostics, headers=headers)
+        else:
+            tokens = tokenize(source, diagnostics)
+            if tokens is not None:
+                result["tokens"] = sum(1 for token in tokens if token[0] not in ("NEWLINE", "SKIP", "COMMENT"))
+                if op == "parse":
+                    ast = Parser(tokens, diagnostics).parse()
+    except TooManyErrors:
+        pass
+    if ast is not None:
+        result["nodes"] = count_nodes(ast)
+        if include_ast:
+            result["ast"] = _ast_to_json(ast)
+    result["diagnostics"] = [d.to_dict(file_name) for d in diagnostics.diagnostics if d.severity != NOTE]
+    result["success"] = not diagnostics.has_errors()
+    return result
+
+
+def _run_trm(op, source, file_name, include_ast):
+    from parser_Sample17 import Parser
+    from Sample17_skaneris import scanner
+
+    tokens = [token for token in scanner(source) if token[0] != "COMMENT"]
+    result = {"tokens": len(tokens)}
+    if op in ("parse", "analyze"):
+        parser = Parser(tokens)
+        ast = parser.parse_program()
+        result["nodes"] = count_nodes(ast)
+        result["diagnostics"] = [{"severity": "error", "phase": "parser", "message": message, "file": file_name}
+                                 for message in parser.errors]
+        if op == "analyze":
+            from constant_evaluator import ConstantEvaluator
+            evaluator = ConstantEvaluator()
+            evaluator.add_program(ast)
+            evaluator.evaluate_all()
+            result["diagnostics"] += [{"severity": "error", "phase": "constants", "message": message,
+                                       "file": file_name} for message in evaluator.errors]
+        if include_ast:
+            result["ast"] = _ast_to_json(ast)
+        result["success"] = not result["diagnostics"]
+    else:
+        result["success"] = not any(token[0] == "NEATPAŽINTA" for token in tokens)
+    return result
+
+
+def run_job(op, language, source, file_name, include_ast=False):
+    start = time.perf_counter()
+    if language == "trm":
+        result = _run_trm(op, source, file_name, include_ast)
+    else:
+        result = _run_c(op, source, file_name, include_ast)
+    result["worker_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+# --- Serveris ---
+
+class CompileServer:
+    def __init__(self, socket_path=DEFAULT_SOCKET, workers=None, cache_entries=DEFAULT_CACHE_ENTRIES):
+        self.socket_path = socket_path
+        self.workers = workers or available_cpus()
+        self.cache_entries = cache_entries
+        self.cache = OrderedDict() # (op, kalba, maiša, ast) -> rezultatas
+        self.stats = {"requests": 0, "cache_hits": 0, "errors": 0, "clients": 0}
+        self.pool = None
+        self.server = None
+        self.started = time.time()
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        # Procesai paleidžiami iš karto, kad pirmoji užklausa nelauktų importų
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ping) for _ in range(self.workers)))
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        print(f"Serveris klauso {self.socket_path} ({self.workers} proc.)", file=sys.stderr)
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def handle_client(self, reader, writer):
+        self.stats["clients"] += 1
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except asyncio.IncompleteReadError:
+                    break # klientas atsijungė
+                response = await self.handle_request(request)
+                writer.write(encode_message(response))
+                await writer.drain()
+                if request.get("op") == "shutdown":
+                    self.server.close()
+                    break
+        except (ProtocolError, json.JSONDecodeError) as e:
+            writer.write(encode_message({"ok": False, "error": f"Protokolo klaida: {e}"}))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request):
+        self.stats["requests"] += 1
+        op = request.get("op")
+        if op == "stats":
+            return {"ok": True, "result": dict(self.stats, cache_entries=len(self.cache),
+                                               uptime_s=round(time.time() - self.started, 1))}
+        if op == "shutdown":
+            return {"ok": True, "result": {}}
+        if op not in OPERATIONS:
+            return self._failure(f"Nežinoma operacija '{op}'.")
+
+        path = request.get("path")
+        source = request.get("source")
+        if source is None:
+            if path is None:
+                return self._failure("Nenurodytas nei 'path', nei 'source'.")
+            try:
+                source = await asyncio.to_thread(_read_text, path)
+            except OSError as e:
+                return self._failure(f"Nepavyko nuskaityti '{path}': {e}")
+
+        language = request.get("language") or ("trm" if path and path.endswith(".trm") else "c")
+        include_ast = bool(request.get("ast"))
+        key = (op, language, hashlib.sha256(source.encode("utf-8")).digest(), include_ast)
+        if op == "analyze" and language == "c":
+            # Rezultatas priklauso ir nuo #include antraščių turinio
+            key += tuple(await asyncio.to_thread(header_digests, source, path))
+        use_cache = request.get("cache", True)
+        result = self.cache.get(key) if use_cache else None
+        if result is not None:
+            self.cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return {"ok": True, "result": result, "cached": True}
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.pool, run_job, op, language, source,
+                                                path or "<source>", include_ast)
+        except Exception as e: # darbinio proceso klaida neturi sustabdyti serverio
+            return self._failure(f"{type(e).__name__}: {e}")
+
+        self.cache[key] = result
+        if len(self.cache) > self.cache_entries:
+            self.cache.popitem(last=False)
+        return {"ok": True, "result": result, "cached": False}
+
+    def _failure(self, message):
+        self.stats["errors"] += 1
+        return {"ok": False, "error": message}
+
+
+def _read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+# --- Klientas ---
+
+class CompileClient:
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=60.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+
+    def request(self, message):
+        self.sock.sendall(encode_message(message))
+        (length,) = HEADER.unpack(self._receive(HEADER.size))
+        _check_length(length)
+        return json.loads(self._receive(length))
+
+    def _receive(self, size):
+        chunks = []
+        while size:
+            chunk = self.sock.recv(min(size, 1 << 20))
+            if not chunk:
+                raise ProtocolError("Serveris nutraukė ryšį.")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _file_request(op, file_name, include_ast=False):
+    # Kelias siunčiamas absoliutus, nes serverio darbinis katalogas gali skirtis
+    return {"op": op, "path": os.path.abspath(file_name), "ast": include_ast}
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Kompiliavimo serveris ir klientas.")
+    arg_parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix lizdo kelias")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="paleisti serverį")
+    serve.add_argument("-j", "--workers", type=int, default=None, help="darbinių procesų skaičius")
+    serve.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES,
+                       help="kiek rezultatų laikyti LRU talpykloje")
+
+    for op in OPERATIONS:
+        command = commands.add_parser(op, help=f"'{op}' užklausa vienam failui")
+        command.add_argument("file")
+        command.add_argument("--ast", action="store_true", help="grąžinti ir AST (JSON)")
+
+    bench = commands.add_parser("bench", help="išmatuoti užklausų delsą")
+    bench.add_argument("op", choices=OPERATIONS)
+    bench.add_argument("file")
+    bench.add_argument("-n", "--requests", type=int, default=200)
+    bench.add_argument("--no-cache", action="store_true", help="kiekvieną kartą vykdyti darbiniame procese")
+
+    commands.add_parser("stats", help="serverio statistika")
+    commands.add_parser("shutdown", help="sustabdyti serverį")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.command == "serve":
+        server = CompileServer(args.socket, workers=args.workers, cache_entries=args.cache_entries)
+        try:
+            asyncio.run(server.serve())
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        client = CompileClient(args.socket)
+    except OSError as e:
+        print(f"Klaida: nepavyko prisijungti prie {args.socket}: {e}", file=sys.stderr)
+        return 1
+
+    with client:
+        if args.command == "bench":
+            request = _file_request(args.op, args.file)
+            request["cache"] = not args.no_cache
+            latencies = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = client.request(request)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if not response["ok"]:
+                    print(f"Klaida: {response['error']}", file=sys.stderr)
+                    return 1
+            latencies.sort()
+            print(json.dumps({
+                "requests": len(latencies),
+                "p50_ms": round(statistics.median(latencies), 3),
+                "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+                "max_ms": round(latencies[-1], 3),
+            }))
+            return 0
+
+        if args.command in OPERATIONS:
+            response = client.request(_file_request(args.command, args.file, args.ast))
+        else:
+            response = client.request({"op": args.command})
+
+    print(json.dumps(response, ensure_ascii=False))
+    if not response["ok"]:
+        return 1
+    return 0 if response["result"].get("success", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
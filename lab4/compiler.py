@@ -2,104 +2,405 @@
 import re
 import sys
 import os
+import argparse
+import pickle
 
 from parser import ASTNode, Parser
 from semantic_analyzer import SemanticAnalyzer
+from diagnostics import DiagnosticsEngine, TooManyErrors
+from optimizer import ConstantFolder
+from vm import BytecodeCompiler, BytecodeError, VirtualMachine
+from ir import IRBuilder
+from pycodegen import CodegenError, PythonCodeGenerator
+from elf_backend import ElfError, write_executable
+from artifact_cache import ArtifactCache
+from passes import PassManager
+from batch import run_batch
+from profiler import PhaseProfiler, count_nodes, null_phase
+from dataflow import report_unused
+from precompiled_header import PrecompiledHeaders
 
-if __name__ == "__main__":
-    # Patikrina ar pateiktas failas
-    if len(sys.argv) < 2:
-        print("Naudojimas: python compiler.py <c_failo_pavadinimas>")
-        sys.exit(1)
-    else:
-        code_filepath = sys.argv[1]
+# Lekserio taisyklės
+tokens = [
+    # Keywords
+    ("CONST_KW", r"\bconst\b"),
+    ("INT_KW", r"\bint\b"),
+    ("RETURN_KW", r"\breturn\b"),
+    ("MAIN_KW", r"\bmain\b"),
+    ("PRINTF_KW", r"\bprintf\b"),
+    ("INCLUDE_KW", r"#[ \t]*include"),
 
-    # Nuskaitom kodą
-    try:
-        with open(code_filepath, 'r', encoding='utf-8') as f:
-            test_code = f.read()
-    except FileNotFoundError:
-        print(f"Klaida: Failas '{code_filepath}' nerastas.")
-        sys.exit(1)
-
-    # Lekserio taisyklės
-    tokens = [
-        # Keywords
-        ("CONST_KW", r"\bconst\b"),
-        ("INT_KW", r"\bint\b"),
-        ("RETURN_KW", r"\breturn\b"),
-        ("MAIN_KW", r"\bmain\b"),
-        ("PRINTF_KW", r"\bprintf\b"),
-        ("INCLUDE_KW", r"#[ \t]*include"),
-
-        ("PLUS", r"\+"),
-        ("STAR", r"\*"),
-        ("EQUAL", r"="),
-        ("SEMICOLON", r";"),
-        ("COMMA", r","),
-        ("LPAREN", r"\("),
-        ("RPAREN", r"\)"),
-        ("LBRACE", r"\{"),
-        ("RBRACE", r"\}"),
-        ("LT", r"<"),
-        ("GT", r">"),
-
-        ("NUMBER", r"\b\d+\b"),
-        ("STRING_LITERAL", r'"(\\"|[^"])*"'),
-        
-        ("IDENTIFICATOR", r"[A-Za-z_][A-Za-z0-9_]*"),
-        
-        ("NEWLINE", r"\n"),
-        ("SKIP", r"[ \t]+"),
-        ("COMMENT", r"//.*|/\*[\s\S]*?\*/"),
-        
-        ("NEATPAŽINTA", r"."),
-    ]
-    tokens_regex = "|".join(f"(?P<{name}>{pattern})" for name, pattern in tokens)
-    lexer = re.compile(tokens_regex, re.MULTILINE).match 
-
-    # lab2: Leksemų suskirstymas
+    ("PLUS", r"\+"),
+    ("STAR", r"\*"),
+    ("EQUAL", r"="),
+    ("SEMICOLON", r";"),
+    ("COMMA", r","),
+    ("LPAREN", r"\("),
+    ("RPAREN", r"\)"),
+    ("LBRACE", r"\{"),
+    ("RBRACE", r"\}"),
+    ("LT", r"<"),
+    ("GT", r">"),
+
+    ("NUMBER", r"\b\d+\b"),
+    # Eilutės konstanta be grįžimų (kiekvienas simbolis tikrinamas vieną kartą).
+    # Jei uždarančios '"' nėra, atpažįstama tik pati '"' - tokenize praneša klaidą.
+    ("STRING_LITERAL", r'"[^"\\]*(?:\\[\s\S][^"\\]*)*"|"'),
+
+    ("IDENTIFICATOR", r"[A-Za-z_][A-Za-z0-9_]*"),
+
+    ("NEWLINE", r"\n"),
+    ("SKIP", r"[ \t]+"),
+    ("COMMENT", r"//.*|/\*[\s\S]*?\*/|/\*"), # neuždarytas - tik "/*"
+
+    ("NEATPAŽINTA", r"."),
+]
+tokens_regex = "|".join(f"(?P<{name}>{pattern})" for name, pattern in tokens)
+lexer = re.compile(tokens_regex, re.MULTILINE).match
+
+
+# lab2: Leksemų suskirstymas. Grąžina None, jei rasta leksinė klaida.
+def tokenize(code, diagnostics):
     all_tokens = []
     position = 0
     line_num = 1
-    
-    print("##### Leksinė analizė #####")
-    
-    next_match = lexer(test_code, position)
+    list_tokens = diagnostics.wants("note")
+    identifiers = {} # tekstas -> kanoninis objektas (tik šiam tokenize kvietimui)
+
+    next_match = lexer(code, position)
     while next_match:
         kind = next_match.lastgroup
         value = next_match.group()
-        
+        position = next_match.end()
+
         if kind == "NEWLINE":
             line_num += 1
             all_tokens.append((kind, value, line_num))
-        elif kind in ("SKIP", "COMMENT"):
+        elif kind == "SKIP":
+            all_tokens.append((kind, value, line_num))
+        elif value == '"' or value == "/*":
+            # Literalas neuždarytas: išraiška jau vieną kartą perėjo iki failo galo
+            what = "neuždaryta eilutės konstanta" if kind == "STRING_LITERAL" else "neuždarytas blokinis komentaras"
+            column = next_match.start() - code.rfind("\n", 0, next_match.start())
+            diagnostics.error("lexer", f"Leksinė klaida eilutėje {line_num}: {what} "
+                              f"(pradžia {line_num}:{column})", line_num, column)
+            return None
+        elif kind == "COMMENT":
             all_tokens.append((kind, value, line_num))
+            line_num += value.count("\n")
         elif kind == "NEATPAŽINTA":
-            print(f"Leksinė klaida eilutėje {line_num}: Neatpažintas simbolis ('{value}')")
-            sys.exit(1)
+            diagnostics.error("lexer", f"Leksinė klaida eilutėje {line_num}: Neatpažintas simbolis ('{value}')", line_num)
+            return None
         else:
+            if kind == "IDENTIFICATOR":
+                # Visi to paties vardo tokenai, AST reikšmės ir simbolių lentelės
+                # raktai - vienas objektas
+                value = identifiers.setdefault(value, value)
             all_tokens.append((kind, value, line_num))
-            print(f"({kind}, '{value}', eil. {line_num})")
-            
-        position = next_match.end()
-        next_match = lexer(test_code, position)
+            if list_tokens:
+                diagnostics.note("lexer", f"({kind}, '{value}', eil. {line_num})")
+            if kind == "STRING_LITERAL":
+                line_num += value.count("\n")
+
+        next_match = lexer(code, position)
+
+    if position < len(code) and next_match is None:
+        diagnostics.error("lexer", f"Leksinė klaida: Neatpažintas simbolis pozicijoje {position}", line_num)
+        return None
+
+    return all_tokens
+
 
-    if position < len(test_code) and next_match is None:
-        print(f"Leksinė klaida: Neatpažintas simbolis pozicijoje {position}")
-        sys.exit(1)
+# Visas analizės kelias: skeneris -> parseris -> semantinė analizė.
+# headers - PrecompiledHeaders; be jo #include eilutės tik užrašomos į AST.
+def compile_source(code, diagnostics, optimize=False, analyzer=None, profiler=None, warn_unused=False,
+                   headers=None):
+    phase = profiler.phase if profiler is not None else null_phase
+    if diagnostics.wants("note"):
+        diagnostics.note("lexer", "##### Leksinė analizė #####")
+    with phase("lexer") as record:
+        all_tokens = tokenize(code, diagnostics)
+        if profiler is not None and all_tokens is not None:
+            record["tokens"] = sum(1 for token in all_tokens if token[0] not in ("NEWLINE", "SKIP", "COMMENT"))
+    if all_tokens is None:
+        return None
 
     # lab3: Parseris
-    print("\n##### Parseris - sintaksinė analizė (AST) ####")
-    parser_instance = Parser(all_tokens)
-    ast = parser_instance.parse()
-    
-    if ast:
-        ast.pretty_print()
-        
-        # lab4: semantinė analizė
-        print("\n--- SEMANTINĖ ANALIZĖ ---")
-        analyzer = SemanticAnalyzer()
-        analyzer.analyze(ast)
+    node_count = None
+    with phase("parser") as record:
+        parser_instance = Parser(all_tokens, diagnostics)
+        ast = parser_instance.parse()
+        if profiler is not None:
+            record["tokens"] = profiler.phases[-1].get("tokens")
+            if ast is not None:
+                node_count = record["nodes"] = count_nodes(ast)
+    if ast is None:
+        diagnostics.note("parser", "Analizavimas nepavyko.")
+        return None
+
+    if analyzer is None:
+        analyzer = SemanticAnalyzer(diagnostics)
+
+    # Antraščių simboliai įtraukiami į analizatoriaus sritį prieš main analizę
+    included = []
+    if headers is not None and any(node.kind == "INCLUDE" for node in ast.children):
+        with phase("headers") as record:
+            included = headers.include_all(ast, analyzer, diagnostics)
+            if profiler is not None:
+                record["symbols"] = len(analyzer.symbol_table)
+
+    # lab4: semantinė analizė
+    if diagnostics.wants("note"):
+        diagnostics.note("semantic", "--- SEMANTINĖ ANALIZĖ ---")
+    with phase("semantic") as record:
+        analyzed = analyzer.analyze(ast)
+        if profiler is not None:
+            record["nodes"] = node_count
+            record["symbols"] = len(analyzer.symbol_table)
+    if not analyzed:
+        return ast
+
+    # Duomenų srauto analizė - prieš optimizaciją, nes ši pakeičia kintamųjų nuorodas
+    if warn_unused:
+        with phase("dataflow") as record:
+            graph = report_unused(ast, diagnostics)
+            if profiler is not None:
+                record["variables"] = len(graph.names)
+
+    # Naudojamos antraščių deklaracijos vykdomos main pradžioje (jau patikrintos,
+    # todėl įterpiamos tik po analizės)
+    if included:
+        main_function = next((c for c in ast.children if c.kind == "FUNCTION_MAIN"), None)
+        if main_function is not None:
+            main_function.children[:0] = headers.declarations(included, main_function.children)
+
+    # Optimizacija: konstantų sulankstymas ir sklaida
+    if optimize:
+        with phase("optimizer") as record:
+            folder = ConstantFolder()
+            folder.optimize(ast)
+            if profiler is not None:
+                record["nodes"] = count_nodes(ast)
+                record["folded_operations"] = folder.folded_operations
+        if diagnostics.wants("note"):
+            diagnostics.note("optimizer", f"Sulankstyta operacijų: {folder.folded_operations}, "
+                                          f"pakeista kintamųjų nuorodų: {folder.propagated_references}.")
+    return ast
+
+
+# Talpykloje saugoma: AST, simbolių lentelė, įspėjimai/klaidos ir baitkodas.
+# Informaciniai pranešimai (tokenų sąrašas) nesaugomi. AST saugomas atskirai
+# supakuotas, nes jo atkūrimas brangiausias, o vykdymui jo nereikia.
+def collect_artifacts(ast, analyzer, diagnostics):
+    program = None
+    backend_error = None
+    if ast is not None and not diagnostics.has_errors():
+        try:
+            program = BytecodeCompiler().compile(ast)
+        except BytecodeError as e:
+            backend_error = (str(e), e.line)
+    return {
+        "ast": pickle.dumps(ast, protocol=pickle.HIGHEST_PROTOCOL),
+        "diagnostics": [(d.severity, d.phase, d.message, d.line, d.column)
+                        for d in diagnostics.diagnostics if d.severity != "note"],
+        "symbols": {name: (entry.data_type, entry.is_const) for name, entry in analyzer.symbol_table.items()},
+        "bytecode": program,
+        "backend_error": backend_error,
+    }
+
+
+def replay_artifacts(artifacts, diagnostics):
+    if diagnostics.wants("note"):
+        diagnostics.note("driver", "Rezultatas paimtas iš talpyklos.")
+    for severity, phase, message, line, column in artifacts["diagnostics"]:
+        diagnostics.report(severity, phase, message, line, column)
+    # backend_error pranešamas tik tada, kai baitkodo iš tikrųjų prireikia (--run --backend vm)
+    return LazyAST(artifacts["ast"]), artifacts["bytecode"]
+
+
+# Išpakuoja talpykloje saugomą AST tik tada, kai jo iš tikrųjų prireikia
+class LazyAST:
+    def __init__(self, data):
+        self._data = data
+        self._node = None
+
+    def load(self):
+        if self._node is None:
+            self._node = pickle.loads(self._data)
+        return self._node
+
+
+# #include <x> antraštės ieškomos šalia šaltinio failo. .pch failai saugomi --pch-dir
+# kataloge arba talpyklos pakatalogyje "pch"; be jų - tik proceso atmintyje.
+def source_headers(file_name, args):
+    pch_directory = args.pch_dir
+    if pch_directory is None and args.cache_dir:
+        pch_directory = os.path.join(args.cache_dir, "pch")
+    return PrecompiledHeaders(os.path.dirname(os.path.abspath(file_name)), pch_directory)
+
+
+# --profile: visas kelias vykdomas be talpyklos, o ataskaita pakeičia įprastą išvestį.
+# Diagnostika išvedama į stderr, kad JSON standartinėje išvestyje liktų švarus.
+def profile_source(code, file_name, diagnostics, args):
+    diagnostics.stream = sys.stderr
+    profiler = PhaseProfiler(file_name, len(code.encode("utf-8")))
+    profiler.start()
+    try:
+        ast = compile_source(code, diagnostics, optimize=args.optimize, profiler=profiler,
+                             warn_unused=args.warn_unused, headers=source_headers(file_name, args))
+        if ast is not None and not diagnostics.has_errors():
+            with profiler.phase("bytecode") as record:
+                record["instructions"] = len(BytecodeCompiler().compile(ast).code) // 2
+    except TooManyErrors as e:
+        diagnostics.note("driver", str(e))
+    except BytecodeError as e:
+        diagnostics.error("backend", str(e), e.line)
+    profiler.stop()
+    diagnostics.flush()
+
+    if args.profile == "-":
+        profiler.write(sys.stdout)
     else:
-        print("\nAnalizavimas nepavyko.")
\ No newline at end of file
+        with open(args.profile, "w", encoding="utf-8") as f:
+            profiler.write(f)
+    return 1 if diagnostics.has_errors() else 0
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Supaprastinto C kodo analizatorius.")
+    arg_parser.add_argument("file", nargs="+",
+                            help="C failo pavadinimas (su --batch - katalogai arba glob šablonai)")
+    arg_parser.add_argument("--format", choices=("text", "jsonl"), default="text",
+                            help="diagnostikos išvedimo formatas")
+    arg_parser.add_argument("--quiet", action="store_true",
+                            help="nieko neišvesti, tik grąžinti išėjimo kodą")
+    arg_parser.add_argument("--max-errors", type=int, default=None,
+                            help="nutraukti analizę po tiek klaidų")
+    arg_parser.add_argument("-O", "--optimize", action="store_true",
+                            help="sulankstyti konstantas po semantinės analizės")
+    arg_parser.add_argument("--warn-unused", action="store_true",
+                            help="įspėti apie nenaudojamus kintamuosius ir priskyrimus (duomenų srauto analizė)")
+    arg_parser.add_argument("--run", action="store_true",
+                            help="sukompiliuoti ir įvykdyti programą")
+    arg_parser.add_argument("--backend", choices=("vm", "python"), default="vm",
+                            help="vykdymo būdas: baitkodo VM arba Python kodo objektas")
+    arg_parser.add_argument("--emit-elf", metavar="FAILAS",
+                            help="sukurti savarankišką Linux x86-64 ELF vykdomąjį failą")
+    arg_parser.add_argument("--cache-dir", metavar="KATALOGAS",
+                            help="naudoti kompiliavimo rezultatų talpyklą šiame kataloge")
+    arg_parser.add_argument("--pch-dir", metavar="KATALOGAS",
+                            help="iš anksto sukompiliuotų antraščių (.pch) katalogas "
+                                 "(numatyta: --cache-dir pakatalogis pch)")
+    arg_parser.add_argument("--ir", action="store_true",
+                            help="atspausdinti optimizuotą SSA tarpinę kalbą ir praėjimų laikus")
+    arg_parser.add_argument("--profile", metavar="FAILAS", nargs="?", const="-",
+                            help="išmatuoti kiekvienos fazės laiką ir atmintį, ataskaitą (JSON) "
+                                 "išvesti į FAILAS arba standartinę išvestį")
+    arg_parser.add_argument("--batch", action="store_true",
+                            help="kompiliuoti daug failų lygiagrečiai, rezultatus išvesti JSON Lines formatu")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=None,
+                            help="procesų skaičius --batch režimu (numatyta: CPU branduolių skaičius)")
+    arg_parser.add_argument("--fail-fast", action="store_true",
+                            help="--batch režimu sustoti po pirmo nepavykusio failo")
+    return arg_parser
+
+
+def main(argv=None):
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    if args.batch:
+        return run_batch(args.file, jobs=args.jobs, fail_fast=args.fail_fast,
+                         optimize=args.optimize, max_errors=args.max_errors, warn_unused=args.warn_unused)
+    if len(args.file) > 1:
+        arg_parser.error("keli failai nurodomi tik su --batch")
+    code_filepath = args.file[0]
+
+    # Nuskaitom kodą
+    try:
+        with open(code_filepath, 'r', encoding='utf-8') as f:
+            test_code = f.read()
+    except FileNotFoundError:
+        print(f"Klaida: Failas '{code_filepath}' nerastas.")
+        return 1
+
+    diagnostics = DiagnosticsEngine(file_name=code_filepath, output_format=args.format,
+                                    quiet=args.quiet, max_errors=args.max_errors)
+    if args.profile:
+        return profile_source(test_code, code_filepath, diagnostics, args)
+    ast = None
+    program = None
+    cache = ArtifactCache(args.cache_dir) if args.cache_dir else None
+    artifacts = None
+    if cache is not None:
+        options = ("O" if args.optimize else "") + ("W" if args.warn_unused else "")
+        cache_key = cache.key(test_code, code_filepath, options=options)
+        artifacts = cache.get(cache_key)
+
+    try:
+        if artifacts is not None:
+            ast, program = replay_artifacts(artifacts, diagnostics)
+        else:
+            analyzer = SemanticAnalyzer(diagnostics)
+            ast = compile_source(test_code, diagnostics, optimize=args.optimize, analyzer=analyzer,
+                                 warn_unused=args.warn_unused, headers=source_headers(code_filepath, args))
+            if cache is not None:
+                cache.put(cache_key, collect_artifacts(ast, analyzer, diagnostics))
+    except TooManyErrors as e:
+        diagnostics.note("driver", str(e)) # nutrauktas rezultatas į talpyklą nededamas
+    diagnostics.flush()
+
+    if diagnostics.has_errors():
+        return 1
+
+    backend_error = artifacts["backend_error"] if artifacts is not None else None
+    # Bytecode VM vykdymui AST nereikalingas, todėl talpyklos atveju jis išpakuojamas tik čia
+    if isinstance(ast, LazyAST) and not (args.run and args.backend == "vm"
+                                         and (program is not None or backend_error is not None)):
+        ast = ast.load()
+
+    if args.emit_elf:
+        try:
+            write_executable(ast, args.emit_elf)
+        except (ElfError, BytecodeError) as e: # printf formatas tikrinamas kaip VM (compile_format)
+            diagnostics.error("backend", str(e), e.line)
+            diagnostics.flush()
+            return 1
+        return 0
+
+    if args.ir:
+        function = IRBuilder().build(ast)
+        pass_manager = PassManager()
+        pass_manager.run(function)
+        print(function.dump())
+        print()
+        print(pass_manager.report())
+        return 0
+
+    # Vykdant programą jos išvestis neturi susimaišyti su AST
+    if args.run:
+        try:
+            if args.backend == "python":
+                return PythonCodeGenerator(code_filepath).compile(ast).run() & 0xFF
+            if program is None:
+                if backend_error is not None:
+                    message, line = backend_error
+                    diagnostics.error("backend", message, line)
+                    diagnostics.flush()
+                    return 1
+                program = BytecodeCompiler().compile(ast)
+        except (BytecodeError, CodegenError) as e:
+            diagnostics.error("backend", str(e), e.line)
+            diagnostics.flush()
+            return 1
+        return VirtualMachine().run(program) & 0xFF
+
+    # AST spausdinamas tik įprastame tekstiniame režime
+    if ast is not None and args.format == "text" and not args.quiet:
+        print("\n##### Parseris - sintaksinė analizė (AST) ####")
+        ast.pretty_print()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+# lab4/dataflow.py Duomenų srauto analizės karkasas virš main sakinių.
+# Kiekvienas sakinys - vienas grafo mazgas. Kintamieji ir apibrėžimai numeruojami
+# tankiai (0, 1, 2, ...), o gen/kill/in/out aibės saugomos Python int bitų aibėmis,
+# todėl sąjunga ir skirtumas vykdomi žodžiais, o ne po vieną elementą.
+# Analizės: gyvumas (atgal), pasiekiantys apibrėžimai (pirmyn), nenaudojami
+# kintamieji ir nenaudojami priskyrimai (dead stores).
+import argparse
+import sys
+import time
+from collections import deque
+
+FORWARD = "forward"
+BACKWARD = "backward"
+
+
+# Bitų aibės elementai didėjimo tvarka
+def bits(bitset):
+    while bitset:
+        lowest = bitset & -bitset
+        yield lowest.bit_length() - 1
+        bitset ^= lowest
+
+
+# Bitų aibė iš elementų. Daug elementų sudedama baitų masyve ir paverčiama int
+# vieną kartą (kartotinis |= didelėms aibėms būtų kvadratinis).
+def bitset(elements):
+    elements = list(elements)
+    if len(elements) <= 16:
+        result = 0
+        for element in elements:
+            result |= 1 << element
+        return result
+    bitmap = bytearray((max(elements) >> 3) + 1)
+    for element in elements:
+        bitmap[element >> 3] |= 1 << (element & 7)
+    return int.from_bytes(bitmap, "little")
+
+
+class FlowNode:
+    __slots__ = ("statement", "line", "defs", "uses", "successors", "predecessors")
+
+    def __init__(self, statement):
+        self.statement = statement
+        self.line = statement.line
+        self.defs = 0 # kintamųjų bitų aibė
+        self.uses = 0
+        self.successors = []
+        self.predecessors = []
+
+
+class FlowGraph:
+    def __init__(self, ast):
+        self.variable_ids = {}
+        self.names = []
+        self.nodes = []
+        self.definitions = [] # apibrėžimo numeris -> mazgo indeksas
+        self._declared_ids = []
+        self._used_ids = set()
+
+        main_function = next((c for c in ast.children if c.kind == "FUNCTION_MAIN"), None) if ast else None
+        statements = main_function.children if main_function is not None else []
+        for statement in statements:
+            self._add_statement(statement)
+        self.declared = bitset(self._declared_ids) # deklaruotų kintamųjų aibė
+        self.used = bitset(self._used_ids) # kada nors skaitomų kintamųjų aibė
+
+        # C poaibyje šakojimosi nėra: sakiniai eina paeiliui, po return - niekas
+        for index, node in enumerate(self.nodes[:-1]):
+            if node.statement.kind != "RETURN":
+                node.successors.append(index + 1)
+                self.nodes[index + 1].predecessors.append(index)
+
+    def variable(self, name):
+        variable_id = self.variable_ids.get(name)
+        if variable_id is None:
+            variable_id = self.variable_ids[name] = len(self.names)
+            self.names.append(name)
+        return variable_id
+
+    def _add_statement(self, statement):
+        node = FlowNode(statement)
+        if statement.kind == "VAR_DECL":
+            assign = next((c for c in statement.children if c.kind == "ASSIGN_VALUE"), None)
+            if assign is not None and assign.children:
+                node.uses = self.expression_uses(assign.children[0])
+            variable_id = self.variable(statement.value)
+            node.defs = 1 << variable_id
+            self._declared_ids.append(variable_id)
+            self.definitions.append(len(self.nodes))
+        elif statement.kind == "PRINTF_CALL":
+            variable_id = self.variable(statement.children[0].value)
+            node.uses = 1 << variable_id
+            self._used_ids.add(variable_id)
+        elif statement.kind == "RETURN" and statement.children:
+            node.uses = self.expression_uses(statement.children[0])
+        self.nodes.append(node)
+
+    # Išraiškoje naudojamų kintamųjų aibė. Išraiškų mazgai bendri (hash-consed),
+    # todėl aplankyti mazgai praleidžiami; apėjimas be rekursijos.
+    def expression_uses(self, root):
+        variable_ids = set()
+        seen = set()
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if node.kind == "VAR_REF":
+                variable_ids.add(self.variable(node.value))
+            stack.extend(node.children)
+        self._used_ids.update(variable_ids)
+        return bitset(variable_ids)
+
+    # Mazgų tvarka, kuria sprendimas konverguoja greičiausiai
+    # (pirmyn - atvirkštinė postorder, atgal - postorder)
+    def order(self, direction):
+        seen = bytearray(len(self.nodes))
+        postorder = []
+        for start in range(len(self.nodes)):
+            if seen[start]:
+                continue
+            seen[start] = 1
+            stack = [(start, iter(self.nodes[start].successors))]
+            while stack:
+                index, successors = stack[-1]
+                for successor in successors:
+                    if not seen[successor]:
+                        seen[successor] = 1
+                        stack.append((successor, iter(self.nodes[successor].successors)))
+                        break
+                else:
+                    stack.pop()
+                    postorder.append(index)
+        return postorder[::-1] if direction == FORWARD else postorder
+
+
+# Bendras iteracinis sprendėjas (sąjungos susiliejimas).
+# gen, kill - bitų aibių sąrašai pagal mazgą; grąžina (in, out) sąrašus.
+def solve(graph, gen, kill, direction, boundary=0):
+    count = len(graph.nodes)
+    before = [0] * count # forward: in, backward: out
+    after = [0] * count
+    order = graph.order(direction)
+    queued = bytearray(b"\x01") * count
+    worklist = deque(order)
+    forward = direction == FORWARD
+    while worklist:
+        index = worklist.popleft()
+        queued[index] = 0
+        node = graph.nodes[index]
+        sources = node.predecessors if forward else node.successors
+        targets = node.successors if forward else node.predecessors
+        # Vieno šaltinio aibė nekopijuojama: tiesiose grandinėse in ir out dalijasi objektais
+        if len(sources) == 1:
+            value = after[sources[0]]
+        else:
+            value = boundary if not sources else 0
+            for source in sources:
+                value |= after[source]
+        before[index] = value
+        result = value & ~kill[index] if kill[index] & value else value
+        if gen[index] & ~result:
+            result |= gen[index]
+        if result != after[index]:
+            after[index] = result
+            for target in targets:
+                if not queued[target]:
+                    queued[target] = 1
+                    worklist.append(target)
+    if forward:
+        return before, after
+    return after, before
+
+
+# Gyvi kintamieji prieš ir po kiekvieno sakinio
+def liveness(graph):
+    gen = [node.uses for node in graph.nodes]
+    kill = [node.defs for node in graph.nodes]
+    return solve(graph, gen, kill, BACKWARD)
+
+
+# Pasiekiantys apibrėžimai (apibrėžimų numerių aibės) prieš ir po kiekvieno sakinio
+def reaching_definitions(graph):
+    count = len(graph.nodes)
+    gen = [0] * count
+    definitions_of = {}
+    for number, index in enumerate(graph.definitions):
+        gen[index] = 1 << number
+        variable_id = graph.nodes[index].defs.bit_length() - 1
+        definitions_of[variable_id] = definitions_of.get(variable_id, 0) | gen[index]
+    kill = [0] * count
+    for index in graph.definitions:
+        kill[index] = definitions_of[graph.nodes[index].defs.bit_length() - 1] & ~gen[index]
+    return solve(graph, gen, kill, FORWARD)
+
+
+# Deklaruoti, bet niekur neskaitomi kintamieji: [(vardas, eilutė)]
+def unused_variables(graph):
+    unused = graph.declared & ~graph.used
+    result = []
+    for index in graph.definitions:
+        node = graph.nodes[index]
+        if node.defs & unused:
+            result.append((node.statement.value, node.line))
+    return result
+
+
+# Priskyrimai, kurių reikšmė niekada neperskaitoma, nors kintamasis naudojamas
+# kitur (pvz., pakartotinė deklaracija): [(vardas, eilutė)]
+def dead_stores(graph, live_out=None):
+    if live_out is None:
+        live_out = liveness(graph)[1]
+    result = []
+    for index in graph.definitions:
+        node = graph.nodes[index]
+        if node.defs & graph.used and not node.defs & live_out[index]:
+            result.append((node.statement.value, node.line))
+    return result
+
+
+# Įspėjimai apie nenaudojamus kintamuosius ir priskyrimus
+def report_unused(ast, diagnostics):
+    graph = FlowGraph(ast)
+    for name, line in unused_variables(graph):
+        diagnostics.warning("dataflow", f"Kintamasis '{name}' deklaruotas, bet nenaudojamas.", line)
+    for name, line in dead_stores(graph):
+        diagnostics.warning("dataflow", f"Kintamajam '{name}' priskirta reikšmė niekur nenaudojama.", line)
+    return graph
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Duomenų srauto analizė C poaibio programai.")
+    arg_parser.add_argument("file", help="C failo pavadinimas")
+    arg_parser.add_argument("--live", action="store_true", help="atspausdinti gyvus kintamuosius po kiekvieno sakinio")
+    args = arg_parser.parse_args(argv)
+
+    from compiler import compile_source
+    from diagnostics import DiagnosticsEngine
+
+    try:
+        with open(args.file, "r", encoding="utf-8") as f:
+            code = f.read()
+    except FileNotFoundError:
+        print(f"Klaida: Failas '{args.file}' nerastas.")
+        return 1
+    diagnostics = DiagnosticsEngine(file_name=args.file, quiet=True)
+    ast = compile_source(code, diagnostics)
+    if ast is None or diagnostics.has_errors():
+        diagnostics.quiet = False
+        diagnostics.flush()
+        return 1
+
+    timings = []
+    start = time.perf_counter()
+    graph = FlowGraph(ast)
+    timings.append(("grafas", time.perf_counter() - start))
+    start = time.perf_counter()
+    live_in, live_out = liveness(graph)
+    timings.append(("gyvumas", time.perf_counter() - start))
+    start = time.perf_counter()
+    reaching_definitions(graph)
+    timings.append(("pasiekiantys apibrėžimai", time.perf_counter() - start))
+    start = time.perf_counter()
+    unused = unused_variables(graph)
+    stores = dead_stores(graph, live_out)
+    timings.append(("nenaudojami", time.perf_counter() - start))
+
+    if args.live:
+        for index, node in enumerate(graph.nodes):
+            names = ", ".join(graph.names[variable_id] for variable_id in bits(live_out[index]))
+            print(f"{node.line:>6} {node.statement.kind:12s} gyvi po: {{{names}}}")
+    for name, line in unused:
+        print(f"{args.file}:{line}: nenaudojamas kintamasis '{name}'")
+    for name, line in stores:
+        print(f"{args.file}:{line}: nenaudojamas priskyrimas kintamajam '{name}'")
+    print(f"Kintamųjų: {len(graph.names)}, sakinių: {len(graph.nodes)}", file=sys.stderr)
+    for name, elapsed in timings:
+        print(f"  {name:26s} {elapsed * 1000:9.2f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
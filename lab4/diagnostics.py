@@ -0,0 +1,115 @@
+# lab4/diagnostics.py Centralizuotas diagnostinių pranešimų rinkėjas.
+# Skeneris, parseris ir semantinis analizatorius pranešimų nebespausdina patys:
+# jie kaupiami buferyje ir išvedami vienu kartu (tekstu arba JSON Lines formatu).
+import json
+import sys
+
+NOTE = "note"
+WARNING = "warning"
+ERROR = "error"
+
+SEVERITY_LEVELS = {NOTE: 0, WARNING: 1, ERROR: 2}
+SEVERITY_LABELS = {NOTE: "info", WARNING: "įspėjimas", ERROR: "klaida"}
+
+
+# Viršytas klaidų limitas - analizė nutraukiama anksčiau laiko
+class TooManyErrors(Exception):
+    pass
+
+
+class Diagnostic:
+    __slots__ = ("severity", "phase", "message", "line", "column")
+
+    def __init__(self, severity, phase, message, line=None, column=None):
+        self.severity = severity
+        self.phase = phase
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def to_dict(self, file_name=None):
+        return {
+            "severity": self.severity,
+            "phase": self.phase,
+            "message": self.message,
+            "file": file_name,
+            "line": self.line,
+            "column": self.column,
+        }
+
+    def format_text(self, file_name=None):
+        # Informaciniai pranešimai išvedami taip, kaip buvo spausdinami anksčiau
+        if self.severity == NOTE:
+            return self.message
+        location = file_name or ""
+        if self.line is not None:
+            location += f":{self.line}"
+            if self.column is not None:
+                location += f":{self.column}"
+        prefix = f"{location}: " if location else ""
+        return f"{prefix}{SEVERITY_LABELS[self.severity]}: {self.message}"
+
+
+class DiagnosticsEngine:
+    def __init__(self, file_name=None, output_format="text", quiet=False,
+                 max_errors=None, min_severity=NOTE, stream=None):
+        if output_format not in ("text", "jsonl"):
+            raise ValueError(f"Nežinomas formatas '{output_format}'")
+        self.file_name = file_name
+        self.output_format = output_format
+        self.quiet = quiet
+        self.max_errors = max_errors
+        # Tyliame režime informaciniai pranešimai net nekuriami
+        self.min_level = SEVERITY_LEVELS[WARNING if quiet else min_severity]
+        self.stream = stream
+        self.diagnostics = []
+        self.counts = {NOTE: 0, WARNING: 0, ERROR: 0}
+        self._flushed = 0
+
+    # Ar verta kviesti report() šio lygio pranešimui (leidžia išvengti formatavimo darbo)
+    def wants(self, severity):
+        return SEVERITY_LEVELS[severity] >= self.min_level
+
+    def report(self, severity, phase, message, line=None, column=None):
+        self.counts[severity] += 1
+        if SEVERITY_LEVELS[severity] >= self.min_level:
+            self.diagnostics.append(Diagnostic(severity, phase, message, line, column))
+
+        if severity == ERROR and self.max_errors is not None and self.counts[ERROR] >= self.max_errors:
+            raise TooManyErrors(f"Pasiektas klaidų limitas ({self.max_errors}).")
+
+    def note(self, phase, message, line=None, column=None):
+        self.report(NOTE, phase, message, line, column)
+
+    def warning(self, phase, message, line=None, column=None):
+        self.report(WARNING, phase, message, line, column)
+
+    def error(self, phase, message, line=None, column=None):
+        self.report(ERROR, phase, message, line, column)
+
+    @property
+    def error_count(self):
+        return self.counts[ERROR]
+
+    def has_errors(self):
+        return self.counts[ERROR] > 0
+
+    def render(self, diagnostics=None):
+        if diagnostics is None:
+            diagnostics = self.diagnostics
+        if self.output_format == "jsonl":
+            lines = [json.dumps(d.to_dict(self.file_name), ensure_ascii=False) for d in diagnostics]
+        else:
+            lines = [d.format_text(self.file_name) for d in diagnostics]
+        return "".join(line + "\n" for line in lines)
+
+    # Išveda dar neišvestus pranešimus vienu rašymu. Tyliame režime - nieko.
+    def flush(self):
+        if self.quiet:
+            return
+        pending = self.diagnostics[self._flushed:]
+        self._flushed = len(self.diagnostics)
+        if pending:
+            stream = self.stream or sys.stdout
+            stream.write(self.render(pending))
+            stream.flush()
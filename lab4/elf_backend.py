@@ -0,0 +1,336 @@
+# lab4/elf_backend.py Savarankiško Linux x86-64 ELF vykdomojo failo generatorius.
+# Mašininis kodas koduojamas rankiniu būdu (gcc ar as nereikia). Aritmetika
+# atliekama 32 bitų registruose, todėl 'int' perpildymas apvyniojamas natūraliai.
+# printf išvestis kaupiama buferyje ir išrašoma 'write' sisteminiu kvietimu,
+# programa baigiama 'exit' su main grąžinta reikšme.
+import os
+import stat
+import struct
+import subprocess
+import sys
+
+from optimizer import wrap_int
+from vm import BytecodeError, compile_format
+
+BASE_ADDRESS = 0x400000
+ELF_HEADER_SIZE = 64
+PROGRAM_HEADER_SIZE = 56
+PROGRAM_HEADER_COUNT = 2 # kodas ir konstantos (R+X), išvesties buferis (R+W)
+CODE_OFFSET = ELF_HEADER_SIZE + PROGRAM_HEADER_SIZE * PROGRAM_HEADER_COUNT
+PAGE_SIZE = 0x1000
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+SYS_WRITE = 1
+SYS_EXIT = 60
+
+
+class ElfError(Exception):
+    line = None # sakinio, kuriame įvyko klaida, eilutė (jei žinoma)
+
+
+# Minimalus asembleris: tik mums reikalingos instrukcijos, žymės ir jų pataisos
+class Assembler:
+    def __init__(self):
+        self.code = bytearray()
+        self.labels = {}
+        self.relative_fixups = []   # (vieta kode, žymė) - rel32 šuoliams/kvietimams
+        self.absolute_fixups = []   # (vieta kode, žymė) - abs32 duomenų adresams
+
+    def emit(self, *chunks):
+        for chunk in chunks:
+            self.code += chunk
+
+    def label(self, name):
+        self.labels[name] = len(self.code)
+
+    def imm32(self, value):
+        return struct.pack("<i", value)
+
+    def _rel32(self, opcode, label):
+        self.emit(opcode)
+        self.relative_fixups.append((len(self.code), label))
+        self.emit(b"\0\0\0\0")
+
+    def call(self, label):
+        self._rel32(b"\xE8", label)
+
+    def jmp(self, label):
+        self._rel32(b"\xE9", label)
+
+    def jcc(self, condition, label):
+        codes = {"z": b"\x0F\x84", "nz": b"\x0F\x85", "be": b"\x0F\x86", "ns": b"\x0F\x89", "le": b"\x0F\x8E"}
+        self._rel32(codes[condition], label)
+
+    # mov r32, <duomenų žymės adresas>; r - registro numeris (0=eax, 3=ebx, 6=esi ...)
+    def mov_address(self, register, label):
+        self.emit(bytes([0xB8 + register]))
+        self.absolute_fixups.append((len(self.code), label))
+        self.emit(b"\0\0\0\0")
+
+    def mov_imm(self, register, value):
+        self.emit(bytes([0xB8 + register]), struct.pack("<I", value & 0xFFFFFFFF))
+
+    def resolve(self, data_labels, data_address):
+        for position, label in self.relative_fixups:
+            target = self.labels[label]
+            struct.pack_into("<i", self.code, position, target - (position + 4))
+        for position, label in self.absolute_fixups:
+            struct.pack_into("<I", self.code, position, data_address + data_labels[label])
+
+
+EAX, ECX, EDX, EBX, ESP, EBP, ESI, EDI = range(8)
+
+
+class ElfGenerator:
+    def __init__(self):
+        self.asm = Assembler()
+        self.slots = {}         # kintamasis -> poslinkis nuo rbp
+        self.data = bytearray()
+        self.data_labels = {}
+        self._strings = {}
+
+    def _string(self, text):
+        encoded = text.encode("utf-8")
+        label = self._strings.get(encoded)
+        if label is None:
+            label = f"str{len(self._strings)}"
+            self._strings[encoded] = label
+            self.data_labels[label] = len(self.data)
+            self.data += encoded
+        return label, len(encoded)
+
+    def generate(self, ast_root_node):
+        main_function = next((c for c in ast_root_node.children if c.kind == "FUNCTION_MAIN"), None)
+        if main_function is None:
+            raise ElfError("Nerasta pagrindinė 'int main()' funkcija.")
+
+        statements = []
+        for statement in main_function.children:
+            statements.append(statement)
+            if statement.kind == "RETURN":
+                break
+        slot_count = sum(1 for s in statements if s.kind == "VAR_DECL")
+        frame_size = (slot_count * 8 + 15) & ~15
+
+        asm = self.asm
+        asm.label("_start")
+        asm.mov_address(EBX, "buffer")                   # rbx - rašymo vieta buferyje
+        asm.emit(b"\x55", b"\x48\x89\xE5")               # push rbp; mov rbp, rsp
+        if frame_size:
+            asm.emit(b"\x48\x81\xEC", asm.imm32(frame_size)) # sub rsp, frame
+
+        returned = False
+        for statement in statements:
+            try:
+                self.visit_statement(statement)
+            except (ElfError, BytecodeError) as e: # printf formatas - compile_format
+                e.line = statement.line
+                raise
+            returned = returned or statement.kind == "RETURN"
+        if not returned:
+            asm.emit(b"\x31\xC0")                        # xor eax, eax
+            self._emit_exit()
+
+        self._emit_runtime()
+        return self._link()
+
+    def visit_statement(self, node):
+        asm = self.asm
+        if node.kind == "VAR_DECL":
+            assign_node = next(c for c in node.children if c.kind == "ASSIGN_VALUE")
+            self.visit_expression(assign_node.children[0])
+            offset = self.slots.setdefault(node.value, -8 * (len(self.slots) + 1))
+            asm.emit(b"\x89\x85", asm.imm32(offset))     # mov [rbp+off], eax
+
+        elif node.kind == "PRINTF_CALL":
+            template = compile_format(node.value)
+            prefix, suffix = (part.replace("%%", "%") for part in template.split("%d", 1))
+            self._emit_write_string(prefix)
+            asm.emit(b"\x8B\x85", asm.imm32(self._slot(node.children[0].value))) # mov eax, [rbp+off]
+            asm.call("write_int")
+            self._emit_write_string(suffix)
+
+        elif node.kind == "RETURN":
+            self.visit_expression(node.children[0])
+            self._emit_exit()
+
+    # Išraiškos rezultatas paliekamas eax registre
+    def visit_expression(self, node):
+        asm = self.asm
+        if node.kind == "LITERAL":
+            asm.mov_imm(EAX, wrap_int(int(node.value)))
+        elif node.kind == "VAR_REF":
+            asm.emit(b"\x8B\x85", asm.imm32(self._slot(node.value)))     # mov eax, [rbp+off]
+        elif node.kind == "BIN_OP":
+            self.visit_expression(node.children[0])
+            asm.emit(b"\x50")                                            # push rax
+            self.visit_expression(node.children[1])
+            asm.emit(b"\x89\xC1", b"\x58")                               # mov ecx, eax; pop rax
+            if node.value == "+":
+                asm.emit(b"\x01\xC8")                                    # add eax, ecx
+            else:
+                asm.emit(b"\x0F\xAF\xC1")                                # imul eax, ecx
+        else:
+            raise ElfError(f"Nežinomas išraiškos mazgas {node.kind}.")
+
+    def _slot(self, name):
+        if name not in self.slots:
+            raise ElfError(f"Kintamasis '{name}' nebuvo apibrėžtas.")
+        return self.slots[name]
+
+    def _emit_write_string(self, text):
+        if not text:
+            return
+        label, length = self._string(text)
+        if length > OUTPUT_BUFFER_SIZE:
+            raise ElfError("printf formatas per ilgas išvesties buferiui.")
+        self.asm.mov_address(ESI, label)
+        self.asm.mov_imm(ECX, length)
+        self.asm.call("write_bytes")
+
+    def _emit_exit(self):
+        asm = self.asm
+        asm.emit(b"\x50")                    # push rax
+        asm.call("flush")
+        asm.emit(b"\x5F")                    # pop rdi
+        asm.mov_imm(EAX, SYS_EXIT)
+        asm.emit(b"\x0F\x05")                # syscall
+
+    # Pagalbinės procedūros: write_bytes(rsi, rcx), write_int(eax), flush()
+    def _emit_runtime(self):
+        asm = self.asm
+
+        asm.label("write_bytes")
+        asm.emit(b"\x48\x8D\x04\x0B")        # lea rax, [rbx+rcx]
+        asm.emit(b"\x48\x3D")                # cmp rax, buffer_end
+        asm.absolute_fixups.append((len(asm.code), "buffer_end"))
+        asm.emit(b"\0\0\0\0")
+        asm.jcc("be", "write_bytes_copy")
+        asm.emit(b"\x56", b"\x51")           # push rsi; push rcx
+        asm.call("flush")
+        asm.emit(b"\x59", b"\x5E")           # pop rcx; pop rsi
+        asm.label("write_bytes_copy")
+        asm.emit(b"\x48\x89\xDF")            # mov rdi, rbx
+        asm.emit(b"\xF3\xA4")                # rep movsb
+        asm.emit(b"\x48\x89\xFB")            # mov rbx, rdi
+        asm.emit(b"\xC3")                    # ret
+
+        asm.label("write_int")
+        asm.emit(b"\x48\x63\xC0")            # movsxd rax, eax
+        asm.emit(b"\x48\x83\xEC\x20")        # sub rsp, 32
+        asm.emit(b"\x48\x8D\x74\x24\x20")    # lea rsi, [rsp+32]
+        asm.emit(b"\x45\x31\xC9")            # xor r9d, r9d
+        asm.emit(b"\x48\x85\xC0")            # test rax, rax
+        asm.jcc("ns", "write_int_digits")
+        asm.emit(b"\x48\xF7\xD8")            # neg rax
+        asm.emit(b"\x41\xB9\x01\0\0\0")      # mov r9d, 1
+        asm.label("write_int_digits")
+        asm.emit(b"\x41\xBA\x0A\0\0\0")      # mov r10d, 10
+        asm.label("write_int_loop")
+        asm.emit(b"\x31\xD2")                # xor edx, edx
+        asm.emit(b"\x49\xF7\xF2")            # div r10
+        asm.emit(b"\x80\xC2\x30")            # add dl, '0'
+        asm.emit(b"\x48\xFF\xCE")            # dec rsi
+        asm.emit(b"\x88\x16")                # mov [rsi], dl
+        asm.emit(b"\x48\x85\xC0")            # test rax, rax
+        asm.jcc("nz", "write_int_loop")
+        asm.emit(b"\x45\x85\xC9")            # test r9d, r9d
+        asm.jcc("z", "write_int_done")
+        asm.emit(b"\x48\xFF\xCE")            # dec rsi
+        asm.emit(b"\xC6\x06\x2D")            # mov byte [rsi], '-'
+        asm.label("write_int_done")
+        asm.emit(b"\x48\x8D\x4C\x24\x20")    # lea rcx, [rsp+32]
+        asm.emit(b"\x48\x29\xF1")            # sub rcx, rsi
+        asm.call("write_bytes")
+        asm.emit(b"\x48\x83\xC4\x20")        # add rsp, 32
+        asm.emit(b"\xC3")                    # ret
+
+        asm.label("flush")
+        asm.mov_address(ESI, "buffer")
+        asm.emit(b"\x48\x89\xDA")            # mov rdx, rbx
+        asm.emit(b"\x48\x29\xF2")            # sub rdx, rsi
+        asm.label("flush_loop")
+        asm.emit(b"\x48\x85\xD2")            # test rdx, rdx
+        asm.jcc("z", "flush_done")
+        asm.mov_imm(EAX, SYS_WRITE)
+        asm.mov_imm(EDI, 1)
+        asm.emit(b"\x0F\x05")                # syscall
+        asm.emit(b"\x48\x85\xC0")            # test rax, rax
+        asm.jcc("le", "flush_done")          # klaida - likusi išvestis prarandama
+        asm.emit(b"\x48\x01\xC6")            # add rsi, rax
+        asm.emit(b"\x48\x29\xC2")            # sub rdx, rax
+        asm.jmp("flush_loop")
+        asm.label("flush_done")
+        asm.mov_address(EBX, "buffer")
+        asm.emit(b"\xC3")                    # ret
+
+    # Sudeda antraštes, kodą ir duomenis. Failas su kodu ir eilučių konstantomis
+    # atvaizduojamas R+X, o buferis (bss) - atskirame R+W segmente nuo kito puslapio,
+    # kad jokia atminties sritis nebūtų kartu rašoma ir vykdoma.
+    def _link(self):
+        data_offset = CODE_OFFSET + len(self.asm.code)
+        file_size = data_offset + len(self.data)
+        buffer_address = (BASE_ADDRESS + file_size + PAGE_SIZE - 1) & ~(PAGE_SIZE - 1)
+        self.data_labels["buffer"] = buffer_address - (BASE_ADDRESS + data_offset)
+        self.data_labels["buffer_end"] = self.data_labels["buffer"] + OUTPUT_BUFFER_SIZE
+
+        self.asm.resolve(self.data_labels, BASE_ADDRESS + data_offset)
+        entry = BASE_ADDRESS + CODE_OFFSET + self.asm.labels["_start"]
+
+        elf_header = struct.pack(
+            "<4sBBBBB7xHHIQQQIHHHHHH",
+            b"\x7fELF", 2, 1, 1, 0, 0,            # 64 bitų, little-endian, versija 1, System V
+            2, 0x3E, 1,                           # ET_EXEC, x86-64, versija
+            entry, ELF_HEADER_SIZE, 0,            # įėjimo taškas, programos antraštės, sekcijų nėra
+            0, ELF_HEADER_SIZE, PROGRAM_HEADER_SIZE, PROGRAM_HEADER_COUNT, 64, 0, 0)
+        code_header = struct.pack(
+            "<IIQQQQQQ",
+            1, 5,                                 # PT_LOAD, R|X
+            0, BASE_ADDRESS, BASE_ADDRESS,
+            file_size, file_size, PAGE_SIZE)
+        buffer_header = struct.pack(
+            "<IIQQQQQQ",
+            1, 6,                                 # PT_LOAD, R|W; faile nieko (bss)
+            0, buffer_address, buffer_address,
+            0, OUTPUT_BUFFER_SIZE, PAGE_SIZE)
+        return elf_header + code_header + buffer_header + bytes(self.asm.code) + bytes(self.data)
+
+
+def write_executable(ast_root_node, output_path):
+    image = ElfGenerator().generate(ast_root_node)
+    with open(output_path, "wb") as f:
+        f.write(image)
+    mode = os.stat(output_path).st_mode
+    os.chmod(output_path, mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return len(image)
+
+
+# Patikrinimas: sugeneruotas failas paleidžiamas ir jo išvestis bei išėjimo kodas
+# palyginami su baitkodo virtualios mašinos rezultatu.
+if __name__ == "__main__":
+    from compiler import compile_source
+    from diagnostics import DiagnosticsEngine
+    from vm import BytecodeCompiler, VirtualMachine
+
+    if len(sys.argv) < 3:
+        print("Naudojimas: python elf_backend.py <c_failas> <išvesties_failas>")
+        sys.exit(1)
+
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        code = f.read()
+    diagnostics = DiagnosticsEngine(file_name=sys.argv[1], quiet=True)
+    ast = compile_source(code, diagnostics)
+    if ast is None or diagnostics.has_errors():
+        print("Analizė nepavyko - paleiskite compiler.py klaidoms pamatyti.")
+        sys.exit(1)
+
+    size = write_executable(ast, sys.argv[2])
+    expected_code, expected_output = VirtualMachine().execute(BytecodeCompiler().compile(ast))
+    result = subprocess.run([os.path.abspath(sys.argv[2])], capture_output=True)
+
+    print(f"Sukurtas {sys.argv[2]} ({size} B)")
+    if result.stdout.decode("utf-8") == expected_output and result.returncode == expected_code & 0xFF:
+        print("Išvestis ir išėjimo kodas sutampa su virtualios mašinos rezultatu.")
+    else:
+        print("NESUTAMPA su virtualios mašinos rezultatu!")
+        sys.exit(1)
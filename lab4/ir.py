@@ -0,0 +1,164 @@
+# lab4/ir.py Trijų adresų tarpinė kalba (IR) SSA forma.
+# C poaibyje nėra šakojimosi, todėl main yra vienas bazinis blokas ir kiekviena
+# instrukcija apibrėžia naują reikšmę (jos numeris = instrukcijos indeksas).
+# Instrukcijos saugomos lygiagrečiuose masyvuose, o ne atskiruose objektuose.
+from array import array
+
+from optimizer import wrap_int
+
+# Instrukcijų tipai
+CONST = 0   # %i = const a
+COPY = 1    # %i = %a
+ADD = 2     # %i = %a + %b
+MUL = 3     # %i = %a * %b
+PRINT = 4   # printf(formats[b], %a)
+RET = 5     # return %a
+
+OP_NAMES = ["const", "copy", "add", "mul", "print", "ret"]
+
+# Kurie operandai yra reikšmių nuorodos
+VALUE_OPERANDS = {
+    CONST: (False, False),
+    COPY: (True, False),
+    ADD: (True, True),
+    MUL: (True, True),
+    PRINT: (True, False),
+    RET: (True, False),
+}
+
+SIDE_EFFECTS = (PRINT, RET)
+
+
+class IRError(Exception):
+    pass
+
+
+class IRFunction:
+    def __init__(self):
+        self.ops = array("B")
+        self.a = array("q")
+        self.b = array("q")
+        self.formats = []
+        self.names = {}   # reikšmės numeris -> C kintamojo vardas (tik atvaizdavimui)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def emit(self, op, a=0, b=0):
+        self.ops.append(op)
+        self.a.append(a)
+        self.b.append(b)
+        return len(self.ops) - 1
+
+    # Perrašo funkciją: operandai nukreipiami į replacement[operandas], o
+    # instrukcijos, kurių keep[i] == 0, išmetamos. Grąžina išmestų skaičių.
+    def rewrite(self, replacement=None, keep=None):
+        ops, a, b = self.ops, self.a, self.b
+        new_ops, new_a, new_b = array("B"), array("q"), array("q")
+        new_index = array("q", [-1]) * len(ops)
+        new_names = {}
+
+        for i in range(len(ops)):
+            if keep is not None and not keep[i]:
+                continue
+            op = ops[i]
+            uses_a, uses_b = VALUE_OPERANDS[op]
+            x, y = a[i], b[i]
+            if uses_a:
+                x = new_index[replacement[x] if replacement is not None else x]
+            if uses_b:
+                y = new_index[replacement[y] if replacement is not None else y]
+            if (uses_a and x < 0) or (uses_b and y < 0):
+                raise IRError(f"Instrukcija %{i} naudoja pašalintą reikšmę.")
+
+            new_index[i] = len(new_ops)
+            new_ops.append(op)
+            new_a.append(x)
+            new_b.append(y)
+            if i in self.names:
+                new_names[new_index[i]] = self.names[i]
+
+        removed = len(ops) - len(new_ops)
+        self.ops, self.a, self.b = new_ops, new_a, new_b
+        self.names = new_names
+        return removed
+
+    def dump(self):
+        lines = []
+        for i in range(len(self.ops)):
+            op, x, y = self.ops[i], self.a[i], self.b[i]
+            if op == CONST:
+                text = f"%{i} = const {x}"
+            elif op == COPY:
+                text = f"%{i} = copy %{x}"
+            elif op in (ADD, MUL):
+                text = f"%{i} = {OP_NAMES[op]} %{x}, %{y}"
+            elif op == PRINT:
+                text = f"print {self.formats[y]}, %{x}"
+            else:
+                text = f"ret %{x}"
+            if i in self.names:
+                text = f"{text:32s} ; {self.names[i]}"
+            lines.append(text)
+        return "\n".join(lines)
+
+
+# AST -> IR. Kintamojo vardas susiejamas su jį apibrėžusios reikšmės numeriu.
+class IRBuilder:
+    def __init__(self):
+        self.function = IRFunction()
+        self.values = {}          # kintamasis -> reikšmės numeris
+        self._format_index = {}
+
+    def build(self, ast_root_node):
+        main_function = next((c for c in ast_root_node.children if c.kind == "FUNCTION_MAIN"), None)
+        if main_function is None:
+            raise IRError("Nerasta pagrindinė 'int main()' funkcija.")
+
+        for statement in main_function.children:
+            self.visit_statement(statement)
+            if statement.kind == "RETURN":
+                return self.function
+
+        self.function.emit(RET, self.function.emit(CONST, 0))
+        return self.function
+
+    def visit_statement(self, node):
+        function = self.function
+        if node.kind == "VAR_DECL":
+            assign_node = next(c for c in node.children if c.kind == "ASSIGN_VALUE")
+            expression = assign_node.children[0]
+            value = self.visit_expression(expression)
+            if expression.kind == "VAR_REF":
+                # 'int x = y;' - kopija, kurią vėliau pašalins kopijų sklaida
+                value = function.emit(COPY, value)
+            self.values[node.value] = value
+            function.names[value] = node.value
+        elif node.kind == "PRINTF_CALL":
+            function.emit(PRINT, self._value(node.children[0].value), self._format(node.value))
+        elif node.kind == "RETURN":
+            function.emit(RET, self.visit_expression(node.children[0]))
+
+    def visit_expression(self, node):
+        if node.kind == "LITERAL":
+            return self.function.emit(CONST, wrap_int(int(node.value)))
+        elif node.kind == "VAR_REF":
+            return self._value(node.value)
+        elif node.kind == "BIN_OP":
+            left = self.visit_expression(node.children[0])
+            right = self.visit_expression(node.children[1])
+            return self.function.emit(ADD if node.value == "+" else MUL, left, right)
+        raise IRError(f"Nežinomas išraiškos mazgas {node.kind}.")
+
+    def _value(self, name):
+        if name not in self.values:
+            raise IRError(f"Kintamasis '{name}' nebuvo apibrėžtas.")
+        return self.values[name]
+
+    def _format(self, literal):
+        index = self._format_index.get(literal)
+        if index is None:
+            index = len(self.function.formats)
+            self.function.formats.append(literal)
+            self._format_index[literal] = index
+        return index
@@ -0,0 +1,47 @@
+# lab4/lexer_benchmark.py Lekserio elgsena su kraštutinėmis įvestimis:
+# neuždarytos eilutės konstantos ir blokiniai komentarai, ilgi literalai,
+# daug pabėgimo sekų. Laikas vienam baitui turi išlikti pastovus didinant
+# įvesties dydį (tiesinis mastelis).
+# Naudojimas: python lexer_benchmark.py [baitų_skaičius ...]
+import sys
+import time
+
+from compiler import tokenize
+from diagnostics import DiagnosticsEngine
+
+PREFIX = "int main() {\n    "
+
+
+# atvejo pavadinimas -> funkcija, kuri sukuria maždaug 'size' baitų įvestį
+CASES = {
+    "neuždaryta konstanta": lambda size: PREFIX + '"' + "a" * size,
+    "neuždarytas komentaras": lambda size: PREFIX + "/*" + "*" * size,
+    "pabėgimai be pabaigos": lambda size: PREFIX + '"' + '\\"' * (size // 2),
+    "ilga konstanta": lambda size: PREFIX + 'printf("' + "x" * size + '%d", a);\n}\n',
+    "daug komentarų": lambda size: PREFIX + "/* * / */ " * (size // 10) + "\n}\n",
+    "daug '/*' eilučių": lambda size: PREFIX + "//\n/*\n" * (size // 6),
+}
+
+
+def best_time(function, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark(size, repeats=3):
+    for name, make_input in CASES.items():
+        code = make_input(size)
+        elapsed = best_time(lambda: tokenize(code, DiagnosticsEngine(quiet=True)), repeats)
+        print(f"{name:24s} {len(code):>10d} {elapsed * 1000:>10.2f} {elapsed / len(code) * 1e9:>8.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    print(f"{'atvejis':24s} {'baitai':>10s} {'laikas ms':>10s} {'ns/baitui':>8s}")
+    for size in sizes:
+        benchmark(size)
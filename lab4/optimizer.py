@@ -0,0 +1,79 @@
+# lab4/optimizer.py Konstantų sulankstymas ir sklaida (constant folding / propagation).
+# Paleidžiama po SemanticAnalyzer, kai klaidų nerasta. AST perrašomas vietoje:
+# pakeičiamos tik sakinių (ASSIGN_VALUE, RETURN) nuorodos į išraiškas, o patys
+# išraiškų mazgai nekeičiami, nes po hash-consing jie gali būti bendri.
+from parser import ASTNode
+
+INT_BITS = 32
+INT_MIN = -(1 << (INT_BITS - 1))
+INT_MAX = (1 << (INT_BITS - 1)) - 1
+INT_MASK = (1 << INT_BITS) - 1
+
+
+# C 'int' perpildymo semantika: rezultatas apvyniojamas į 32 bitų intervalą
+def wrap_int(value):
+    return ((value - INT_MIN) & INT_MASK) + INT_MIN
+
+
+class ConstantFolder:
+    def __init__(self):
+        self.values = {}         # kintamasis -> žinoma reikšmė
+        self.folded_operations = 0
+        self.propagated_references = 0
+        self._literals = {}      # reikšmė -> LITERAL mazgas (taip pat bendri)
+
+    def optimize(self, ast_root_node):
+        main_function = next((c for c in ast_root_node.children if c.kind == "FUNCTION_MAIN"), None)
+        if main_function is None:
+            return ast_root_node
+
+        for statement in main_function.children:
+            if statement.kind == "VAR_DECL":
+                self.visit_var_decl(statement)
+            elif statement.kind == "RETURN" and statement.children:
+                statement.children[0] = self.fold(statement.children[0])
+        return ast_root_node
+
+    # Kalboje kintamasis priskiriamas tik deklaruojant, todėl kiekvienas 'int'
+    # kintamasis yra vieno priskyrimo ir jo reikšmę galima skleisti kaip const.
+    def visit_var_decl(self, node):
+        assign_node = next((c for c in node.children if c.kind == "ASSIGN_VALUE"), None)
+        if assign_node is None or not assign_node.children:
+            return
+
+        expression = self.fold(assign_node.children[0])
+        assign_node.children[0] = expression
+        if expression.kind == "LITERAL":
+            self.values[node.value] = int(expression.value)
+
+    def _literal(self, value):
+        node = self._literals.get(value)
+        if node is None:
+            node = ASTNode("LITERAL", value=str(value))
+            self._literals[value] = node
+        return node
+
+    # Grąžina sulankstytą išraišką; pradinis mazgas nekeičiamas
+    def fold(self, node):
+        if node.kind == "LITERAL":
+            return self._literal(wrap_int(int(node.value)))
+
+        elif node.kind == "VAR_REF":
+            if node.value in self.values:
+                self.propagated_references += 1
+                return self._literal(self.values[node.value])
+            return node
+
+        elif node.kind == "BIN_OP":
+            left = self.fold(node.children[0])
+            right = self.fold(node.children[1])
+            if left.kind == "LITERAL" and right.kind == "LITERAL":
+                self.folded_operations += 1
+                a, b = int(left.value), int(right.value)
+                result = a + b if node.value == "+" else a * b
+                return self._literal(wrap_int(result))
+            if left is node.children[0] and right is node.children[1]:
+                return node
+            return ASTNode("BIN_OP", value=node.value, children=[left, right])
+
+        return node
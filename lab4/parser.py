@@ -2,10 +2,11 @@
 import sys
 
 class ASTNode:
-    def __init__(self, kind, children=None, value=None):
+    def __init__(self, kind, children=None, value=None, line=None):
         self.kind = kind
         self.children = children if children is not None else []
         self.value = value
+        self.line = line # eilutė šaltinyje (išraiškų mazgams nenurodoma, nes jie bendri)
     
     def __repr__(self):
         if self.value is not None:
@@ -22,10 +23,15 @@ class ASTNode:
                 print('    ' * (indent + 1) + str(child))
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, diagnostics=None):
         self.tokens = tokens
         self.current_token_index = 0
         self.errors = []
+        self.diagnostics = diagnostics # DiagnosticsEngine; be jo klaidos spausdinamos
+
+        # Išraiškų mazgų "hash-consing": struktūriškai vienodos išraiškos dalijasi
+        # vienu mazgu, todėl išraiškų medis tampa DAG. Bendri mazgai neturi būti keičiami.
+        self.expression_pool = {}
         
         # Pirmą kartą praleidžiame visus nereikalingus tokenus (tarpus, komentarus, naujas eilutes)
         self._skip_insignificant_tokens() 
@@ -35,16 +41,34 @@ class Parser:
             kind, value, line = self.tokens[self.current_token_index]
             error_msg = f"Sintaksės klaida eilutėje {line}: Lauktas {', '.join(expected_kinds)}, gautas {kind} ('{value}')."
         else:
+            line = None
             error_msg = f"Sintaksės klaida: Lauktas {', '.join(expected_kinds)}, bet pasiekta kodo pabaiga."
         
         self.errors.append(error_msg)
+        if self.diagnostics is not None:
+            self.diagnostics.error("parser", error_msg, line)
         raise SyntaxError(error_msg)
 
+    def _line(self):
+        if self.current_token_index < len(self.tokens):
+            return self.tokens[self.current_token_index][2]
+        return None
+
     def _peek(self):
         if self.current_token_index < len(self.tokens):
             return self.tokens[self.current_token_index][0]
         return "EOF"
     
+    # Grąžina jau sukurtą (kind, value, vaikai) mazgą arba sukuria naują.
+    # Vaikai jau yra unikalūs, todėl raktui užtenka jų tapatybės.
+    def _expression_node(self, kind, value, children=()):
+        key = (kind, value) + tuple(id(child) for child in children)
+        node = self.expression_pool.get(key)
+        if node is None:
+            node = ASTNode(kind, value=value, children=list(children))
+            self.expression_pool[key] = node
+        return node
+
     def _skip_insignificant_tokens(self):
         while self.current_token_index < len(self.tokens):
             kind = self.tokens[self.current_token_index][0]
@@ -63,14 +87,19 @@ class Parser:
         
         self._error([expected_kind])
 
-    def parse(self):
+    # rule: "program" - visa programa, "header" - antraštės failas (žr. parse_header),
+    # "input" - interaktyvi įvestis (žr. parse_input)
+    def parse(self, rule="program"):
+        rules = {"program": self.parse_program, "header": self.parse_header, "input": self.parse_input}
         try:
-            ast = self.parse_program()
+            ast = rules[rule]()
             # Patikrinimas ar pasiekta failo pabaiga po programos
             if self._peek() != "EOF":
                 self._error(["EOF"])
             return ast
         except SyntaxError:
+            if self.diagnostics is not None:
+                return None
             print("\nAnalizavimas baigtas su klaidomis.")
             # Atspausdiname visas surinktas klaidas
             for err in self.errors:
@@ -91,7 +120,38 @@ class Parser:
 
         return ASTNode("PROGRAM", children=elements)
 
+    # Antraštės failas: <header_file> ::= { <include> } { <declaration> }
+    def parse_header(self):
+        elements = []
+        while self._peek() == "INCLUDE_KW":
+            elements.append(self.parse_include_stmt())
+        while self._peek() != "EOF":
+            if self._peek() not in ("CONST_KW", "INT_KW"):
+                self._error(["CONST_KW", "INT_KW", "EOF"])
+            elements.append(self.parse_declaration_assignment())
+        return ASTNode("HEADER", children=elements)
+
+    # Interaktyvi įvestis (REPL):
+    # <input> ::= { <include> } { <statement> } [ <return_statement> ] | <expression> [ ";" ]
+    # Atskira išraiška grąžinama kaip EXPRESSION mazgas.
+    def parse_input(self):
+        if self._peek() in ("IDENTIFICATOR", "NUMBER", "LPAREN"):
+            line = self._line()
+            expression = self.parse_expression()
+            if self._peek() == "SEMICOLON":
+                self._consume("SEMICOLON")
+            return ASTNode("INPUT", children=[ASTNode("EXPRESSION", children=[expression], line=line)])
+        elements = []
+        while self._peek() == "INCLUDE_KW":
+            elements.append(self.parse_include_stmt())
+        while self._peek() != "EOF":
+            elements.append(self.parse_statement())
+            if elements[-1].kind == "RETURN":
+                break # po return įvesties pabaiga (tikrina parse); kitaip deklaracija liktų be VM lizdo
+        return ASTNode("INPUT", children=elements)
+
     def parse_include_stmt(self):
+        line = self._line()
         self._consume("INCLUDE_KW")
         self._consume("LT") # <
         
@@ -99,9 +159,10 @@ class Parser:
         
         self._consume("GT") # >
 
-        return ASTNode("INCLUDE", value=header_name[1])
+        return ASTNode("INCLUDE", value=header_name[1], line=line)
 
     def parse_main_function(self):
+        line = self._line()
         self._consume("INT_KW")
         self._consume("MAIN_KW")
         self._consume("LPAREN")
@@ -112,7 +173,7 @@ class Parser:
 
         self._consume("RBRACE")
 
-        return ASTNode("FUNCTION_MAIN", children=statements, value="int main")
+        return ASTNode("FUNCTION_MAIN", children=statements, value="int main", line=line)
 
     # Taisyklė: <statement_list> ::= <statement>*
     def parse_statement_list(self):
@@ -139,6 +200,7 @@ class Parser:
                 self._error(["CONST_KW", "INT_KW", "RETURN_KW", "PRINTF_KW", "arba RBRACE"])
 
     def parse_declaration_assignment(self):
+        line = self._line()
         is_const = False
         if self._peek() == "CONST_KW":
             self._consume("CONST_KW")
@@ -149,7 +211,8 @@ class Parser:
         
         assignment_node = ASTNode("VAR_DECL", 
                                  value=identifier[1], 
-                                 children=[ASTNode("TYPE", value="int"), ASTNode("CONST", value=str(is_const))])
+                                 children=[ASTNode("TYPE", value="int"), ASTNode("CONST", value=str(is_const))],
+                                 line=line)
         
         self._consume("EQUAL")
         expression = self.parse_expression()
@@ -161,6 +224,7 @@ class Parser:
 
 
     def parse_printf_call(self):
+        line = self._line()
         self._consume("PRINTF_KW")
         self._consume("LPAREN")
         
@@ -174,15 +238,17 @@ class Parser:
         
         return ASTNode("PRINTF_CALL", 
                         value=format_string[1], 
-                        children=[ASTNode("ARGUMENT", value=argument[1])])
+                        children=[ASTNode("ARGUMENT", value=argument[1])],
+                        line=line)
 
     # Taisyklė: <return_stmt> ::= RETURN_KW <expression> SEMICOLON
     def parse_return_stmt(self):
+        line = self._line()
         self._consume("RETURN_KW")
         expression = self.parse_expression()
         self._consume("SEMICOLON")
         
-        return ASTNode("RETURN", children=[expression])
+        return ASTNode("RETURN", children=[expression], line=line)
 
     # --- Išraiškos analizė (Precedencija: * > +) ---
     # Taisyklė: <expression> ::= <term> { (PLUS) <term> } 
@@ -192,7 +258,7 @@ class Parser:
         while self._peek() == "PLUS":
             operator = self._consume(self._peek())
             right = self.parse_term()
-            node = ASTNode("BIN_OP", value=operator[1], children=[node, right])
+            node = self._expression_node("BIN_OP", operator[1], (node, right))
             
         return node
 
@@ -203,7 +269,7 @@ class Parser:
         while self._peek() == "STAR":
             operator = self._consume(self._peek())
             right = self.parse_factor()
-            node = ASTNode("BIN_OP", value=operator[1], children=[node, right])
+            node = self._expression_node("BIN_OP", operator[1], (node, right))
             
         return node
 
@@ -213,11 +279,11 @@ class Parser:
         
         if token_kind == "NUMBER":
             num_token = self._consume("NUMBER")
-            return ASTNode("LITERAL", value=num_token[1])
+            return self._expression_node("LITERAL", num_token[1])
         
         elif token_kind == "IDENTIFICATOR":
             id_token = self._consume("IDENTIFICATOR")
-            return ASTNode("VAR_REF", value=id_token[1])
+            return self._expression_node("VAR_REF", id_token[1])
         
         elif token_kind == "LPAREN":
             self._consume("LPAREN")
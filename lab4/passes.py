@@ -0,0 +1,99 @@
+# lab4/passes.py IR optimizavimo praėjimai ir jų vykdytojas (pass manager).
+# Kiekvienas praėjimas dirba su ir.IRFunction masyvais ir grąžina pakeitimų skaičių.
+import time
+from array import array
+
+from ir import COPY, ADD, MUL, SIDE_EFFECTS, VALUE_OPERANDS
+
+
+# Kopijų sklaida: '%j = copy %i' naudotojai nukreipiami tiesiai į %i.
+# Pačios kopijos lieka ir tampa negyvos - jas pašalina DCE.
+def copy_propagation(function):
+    ops, a = function.ops, function.a
+    replacement = array("q", range(len(ops)))
+    changed = 0
+    for i in range(len(ops)):
+        if ops[i] == COPY:
+            replacement[i] = replacement[a[i]] # grandinės išsprendžiamos, nes %a < %i
+            changed += 1
+    if changed:
+        function.rewrite(replacement=replacement)
+    return changed
+
+
+# Globalus reikšmių numeravimas. Vienintelis bazinis blokas, todėl užtenka
+# vienos maišos lentelės: (op, a, b) -> pirmoji tokią reikšmę apskaičiavusi instrukcija.
+def global_value_numbering(function):
+    ops, a, b = function.ops, function.a, function.b
+    replacement = array("q", range(len(ops)))
+    table = {}
+    changed = 0
+    for i in range(len(ops)):
+        op = ops[i]
+        if op in SIDE_EFFECTS or op == COPY:
+            continue
+        uses_a, uses_b = VALUE_OPERANDS[op]
+        x = replacement[a[i]] if uses_a else a[i]
+        y = replacement[b[i]] if uses_b else b[i]
+        if op in (ADD, MUL) and x > y:
+            x, y = y, x # komutatyvios operacijos
+        key = (op, x, y)
+        existing = table.get(key)
+        if existing is None:
+            table[key] = i
+        else:
+            replacement[i] = existing
+            changed += 1
+    if changed:
+        function.rewrite(replacement=replacement)
+    return changed
+
+
+# Negyvo kodo šalinimas: gyvos tik šalutinį efektą turinčios instrukcijos
+# (print, ret) ir tai, ką jos naudoja. Einama atgal, todėl užtenka vieno praėjimo.
+def dead_code_elimination(function):
+    ops, a, b = function.ops, function.a, function.b
+    live = bytearray(len(ops))
+    for i in range(len(ops) - 1, -1, -1):
+        op = ops[i]
+        if op in SIDE_EFFECTS:
+            live[i] = 1
+        if not live[i]:
+            continue
+        uses_a, uses_b = VALUE_OPERANDS[op]
+        if uses_a:
+            live[a[i]] = 1
+        if uses_b:
+            live[b[i]] = 1
+    removed = len(ops) - sum(live)
+    if removed:
+        function.rewrite(keep=live)
+    return removed
+
+
+DEFAULT_PIPELINE = [
+    ("copy-propagation", copy_propagation),
+    ("gvn", global_value_numbering),
+    ("dce", dead_code_elimination),
+]
+
+
+class PassManager:
+    def __init__(self, passes=None):
+        self.passes = passes if passes is not None else DEFAULT_PIPELINE
+        self.timings = [] # (pavadinimas, sekundės, instrukcijų prieš, po, pakeitimai)
+
+    def run(self, function):
+        for name, optimization in self.passes:
+            before = len(function)
+            start = time.perf_counter()
+            changes = optimization(function)
+            elapsed = time.perf_counter() - start
+            self.timings.append((name, elapsed, before, len(function), changes))
+        return function
+
+    def report(self):
+        lines = [f"{'praėjimas':20s} {'ms':>9s} {'prieš':>9s} {'po':>9s} {'pakeitimai':>11s}"]
+        for name, elapsed, before, after, changes in self.timings:
+            lines.append(f"{name:20s} {elapsed * 1000:9.3f} {before:9d} {after:9d} {changes:11d}")
+        return "\n".join(lines)
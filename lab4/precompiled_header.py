@@ -0,0 +1,374 @@
+# lab4/precompiled_header.py Iš anksto sukompiliuotos antraštės (#include <x>).
+# Antraštė (deklaracijos be main) vieną kartą tokenizuojama, išnagrinėjama ir
+# analizuojama, o tokenai, AST ir eksportuojama simbolių lentelė įrašomi į
+# dvejetainį .pch failą, pavadintą raktu (kompiliatoriaus "pirštų atspaudas" +
+# antraštės turinio maiša + jos įtrauktų antraščių raktai). Pakartotinai failas
+# atvaizduojamas į atmintį (mmap) ir išpakuojamos tik reikalingos sekcijos:
+# simboliai įtraukiami į SemanticAnalyzer be pakartotinės analizės, o vykdymui
+# main pradžioje įterpiamos tik tos deklaracijos, kurias main naudoja (tiesiogiai
+# ar per kitas deklaracijas). Tokenų sekcija saugoma įrankiams.
+#
+# Failo formatas (little-endian):
+#   antraštė: magic[8] "LAB4PCH\0", versija u16, sekcijų skaičius u16, turinio sha256[32]
+#   sekcijų lentelė: pavadinimas[4], poslinkis u64, ilgis u64
+#   sekcijos: DEPS - įtrauktų antraščių vardai, SYMS - (vardas, tipas, const),
+#             TOKS - tokenai, DIDX - (vardas, poslinkis, ilgis, naudojami vardai),
+#             DECL - atskirai supakuoti VAR_DECL mazgai (AST), poslinkiai DIDX - nuo DECL pradžios.
+#   Visos sekcijos, išskyrus DECL, - vienas pickle objektas.
+import argparse
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+
+from artifact_cache import compiler_fingerprint, find_header, include_names
+from diagnostics import DiagnosticsEngine, NOTE
+from parser import Parser
+from semantic_analyzer import SemanticAnalyzer
+
+PCH_MAGIC = b"LAB4PCH\0"
+PCH_FORMAT_VERSION = 1
+PCH_SUFFIX = ".pch"
+FILE_HEADER = struct.Struct("<8sHH32s")
+SECTION_ENTRY = struct.Struct("<4sQQ")
+SECTIONS = (b"DEPS", b"SYMS", b"TOKS", b"DIDX", b"DECL")
+
+
+class PchError(Exception):
+    pass
+
+
+# Išraiškoje (ar sakinyje) naudojami kintamieji
+def expression_names(root):
+    names = {}
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node.kind == "VAR_REF":
+            names[node.value] = None
+        stack.extend(node.children)
+    return tuple(names)
+
+
+# Antraštės rezultatai -> .pch failo baitai
+def serialize_pch(digest, dependencies, symbols, tokens, declarations):
+    index = []
+    blobs = []
+    offset = 0
+    for node in declarations:
+        blob = pickle.dumps(node, protocol=pickle.HIGHEST_PROTOCOL)
+        assign = next((c for c in node.children if c.kind == "ASSIGN_VALUE"), None)
+        uses = expression_names(assign.children[0]) if assign is not None and assign.children else ()
+        index.append((node.value, offset, len(blob), uses))
+        blobs.append(blob)
+        offset += len(blob)
+    payloads = [pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                for value in (dependencies, symbols, tokens, index)]
+    payloads.append(b"".join(blobs))
+    offset = FILE_HEADER.size + SECTION_ENTRY.size * len(SECTIONS)
+    parts = [FILE_HEADER.pack(PCH_MAGIC, PCH_FORMAT_VERSION, len(SECTIONS), digest)]
+    for name, payload in zip(SECTIONS, payloads):
+        parts.append(SECTION_ENTRY.pack(name, offset, len(payload)))
+        offset += len(payload)
+    return b"".join(parts + payloads)
+
+
+class PrecompiledHeader:
+    # buffer - mmap arba bytes; digest - laukiama antraštės turinio maiša
+    def __init__(self, buffer, digest):
+        self._buffer = buffer
+        if len(buffer) < FILE_HEADER.size:
+            raise PchError("per trumpas failas")
+        magic, version, count, stored_digest = FILE_HEADER.unpack_from(buffer, 0)
+        if magic != PCH_MAGIC:
+            raise PchError("ne .pch failas")
+        if version != PCH_FORMAT_VERSION:
+            raise PchError(f"nepalaikoma versija {version}")
+        if stored_digest != digest:
+            raise PchError("antraštės turinys pasikeitė")
+        self.sections = {}
+        for index in range(count):
+            name, offset, length = SECTION_ENTRY.unpack_from(buffer, FILE_HEADER.size + index * SECTION_ENTRY.size)
+            if offset + length > len(buffer):
+                raise PchError(f"sekcija {name!r} už failo ribų")
+            self.sections[name] = (offset, length)
+        for name in SECTIONS:
+            if name not in self.sections:
+                raise PchError(f"trūksta sekcijos {name!r}")
+        # Mažos sekcijos išpakuojamos ir patikrinamos iš karto, kad sugadintas failas
+        # būtų atmestas atvaizdavimo metu, o ne vėliau analizės viduryje
+        self.dependencies = self._load(b"DEPS")
+        self._symbols = self._load(b"SYMS")
+        self._index = self._load(b"DIDX")
+        declarations_size = self.sections[b"DECL"][1]
+        for name, offset, length, uses in self._index:
+            if offset + length > declarations_size:
+                raise PchError(f"deklaracija '{name}' už DECL sekcijos ribų")
+
+    # Išpakuojama tik prašoma sekcija; kiti puslapiai iš disko neskaitomi
+    def _load(self, name, start=0, length=None):
+        offset, size = self.sections[name]
+        offset += start
+        if length is None:
+            length = size - start
+        with memoryview(self._buffer)[offset:offset + length] as view:
+            return pickle.loads(view)
+
+    def symbols(self):
+        return self._symbols
+
+    def tokens(self):
+        return self._load(b"TOKS")
+
+    # Deklaracijų rodyklė: [(vardas, poslinkis, ilgis, naudojami vardai)]
+    def declaration_index(self):
+        return self._index
+
+    # Vienas VAR_DECL mazgas. Kiekvienas kvietimas grąžina naują mazgą,
+    # todėl optimizatorius gali jį keisti.
+    def declaration(self, offset, length):
+        return self._load(b"DECL", offset, length)
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+# Antraščių įtraukimas vienam šaltinio katalogui. pch_directory - kur saugoti .pch
+# failus (None - tik proceso atmintyje). Sukompiliuotos antraštės įsimenamos pagal
+# raktą, todėl daug failų kompiliuojantis procesas kiekvieną antraštę analizuoja kartą.
+class PrecompiledHeaders:
+    def __init__(self, include_directory, pch_directory=None):
+        self.include_directory = include_directory
+        self.pch_directory = pch_directory
+        self.loaded = {}   # raktas -> PrecompiledHeader
+        self.built = 0
+        self.reused = 0
+        if pch_directory:
+            os.makedirs(pch_directory, exist_ok=True)
+
+    def close(self):
+        for header in self.loaded.values():
+            header.close()
+        self.loaded.clear()
+
+    # Sukompiliuota antraštė pagal pavadinimą (None - nerasta arba su klaidomis)
+    def load(self, name, diagnostics, line=None):
+        path = find_header(name, self.include_directory)
+        if path is None:
+            diagnostics.error("header", f"Antraštė '{name}' nerasta.", line)
+            return None
+        return self._header(path, line, diagnostics, [path])
+
+    # Įtraukia visas programos antraštes į analyzer. Grąžina įtrauktas antraštes
+    # (priklausomybės pirmiau); kiekviena antraštė įtraukiama vieną kartą.
+    # merged - jau įtrauktų antraščių kelių aibė (papildoma), jei ji išlieka tarp kvietimų.
+    def include_all(self, program, analyzer, diagnostics, merged=None):
+        included = []
+        if merged is None:
+            merged = set()
+        for node in program.children:
+            if node.kind == "INCLUDE":
+                self._include(node.value, node.line, analyzer, diagnostics, merged, [], included)
+        return included
+
+    # Antraščių deklaracijos, kurių reikia statements vykdymui, įtraukimo tvarka.
+    # Išpakuojami tik naudojami mazgai, todėl didelė antraštė beveik nieko nekainuoja.
+    def declarations(self, included, statements):
+        entries = {}
+        for header in included:
+            for entry in header.declaration_index():
+                entries[entry[0]] = (header, entry)
+        pending = []
+        for statement in statements:
+            pending.extend(expression_names(statement))
+            if statement.kind == "PRINTF_CALL":
+                pending.extend(child.value for child in statement.children)
+        needed = set()
+        while pending:
+            name = pending.pop()
+            if name in needed or name not in entries:
+                continue
+            needed.add(name)
+            pending.extend(entries[name][1][3])
+
+        result = []
+        for header in included:
+            for name, offset, length, _ in header.declaration_index():
+                if name in needed and entries[name][0] is header:
+                    result.append(header.declaration(offset, length))
+        return result
+
+    def _include(self, name, line, analyzer, diagnostics, merged, stack, included):
+        path = find_header(name, self.include_directory)
+        if path is None:
+            diagnostics.note("header", f"Antraštė '{name}' nerasta - praleidžiama.", line)
+            return
+        if path in merged:
+            return
+        if path in stack:
+            chain = " -> ".join(os.path.basename(item) for item in stack + [path])
+            diagnostics.error("header", f"Ciklinis antraščių įtraukimas: {chain}", line)
+            return
+        header = self._header(path, line, diagnostics, stack + [path])
+        if header is None:
+            return
+        for dependency in header.dependencies:
+            self._include(dependency, line, analyzer, diagnostics, merged, stack + [path], included)
+        merged.add(path)
+        analyzer.import_symbols(header.symbols(), name, line)
+        if included is not None:
+            included.append(header)
+
+    # Sukompiliuota antraštė: iš atminties, iš .pch failo arba sukompiliuojama dabar
+    def _header(self, path, line, diagnostics, stack):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            diagnostics.error("header", f"Antraštės '{path}' nepavyko perskaityti: {e}", line)
+            return None
+        digest = hashlib.sha256(data).digest()
+        code = data.decode("utf-8", "replace")
+        key = self._key(path, code, digest, stack)
+        header = self.loaded.get(key)
+        if header is None:
+            header = self._map(key, digest)
+            if header is None:
+                header = self._build(path, code, digest, key, line, diagnostics, stack)
+                if header is None:
+                    return None
+                self.built += 1
+            else:
+                self.reused += 1
+            self.loaded[key] = header
+        return header
+
+    # Raktas priklauso ir nuo įtrauktų antraščių turinio: pasikeitus priklausomybei,
+    # antraštė analizuojama iš naujo. Neįsimenamas tarp kvietimų - ilgai veikiantis
+    # procesas (serveris, REPL) kitaip nepastebėtų pasikeitusios įdėtos antraštės.
+    def _key(self, path, code, digest, stack):
+        hasher = hashlib.sha256()
+        hasher.update(f"{compiler_fingerprint()}:{PCH_FORMAT_VERSION}".encode())
+        hasher.update(digest)
+        for name in include_names(code):
+            dependency = find_header(name, self.include_directory)
+            if dependency is None or dependency in stack:
+                hasher.update(f"{name}:-".encode())
+                continue
+            try:
+                with open(dependency, "rb") as f:
+                    data = f.read()
+            except OSError:
+                hasher.update(f"{name}:-".encode())
+                continue
+            dependency_key = self._key(dependency, data.decode("utf-8", "replace"),
+                                       hashlib.sha256(data).digest(), stack + [dependency])
+            hasher.update(f"{name}:{dependency_key}".encode())
+        return hasher.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.pch_directory, key + PCH_SUFFIX)
+
+    def _map(self, key, digest):
+        if not self.pch_directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None # nėra failo (arba tuščias)
+        try:
+            return PrecompiledHeader(buffer, digest)
+        except (PchError, pickle.UnpicklingError, EOFError, AttributeError, ImportError,
+                IndexError, KeyError, TypeError, ValueError):
+            # Sugadintas ar pasenęs failas perrašomas
+            buffer.close()
+            self._remove(path)
+            return None
+
+    def _build(self, path, code, digest, key, line, diagnostics, stack):
+        # Importuojama čia, nes compiler.py pats importuoja šį modulį
+        from compiler import tokenize
+
+        name = os.path.basename(path)
+        header_diagnostics = DiagnosticsEngine(file_name=path, quiet=True)
+        ast = None
+        tokens = tokenize(code, header_diagnostics)
+        if tokens is not None:
+            ast = Parser(tokens, header_diagnostics).parse("header")
+        analyzer = SemanticAnalyzer(header_diagnostics)
+        if ast is not None:
+            merged = set()
+            for node in ast.children:
+                if node.kind == "INCLUDE":
+                    self._include(node.value, node.line, analyzer, header_diagnostics, merged, stack, None)
+            analyzer.analyze_header(ast)
+
+        if header_diagnostics.has_errors():
+            for d in header_diagnostics.diagnostics:
+                if d.severity != NOTE:
+                    location = f"{name}:{d.line}" if d.line is not None else name
+                    diagnostics.report(d.severity, "header", f"{location}: {d.message}", line)
+            return None
+
+        declarations = [node for node in ast.children if node.kind == "VAR_DECL"]
+        symbols = []
+        for node in declarations:
+            entry = analyzer.symbol_table[node.value]
+            symbols.append((entry.name, entry.data_type, entry.is_const))
+        dependencies = [node.value for node in ast.children if node.kind == "INCLUDE"]
+        data = serialize_pch(digest, dependencies, symbols, tokens, declarations)
+        if self.pch_directory:
+            self._write(key, data)
+            header = self._map(key, digest)
+            if header is not None:
+                return header
+        return PrecompiledHeader(data, digest)
+
+    # Atomiškas įrašymas, kaip ArtifactCache
+    def _write(self, key, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.pch_directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            self._remove(temp_path)
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Iš anksto sukompiliuoti C poaibio antraštę (.pch).")
+    arg_parser.add_argument("header", help="antraštės pavadinimas (kaip #include <...>) arba failas")
+    arg_parser.add_argument("--pch-dir", metavar="KATALOGAS", default=".pch",
+                            help="kur saugoti .pch failus (numatyta: .pch)")
+    args = arg_parser.parse_args(argv)
+
+    headers = PrecompiledHeaders(os.path.dirname(os.path.abspath(args.header)), args.pch_dir)
+    diagnostics = DiagnosticsEngine(file_name=args.header)
+    header = headers.load(os.path.basename(args.header), diagnostics)
+    diagnostics.flush()
+    if header is None:
+        return 1
+
+    print(f"{args.header}: {'sukurta' if headers.built else 'paimta iš .pch'}")
+    for section, (offset, length) in header.sections.items():
+        print(f"  {section.decode().rstrip(chr(0)):5s} {offset:>8d} {length:>8d} B")
+    for symbol_name, data_type, is_const in header.symbols():
+        print(f"  {data_type}{' const' if is_const else ''} {symbol_name}")
+    headers.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
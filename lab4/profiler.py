@@ -0,0 +1,95 @@
+# lab4/profiler.py Kompiliavimo fazių laiko ir atminties matavimas (--profile).
+# Kiekvienai fazei užrašomas sienos ir CPU laikas, tracemalloc atminties
+# smailė (nuo fazės pradžios) ir fazės pabaigoje likusi (išlaikyta) atmintis.
+# Ataskaita - JSON, kad ją būtų galima lyginti tarp versijų.
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+PROFILE_FORMAT_VERSION = 1
+
+
+# Skirtingų AST mazgų skaičius (išraiškų mazgai bendri, todėl skaičiuojama pagal id)
+def count_nodes(root):
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stack.extend(node.children)
+    return len(seen)
+
+
+# Pakaitalas PhaseProfiler.phase, kai profiliuoti nereikia
+def null_phase(name):
+    return nullcontext({})
+
+
+class PhaseProfiler:
+    def __init__(self, file_name=None, source_bytes=0):
+        self.file_name = file_name
+        self.source_bytes = source_bytes
+        self.phases = []
+        self._started_tracing = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+
+    def stop(self):
+        self.total_wall = time.perf_counter() - self._start_wall
+        self.total_cpu = time.process_time() - self._start_cpu
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    # Naudojama: with profiler.phase("lexer") as phase: ...; phase["tokens"] = n
+    @contextmanager
+    def phase(self, name):
+        record = {"phase": name}
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_ms"] = round((time.perf_counter() - wall) * 1000, 3)
+            record["cpu_ms"] = round((time.process_time() - cpu) * 1000, 3)
+            current, peak = tracemalloc.get_traced_memory()
+            record["peak_bytes"] = peak - memory_before
+            record["retained_bytes"] = current - memory_before
+            self._derive(record)
+            self.phases.append(record)
+
+    def _derive(self, record):
+        seconds = record["wall_ms"] / 1000
+        for unit, plural in (("token", "tokens"), ("node", "nodes")):
+            count = record.get(plural)
+            if not count:
+                continue
+            record[f"bytes_per_{unit}"] = round(record["retained_bytes"] / count, 1)
+            record[f"peak_bytes_per_{unit}"] = round(record["peak_bytes"] / count, 1)
+            if seconds:
+                record[f"{plural}_per_s"] = round(count / seconds)
+
+    def report(self):
+        slowest = max(self.phases, key=lambda record: record["wall_ms"], default=None)
+        return {
+            "version": PROFILE_FORMAT_VERSION,
+            "file": self.file_name,
+            "source_bytes": self.source_bytes,
+            "tracemalloc": True, # laikai matuoti su įjungtu tracemalloc (lėčiau nei įprastai)
+            "total_wall_ms": round(self.total_wall * 1000, 3),
+            "total_cpu_ms": round(self.total_cpu * 1000, 3),
+            "slowest_phase": slowest["phase"] if slowest else None,
+            "phases": self.phases,
+        }
+
+    def write(self, stream):
+        stream.write(json.dumps(self.report(), ensure_ascii=False, indent=2) + "\n")
@@ -0,0 +1,140 @@
+# lab4/pycodegen.py Python kodo objekto generatorius C poaibio programoms.
+# Analizuotas AST paverčiamas Python ast.Module su viena funkcija ir vieną kartą
+# sukompiliuojamas su compile(). C kintamieji tampa greitais lokaliais kintamaisiais,
+# printf - rašymu į buferį, o 32 bitų apvyniojimas įterpiamas tik ten, kur
+# intervalų analizė rodo, kad perpildymas įmanomas.
+import ast as pyast
+import sys
+
+from optimizer import INT_MIN, INT_MAX, wrap_int
+from vm import BytecodeError, compile_format
+
+FUNCTION_NAME = "c_main"
+OUTPUT_NAME = "_out"
+
+
+class CodegenError(Exception):
+    line = None # sakinio, kuriame įvyko klaida, eilutė (jei žinoma)
+
+
+class CompiledProgram:
+    def __init__(self, function, module):
+        self.function = function
+        self.module = module # Python AST (derinimui)
+
+    def source(self):
+        return pyast.unparse(self.module)
+
+    # Grąžina (main grąžinta reikšmė, išvesties tekstas)
+    def execute(self):
+        output = []
+        exit_code = self.function(output.append)
+        return exit_code, "".join(output)
+
+    def run(self, stream=None):
+        exit_code, output = self.execute()
+        stream = stream or sys.stdout
+        stream.write(output)
+        stream.flush()
+        return exit_code
+
+
+class PythonCodeGenerator:
+    def __init__(self, file_name="<c-subset>"):
+        self.file_name = file_name
+        self.ranges = {}       # kintamasis -> (min, max) galimos reikšmės
+        self.wraps_inserted = 0
+
+    def compile(self, ast_root_node):
+        main_function = next((c for c in ast_root_node.children if c.kind == "FUNCTION_MAIN"), None)
+        if main_function is None:
+            raise CodegenError("Nerasta pagrindinė 'int main()' funkcija.")
+
+        body = []
+        returned = False
+        for statement in main_function.children:
+            try:
+                body.append(self.visit_statement(statement))
+            except (CodegenError, BytecodeError) as e: # printf formatas - compile_format
+                e.line = statement.line
+                raise
+            if statement.kind == "RETURN":
+                returned = True
+                break
+        if not returned:
+            body.append(pyast.Return(value=pyast.Constant(0)))
+
+        arguments = pyast.arguments(posonlyargs=[], args=[pyast.arg(arg=OUTPUT_NAME)], kwonlyargs=[],
+                                    kw_defaults=[], defaults=[])
+        function = pyast.FunctionDef(name=FUNCTION_NAME, args=arguments, body=body,
+                                     decorator_list=[], returns=None)
+        if "type_params" in pyast.FunctionDef._fields: # Python 3.12+
+            function.type_params = []
+        module = pyast.fix_missing_locations(pyast.Module(body=[function], type_ignores=[]))
+
+        namespace = {}
+        exec(compile(module, self.file_name, "exec"), namespace)
+        return CompiledProgram(namespace[FUNCTION_NAME], module)
+
+    # C vardai gali sutapti su Python raktažodžiais ar kintamaisiais, todėl pervadinami
+    def _local(self, name, context):
+        return pyast.Name(id=f"v_{name}", ctx=context)
+
+    def visit_statement(self, node):
+        if node.kind == "VAR_DECL":
+            assign_node = next(c for c in node.children if c.kind == "ASSIGN_VALUE")
+            value, value_range = self.visit_expression(assign_node.children[0])
+            self.ranges[node.value] = value_range
+            return pyast.Assign(targets=[self._local(node.value, pyast.Store())], value=value)
+
+        elif node.kind == "PRINTF_CALL":
+            template = compile_format(node.value)
+            text = pyast.BinOp(left=pyast.Constant(template), op=pyast.Mod(),
+                               right=self._local(node.children[0].value, pyast.Load()))
+            call = pyast.Call(func=pyast.Name(id=OUTPUT_NAME, ctx=pyast.Load()), args=[text], keywords=[])
+            return pyast.Expr(value=call)
+
+        elif node.kind == "RETURN":
+            value, _ = self.visit_expression(node.children[0])
+            return pyast.Return(value=value)
+
+        raise CodegenError(f"Nežinomas sakinys {node.kind}.")
+
+    # Grąžina (Python išraiška, (min, max)) - intervalas naudojamas perpildymo analizei
+    def visit_expression(self, node):
+        if node.kind == "LITERAL":
+            value = wrap_int(int(node.value))
+            return pyast.Constant(value), (value, value)
+
+        elif node.kind == "VAR_REF":
+            if node.value not in self.ranges:
+                raise CodegenError(f"Kintamasis '{node.value}' nebuvo apibrėžtas.")
+            return self._local(node.value, pyast.Load()), self.ranges[node.value]
+
+        elif node.kind == "BIN_OP":
+            left, (a, b) = self.visit_expression(node.children[0])
+            right, (c, d) = self.visit_expression(node.children[1])
+            if node.value == "+":
+                expression = pyast.BinOp(left=left, op=pyast.Add(), right=right)
+                low, high = a + c, b + d
+            else:
+                expression = pyast.BinOp(left=left, op=pyast.Mult(), right=right)
+                products = (a * c, a * d, b * c, b * d)
+                low, high = min(products), max(products)
+
+            if low == high:
+                # Abu operandai žinomi - rezultatą galima apskaičiuoti iš karto
+                value = wrap_int(low)
+                return pyast.Constant(value), (value, value)
+            if low < INT_MIN or high > INT_MAX:
+                self.wraps_inserted += 1
+                return self._wrap(expression), (INT_MIN, INT_MAX)
+            return expression, (low, high)
+
+        raise CodegenError(f"Nežinomas išraiškos mazgas {node.kind}.")
+
+    # ((x + 2**31) & 0xFFFFFFFF) - 2**31, įterpta tiesiai be funkcijos kvietimo
+    def _wrap(self, expression):
+        shifted = pyast.BinOp(left=expression, op=pyast.Add(), right=pyast.Constant(-INT_MIN))
+        masked = pyast.BinOp(left=shifted, op=pyast.BitAnd(), right=pyast.Constant(INT_MAX - INT_MIN))
+        return pyast.BinOp(left=masked, op=pyast.Add(), right=pyast.Constant(INT_MIN))
@@ -0,0 +1,187 @@
+# lab4/repl.py Interaktyvi C poaibio sesija (REPL).
+# Kiekviena įvestis (deklaracija, sakinys, #include arba atskira išraiška) tokenizuojama,
+# išnagrinėjama ir analizuojama atskirai su tuo pačiu SemanticAnalyzer, o sėkmingi
+# sakiniai iš karto sukompiliuojami į baitkodą ir įvykdomi su išliekančiais VM lizdais.
+# Ankstesnės įvestys iš naujo neapdorojamos, todėl vienos įvesties kaina nepriklauso
+# nuo sesijos ilgio. :undo atšaukia paskutinę deklaraciją (ar #include) atstatydamas
+# simbolių lentelės momentinę kopiją.
+# Naudojimas: python repl.py [--pch-dir KATALOGAS]
+import argparse
+import os
+import sys
+from itertools import islice
+
+from compiler import tokenize
+from diagnostics import DiagnosticsEngine, WARNING
+from parser import ASTNode, Parser
+from precompiled_header import PrecompiledHeaders
+from semantic_analyzer import SemanticAnalyzer
+from vm import BytecodeCompiler, BytecodeError, VirtualMachine
+
+PROMPT = "c> "
+HELP = """Įveskite deklaraciją, printf, return, #include <x> arba išraišką, pvz.:
+  const int k = 7;
+  int a = k * 6;
+  printf("a: %d", a);
+  a + 1
+Komandos:
+  :undo     atšaukti paskutinę deklaraciją ar #include
+  :symbols  kintamieji ir jų reikšmės
+  :help     ši pagalba
+  :quit     baigti"""
+
+
+class ReplSession:
+    def __init__(self, include_directory=None, pch_directory=None, stream=None):
+        self.stream = stream or sys.stdout
+        self.analyzer = SemanticAnalyzer()
+        self.compiler = BytecodeCompiler()
+        self.machine = VirtualMachine()
+        self.slots = []     # kintamųjų reikšmės pagal compiler.slots
+        self.headers = PrecompiledHeaders(include_directory or os.getcwd(), pch_directory)
+        self.merged = set() # įtrauktų antraščių keliai
+        # (momentinė kopija, įvesties įtrauktos antraštės) kiekvienai deklaracijas pridėjusiai įvesčiai
+        self.history = []
+        self.inputs = 0
+        self.failures = 0
+
+    def close(self):
+        self.headers.close()
+
+    def _write(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    # Apdoroja vieną eilutę (komandą arba kodą). Grąžina False, jei sesiją reikia baigti.
+    def command(self, line):
+        text = line.strip()
+        if not text:
+            return True
+        if text in (":quit", ":q"):
+            return False
+        if text == ":help":
+            self._write(HELP + "\n")
+        elif text == ":undo":
+            self.undo()
+        elif text == ":symbols":
+            self.show_symbols()
+        elif text.startswith(":"):
+            self._write(f"Nežinoma komanda '{text}' (:help - komandų sąrašas).\n")
+        elif not self.execute(line):
+            self.failures += 1
+        return True
+
+    # Analizuoja ir įvykdo vieną įvestį. Jei yra klaidų, būsena lieka nepakitusi.
+    def execute(self, code):
+        self.inputs += 1
+        diagnostics = DiagnosticsEngine(file_name=f"<{self.inputs}>", min_severity=WARNING, stream=self.stream)
+        tokens = tokenize(code, diagnostics)
+        node = Parser(tokens, diagnostics).parse("input") if tokens is not None else None
+        if node is None or not node.children:
+            diagnostics.flush()
+            return node is not None
+
+        snapshot = self.analyzer.snapshot()
+        self.analyzer.diagnostics = diagnostics
+        # Ankstesnių įvesčių mazgai nebenaudojami - jų įsiminti tipai tik užimtų atmintį
+        self.analyzer.clear_expression_cache()
+
+        statements = []
+        header_statements = []
+        added_headers = set()
+        if node.children[0].kind == "INCLUDE":
+            # Vėlesnės įvestys gali naudoti bet kurią antraštės deklaraciją, todėl vykdomos visos
+            merged = set(self.merged)
+            for header in self.headers.include_all(node, self.analyzer, diagnostics, merged):
+                header_statements.extend(header.declaration(offset, length)
+                                         for _, offset, length, _ in header.declaration_index())
+            added_headers = merged - self.merged
+        for statement in node.children:
+            if statement.kind == "EXPRESSION":
+                self.analyzer.current_line = statement.line
+                self.analyzer.check_expression_types(statement.children[0])
+                statement = ASTNode("RETURN", children=statement.children, line=statement.line)
+            elif statement.kind != "INCLUDE":
+                self.analyzer.visit_statement(statement)
+            else:
+                continue
+            statements.append(statement)
+        self.analyzer.current_line = None
+
+        program = None
+        if not diagnostics.has_errors():
+            try:
+                program = self.compiler.compile_statements(header_statements + statements)
+            except BytecodeError as e:
+                diagnostics.error("backend", str(e), e.line)
+        if diagnostics.has_errors():
+            self.analyzer.restore(snapshot)
+            diagnostics.flush()
+            return False
+
+        self.merged |= added_headers
+        if self.analyzer.snapshot()[0] != snapshot[0]:
+            self.history.append((snapshot, added_headers))
+        value, output = self.machine.execute(program, self.slots)
+        if output and not output.endswith("\n"):
+            output += "\n"
+        if statements and statements[-1].kind == "RETURN":
+            output += f"= {value}\n"
+        self._write(output)
+        diagnostics.flush()
+        return True
+
+    def undo(self):
+        if not self.history:
+            self._write("Nėra ką atšaukti.\n")
+            return False
+        snapshot, headers = self.history.pop()
+        table = self.analyzer.symbol_table
+        removed = list(islice(reversed(table), len(table) - snapshot[0]))
+        self.analyzer.restore(snapshot)
+        self.merged -= headers
+        self._write(f"Atšaukta: {', '.join(reversed(removed))}\n")
+        return True
+
+    def value(self, name):
+        slot = self.compiler.slots.get(name)
+        return self.slots[slot] if slot is not None and slot < len(self.slots) else None
+
+    def show_symbols(self):
+        lines = []
+        for name, entry in self.analyzer.symbol_table.items():
+            lines.append(f"  {'const ' if entry.is_const else ''}{entry.data_type} {name} = {self.value(name)}")
+        self._write("\n".join(lines) + "\n" if lines else "Simbolių lentelė tuščia.\n")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Interaktyvi C poaibio sesija (REPL).")
+    arg_parser.add_argument("--pch-dir", metavar="KATALOGAS",
+                            help="iš anksto sukompiliuotų antraščių (.pch) katalogas")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        import readline # eilutės redagavimas ir istorija, jei prieinama
+    except ImportError:
+        pass
+
+    session = ReplSession(os.getcwd(), args.pch_dir)
+    interactive = sys.stdin.isatty()
+    if interactive:
+        print("C poaibio REPL. :help - komandos, :quit - pabaiga.")
+    while True:
+        try:
+            line = input(PROMPT if interactive else "")
+        except EOFError:
+            break
+        except KeyboardInterrupt:
+            print()
+            continue
+        if not session.command(line):
+            break
+    session.close()
+    return 1 if session.failures and not interactive else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
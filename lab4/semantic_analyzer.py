@@ -9,15 +9,32 @@ class SymbolEntry:
         self.is_const = is_const
 
 class SemanticAnalyzer:
-    def __init__(self):
+    def __init__(self, diagnostics=None):
         self.symbol_table = {}
         self.errors = []
         self.current_scope = "main" # analizuojame tik main
+        self.current_line = None
+        self.diagnostics = diagnostics # DiagnosticsEngine; be jo pranešimai spausdinami
+
+        # Tipai įsimenami kiekvienam unikaliam (hash-consed) išraiškos mazgui.
+        # Įsimenami tik sėkmingi rezultatai: kintamasis, kurio dar nėra lentelėje,
+        # gali būti deklaruotas vėliau. Deklaracijas išmetantis restore() talpyklą išvalo.
+        self.expression_types = {}
 
     def _error(self, message):
         error_msg = f"[SEMANTINĖ KLAIDA] {message}"
         self.errors.append(error_msg)
-        print(error_msg, file=sys.stderr)
+        if self.diagnostics is not None:
+            self.diagnostics.error("semantic", message, self.current_line)
+        else:
+            print(error_msg, file=sys.stderr)
+
+    def _note(self, message):
+        if self.diagnostics is None:
+            print(message)
+        elif self.diagnostics.wants("note"):
+            self.diagnostics.note("semantic", message, self.current_line)
+
     # pagrindinė funkcija kuri naršo AST 
     def analyze(self, ast_root_node):
         if ast_root_node is None:
@@ -31,18 +48,56 @@ class SemanticAnalyzer:
         else:
             self._error("Nerasta pagrindinė 'int main()' funkcija.")
 
+        self.current_line = None
         if not self.errors:
-            print("Analizė sėkmingai baigta. Klaidų nerasta.")
+            self._note("Analizė sėkmingai baigta. Klaidų nerasta.")
             return True
         else:
-            print(f"Analizė baigta su {len(self.errors)} klaidomis.")
+            self._note(f"Analizė baigta su {len(self.errors)} klaidomis.")
             return False
 
+    # Antraštės failo deklaracijos (be main funkcijos)
+    def analyze_header(self, header_node):
+        for node in header_node.children:
+            if node.kind == "VAR_DECL":
+                self.visit_statement(node)
+        self.current_line = None
+        return not self.errors
+
+    # Iš anksto sukompiliuotos antraštės simboliai įtraukiami be pakartotinės analizės.
+    # symbols - (vardas, tipas, const) trejetai.
+    def import_symbols(self, symbols, origin, line=None):
+        self.current_line = line
+        for name, data_type, is_const in symbols:
+            if name in self.symbol_table:
+                self._error(f"Kintamasis '{name}' iš antraštės '{origin}' jau deklaruotas.")
+                continue
+            self.symbol_table[name] = SymbolEntry(name, data_type, is_const)
+        self.current_line = None
+
+    # Momentinė būsenos kopija (interaktyviam režimui). Simbolių lentelė tik pildoma -
+    # dvigubos deklaracijos atmetamos, - todėl užtenka įsiminti jos dydį: atstatant
+    # išmetami vėliausiai įterpti įrašai (dict išlaiko įterpimo tvarką).
+    def snapshot(self):
+        return len(self.symbol_table), len(self.errors)
+
+    def restore(self, snapshot):
+        table_size, error_count = snapshot
+        while len(self.symbol_table) > table_size:
+            self.symbol_table.popitem()
+        del self.errors[error_count:]
+        # Įsiminti išraiškų tipai galėjo remtis išmestais kintamaisiais
+        self.clear_expression_cache()
+
+    def clear_expression_cache(self):
+        self.expression_types.clear()
+
     def visit_function_main(self, node):
         for statement in node.children:
             self.visit_statement(statement)
 
     def visit_statement(self, node):
+        self.current_line = node.line
         if node.kind == "VAR_DECL":
             self.visit_var_decl(node)
         elif node.kind == "PRINTF_CALL":
@@ -64,7 +119,7 @@ class SemanticAnalyzer:
         
         # Pridedame į simbolių lentelę
         self.symbol_table[name] = SymbolEntry(name, data_type, is_const)
-        print(f"  [SIMBOLIS] Pridėtas: {data_type}{' const' if is_const else ''} {name}")
+        self._note(f"  [SIMBOLIS] Pridėtas: {data_type}{' const' if is_const else ''} {name}")
 
         # ar išraiška naudoja tik deklaruotus kintamuosius
         assign_node = next((c for c in node.children if c.kind == "ASSIGN_VALUE"), None)
@@ -74,6 +129,16 @@ class SemanticAnalyzer:
 
     # Rekursyvi funkcija tipams tikrinti
     def check_expression_types(self, node):
+        cached = self.expression_types.get(node)
+        if cached is not None:
+            return cached
+
+        result = self._check_expression_types(node)
+        if result != "error":
+            self.expression_types[node] = result
+        return result
+
+    def _check_expression_types(self, node):
         if node.kind == "LITERAL":
             # Visi skaičiai laikomi 'int'
             return "int"
@@ -101,7 +166,7 @@ class SemanticAnalyzer:
         
         # Deklaracijos patikrinimas
         if name not in self.symbol_table:
-            self._error(f"Kintamasis '{name}' nebuvo deklaruotas. (Nenaudojamo kintamojo klaida)")
+            self._error(f"Kintamasis '{name}' nebuvo deklaruotas. (Nedeklaruoto kintamojo klaida)")
             return "error"
 
         return self.symbol_table[name].data_type
@@ -0,0 +1,233 @@
+# lab4/vm.py Baitkodo generatorius ir steko virtuali mašina C poaibio programoms.
+# Analizuotas AST (VAR_DECL, BIN_OP, PRINTF_CALL, RETURN) verčiamas į kompaktišką
+# baitkodą: kintamieji pakeičiami lizdų (slot) indeksais, printf formatai
+# išnagrinėjami iš anksto, o vykdymas vyksta viename cikle su buferizuota išvestimi.
+import sys
+from array import array
+
+from optimizer import INT_MIN, INT_MAX, wrap_int
+
+# Operacijų kodai. Kiekviena instrukcija užima dvi vietas: (opkodas, argumentas).
+LOAD_CONST = 0
+LOAD = 1
+STORE = 2
+ADD = 3
+MUL = 4
+PRINT = 5
+RETURN = 6
+
+OPCODE_NAMES = ["LOAD_CONST", "LOAD", "STORE", "ADD", "MUL", "PRINT", "RETURN"]
+
+ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", '"': '"', "0": "\0"}
+
+
+class BytecodeError(Exception):
+    line = None # sakinio, kuriame įvyko klaida, eilutė (jei žinoma)
+
+
+# printf formato eilutę paverčia Python '%' šablonu su viena '%d' vieta
+def compile_format(literal):
+    text = literal[1:-1] if literal.startswith('"') and literal.endswith('"') else literal
+    parts = []
+    placeholders = 0
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            parts.append(ESCAPES.get(text[i + 1], text[i + 1]).replace("%", "%%"))
+            i += 2
+        elif ch == "%":
+            spec = text[i + 1:i + 2]
+            if spec in ("d", "i"):
+                parts.append("%d")
+                placeholders += 1
+            elif spec == "%":
+                parts.append("%%")
+            else:
+                raise BytecodeError(f"Nepalaikomas printf formatas '%{spec}'.")
+            i += 2
+        else:
+            parts.append(ch)
+            i += 1
+
+    if placeholders != 1:
+        raise BytecodeError(f"printf formatas {literal} turi turėti lygiai vieną '%d'.")
+    return "".join(parts)
+
+
+class BytecodeProgram:
+    def __init__(self, code, constants, formats, slot_names):
+        self.code = code              # array('q'): opkodas, argumentas, ...
+        self.constants = constants
+        self.formats = formats
+        self.slot_names = slot_names
+
+    def disassemble(self):
+        lines = []
+        code = self.code
+        for pc in range(0, len(code), 2):
+            op, arg = code[pc], code[pc + 1]
+            if op == LOAD_CONST:
+                detail = f"{self.constants[arg]}"
+            elif op in (LOAD, STORE):
+                detail = f"{arg} ({self.slot_names[arg]})"
+            elif op == PRINT:
+                detail = repr(self.formats[arg])
+            else:
+                detail = ""
+            lines.append(f"{pc // 2:5d} {OPCODE_NAMES[op]:10s} {detail}")
+        return "\n".join(lines)
+
+
+class BytecodeCompiler:
+    def __init__(self):
+        self.code = array("q")
+        self.constants = []
+        self._constant_index = {}
+        self.formats = []
+        self._format_index = {}
+        self.slots = {}               # kintamojo vardas -> lizdo indeksas
+        self.slot_names = []          # lizdo indeksas -> kintamojo vardas
+
+    def _emit(self, op, arg=0):
+        self.code.append(op)
+        self.code.append(arg)
+
+    def _constant(self, value):
+        index = self._constant_index.get(value)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self._constant_index[value] = index
+        return index
+
+    def _format(self, literal):
+        index = self._format_index.get(literal)
+        if index is None:
+            index = len(self.formats)
+            self.formats.append(compile_format(literal))
+            self._format_index[literal] = index
+        return index
+
+    def compile(self, ast_root_node):
+        main_function = next((c for c in ast_root_node.children if c.kind == "FUNCTION_MAIN"), None)
+        if main_function is None:
+            raise BytecodeError("Nerasta pagrindinė 'int main()' funkcija.")
+
+        self._compile_body(main_function.children)
+        return BytecodeProgram(self.code, self.constants, self.formats, list(self.slot_names))
+
+    # Interaktyviam režimui: kiekvieną kartą kompiliuojami tik nauji sakiniai, o lizdai,
+    # konstantos ir formatai išlieka tarp kvietimų. Programa baigiasi RETURN
+    # (0, jei sakinių gale jo nėra); vykdoma su VirtualMachine.execute(program, slots).
+    def compile_statements(self, statements):
+        self.code = array("q")
+        self._compile_body(statements)
+        return BytecodeProgram(self.code, self.constants, self.formats, self.slot_names)
+
+    def _compile_body(self, statements):
+        returned = False
+        for statement in statements:
+            try:
+                self.visit_statement(statement)
+            except BytecodeError as e:
+                e.line = statement.line
+                raise
+            if statement.kind == "RETURN":
+                returned = True
+                break # tolimesni sakiniai nepasiekiami
+
+        if not returned:
+            # C99: main be return grąžina 0
+            self._emit(LOAD_CONST, self._constant(0))
+            self._emit(RETURN)
+
+    def visit_statement(self, node):
+        if node.kind == "VAR_DECL":
+            assign_node = next(c for c in node.children if c.kind == "ASSIGN_VALUE")
+            self.visit_expression(assign_node.children[0])
+            slot = self.slots.get(node.value)
+            if slot is None:
+                slot = self.slots[node.value] = len(self.slot_names)
+                self.slot_names.append(node.value)
+            self._emit(STORE, slot)
+        elif node.kind == "PRINTF_CALL":
+            self._emit(LOAD, self._slot(node.children[0].value))
+            self._emit(PRINT, self._format(node.value))
+        elif node.kind == "RETURN":
+            self.visit_expression(node.children[0])
+            self._emit(RETURN)
+
+    def visit_expression(self, node):
+        if node.kind == "LITERAL":
+            self._emit(LOAD_CONST, self._constant(wrap_int(int(node.value))))
+        elif node.kind == "VAR_REF":
+            self._emit(LOAD, self._slot(node.value))
+        elif node.kind == "BIN_OP":
+            self.visit_expression(node.children[0])
+            self.visit_expression(node.children[1])
+            self._emit(ADD if node.value == "+" else MUL)
+        else:
+            raise BytecodeError(f"Nežinomas išraiškos mazgas {node.kind}.")
+
+    def _slot(self, name):
+        if name not in self.slots:
+            raise BytecodeError(f"Kintamasis '{name}' neturi lizdo (ar praleista semantinė analizė?).")
+        return self.slots[name]
+
+
+class VirtualMachine:
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    # Grąžina (main grąžinta reikšmė, išvesties tekstas). slots - kintamųjų reikšmės,
+    # išliekančios tarp vykdymų (interaktyviame režime); papildomos naujiems lizdams.
+    def execute(self, program, slots=None):
+        code = program.code
+        constants = program.constants
+        formats = program.formats
+        if slots is None:
+            slots = [0] * len(program.slot_names)
+        elif len(slots) < len(program.slot_names):
+            slots.extend([0] * (len(program.slot_names) - len(slots)))
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        output = []
+        write = output.append
+
+        pc = 0
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+            if op == LOAD:
+                push(slots[arg])
+            elif op == LOAD_CONST:
+                push(constants[arg])
+            elif op == STORE:
+                slots[arg] = pop()
+            elif op == ADD:
+                right = pop()
+                result = pop() + right
+                if result > INT_MAX or result < INT_MIN:
+                    result = wrap_int(result)
+                push(result)
+            elif op == MUL:
+                right = pop()
+                result = pop() * right
+                if result > INT_MAX or result < INT_MIN:
+                    result = wrap_int(result)
+                push(result)
+            elif op == PRINT:
+                write(formats[arg] % pop())
+            else: # RETURN
+                return pop(), "".join(output)
+
+    # Vykdo programą ir visą išvestį įrašo vienu kartu
+    def run(self, program):
+        exit_code, output = self.execute(program)
+        stream = self.stream or sys.stdout
+        stream.write(output)
+        stream.flush()
+        return exit_code
@@ -0,0 +1,67 @@
+# lab4/vm_benchmark.py Baitkodo virtualios mašinos ir Python kodo objekto
+# vykdymo greičio matavimas dideliems sugeneruotiems C poaibio failams.
+# Naudojimas: python vm_benchmark.py [sakinių_skaičius ...]
+import random
+import sys
+import time
+
+from compiler import compile_source
+from diagnostics import DiagnosticsEngine
+from vm import BytecodeCompiler, VirtualMachine
+from pycodegen import PythonCodeGenerator
+
+
+# Sugeneruoja main() su 'statements' deklaracijų; kas 100-asis sakinys - printf
+def generate_program(statements, seed=17):
+    rng = random.Random(seed)
+    lines = ["int main() {", "    const int seed = 7;"]
+    names = ["seed"]
+    for i in range(statements):
+        a = rng.choice(names)
+        b = rng.choice(names)
+        name = f"v{i}"
+        lines.append(f"    int {name} = ({a} + {rng.randint(1, 99)}) * {b} + {a};")
+        names.append(name)
+        if i % 100 == 99:
+            lines.append(f'    printf("{name} = %d\\n", {name});')
+    lines.append(f"    return {names[-1]};")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def best_time(function, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def benchmark(statements, repeats=5):
+    code = generate_program(statements)
+    diagnostics = DiagnosticsEngine(quiet=True)
+    front_end_time, ast = best_time(lambda: compile_source(code, diagnostics), 1)
+    if ast is None or diagnostics.has_errors():
+        raise RuntimeError("Sugeneruota programa neišanalizuota.")
+
+    compile_time, program = best_time(lambda: BytecodeCompiler().compile(ast), repeats)
+    vm = VirtualMachine()
+    run_time, _ = best_time(lambda: vm.execute(program), repeats)
+    instructions = len(program.code) // 2
+
+    codegen_time, compiled = best_time(lambda: PythonCodeGenerator().compile(ast), 1)
+    native_time, _ = best_time(compiled.execute, repeats)
+
+    print(f"{statements:>9d} {front_end_time * 1000:>12.1f} {compile_time * 1000:>12.2f} "
+          f"{run_time * 1000:>10.2f} {instructions:>12d} {instructions / run_time / 1e6:>10.2f} "
+          f"{codegen_time * 1000:>12.1f} {native_time * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    print(f"{'sakiniai':>9s} {'analizė ms':>12s} {'baitkodas ms':>12s} {'VM ms':>10s} "
+          f"{'instrukcijos':>12s} {'M instr/s':>10s} {'Python ms':>12s} {'vykd. ms':>10s}")
+    for size in sizes:
+        benchmark(size)
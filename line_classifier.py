@@ -0,0 +1,100 @@
+# .trm failų eilučių klasifikavimas su NumPy prieš skenavimą.
+# Buferis įkeliamas kaip uint8 masyvas; eilučių ribos ir pirmas netuščias
+# kiekvienos eilutės baitas randami vektoriškai. Eilutės skirstomos į tuščias,
+# komentarų ir kodo - per reguliarųjį skenerį leidžiamos tik kodo eilutės.
+# Kitų eilučių paliekamas tik '\n', todėl eilučių numeriai nepasikeičia.
+import numpy as np
+
+from Sample17_skaneris import scanner
+
+LINE_BLANK = 0
+LINE_COMMENT = 1
+LINE_CODE = 2
+
+NEWLINE = ord("\n")
+SEMICOLON = ord(";")
+
+
+class LineTable:
+    def __init__(self, data):
+        self.data = data
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buffer == NEWLINE)
+        size = len(buffer)
+
+        # eilutės [starts[i], ends[i]) be '\n'; paskutinė eilutė gali neturėti '\n'
+        self.starts = np.concatenate(([0], newlines + 1))
+        self.ends = np.append(newlines, size)
+        if len(self.starts) > 1 and self.starts[-1] == size:
+            self.starts = self.starts[:-1]
+            self.ends = self.ends[:-1]
+
+        # Pirmas ne tarpo/tabuliacijos baitas nuo eilutės pradžios ('\n' taip pat tinka)
+        significant = np.flatnonzero((buffer != 32) & (buffer != 9))
+        index = np.searchsorted(significant, self.starts)
+        self.first = np.append(significant, size)[index]
+
+        first_byte = np.append(buffer, NEWLINE)[self.first]
+        self.kinds = np.full(len(self.starts), LINE_CODE, dtype=np.uint8)
+        self.kinds[self.first >= self.ends] = LINE_BLANK
+        self.kinds[(self.first < self.ends) & (first_byte == SEMICOLON)] = LINE_COMMENT
+        self._buffer = buffer
+
+    def counts(self):
+        blank, comment, code = np.bincount(self.kinds, minlength=3)
+        return {"blank": int(blank), "comment": int(comment), "code": int(code)}
+
+    # Tekstas, kuriame tuščių ir komentarų eilučių turinys pašalintas (lieka tik '\n')
+    def code_text(self):
+        line_of_byte = np.zeros(len(self._buffer) + 1, dtype=np.int64)
+        line_of_byte[self.starts[1:]] = 1
+        line_of_byte = np.cumsum(line_of_byte)[:-1]
+        keep = (self.kinds[line_of_byte] == LINE_CODE) | (self._buffer == NEWLINE)
+        return self._buffer[keep].tobytes().decode("utf-8")
+
+    # COMMENT tokenai eilutėms, kuriose yra tik komentaras
+    def comment_tokens(self):
+        data = self.data
+        lines = np.flatnonzero(self.kinds == LINE_COMMENT)
+        return [
+            ("COMMENT", data[first:end].decode("utf-8"), line + 1)
+            for line, first, end in zip(lines.tolist(), self.first[lines].tolist(), self.ends[lines].tolist())
+        ]
+
+
+    # Komentarų eilučių numeriai (nuo 1)
+    def comment_lines(self):
+        return np.flatnonzero(self.kinds == LINE_COMMENT) + 1
+
+
+# Ar eilutės yra praleistų IFNDEF blokų viduje; skipped - surikiuotos (pradžia, pabaiga) poros
+def inside_skipped(lines, skipped):
+    if not skipped:
+        return np.zeros(len(lines), dtype=bool)
+    firsts, lasts = np.array(skipped).T
+    index = np.searchsorted(firsts, lines) - 1
+    found = index >= 0
+    index[~found] = 0
+    return found & (lines > firsts[index]) & (lines < lasts[index])
+
+
+# Skenerio pakaitalas: grąžina tokenus ir eilučių statistiką. Tokenai tokie pat kaip
+# scanner(code, defined), tik be komentarų eilučių COMMENT tokenų, nebent keep_comments
+# (tada jie sukuriami tiesiai iš eilučių lentelės, netokenizuojant).
+# Statistikoje "comment_tokens" - kiek COMMENT tokenų davė komentarų eilutės
+# (neaktyvių IFNDEF blokų komentarai, kaip ir skeneryje, neskaičiuojami).
+def scan(source, defined=None, keep_comments=False):
+    data = source.encode("utf-8") if isinstance(source, str) else bytes(source)
+    table = LineTable(data)
+    skipped = [] if defined is not None else None
+    tokens = scanner(table.code_text(), defined, skipped)
+
+    stats = table.counts()
+    comment_lines = table.comment_lines()
+    active = ~inside_skipped(comment_lines, skipped)
+    stats["comment_tokens"] = int(np.count_nonzero(active))
+    if keep_comments and stats["comment_tokens"]:
+        comments = [token for token, keep in zip(table.comment_tokens(), active.tolist()) if keep]
+        # stabilus rikiavimas pagal eilutę: komentarų eilutėse kitų tokenų nėra
+        tokens = sorted(tokens + comments, key=lambda token: token[2])
+    return tokens, stats
@@ -6,10 +6,11 @@ import re
 
 # AST mazgo bazinė klasė
 class ASTNode:
-    def __init__(self, kind, children=None, value=None):
+    def __init__(self, kind, children=None, value=None, line=None):
         self.kind = kind
         self.children = children if children is not None else []
         self.value = value
+        self.line = line # šaltinio eilutė (tik apibrėžimų mazgams)
     
     def __repr__(self):
         # Šiek tiek sutrumpinta atvaizdavimo funkcija, kad būtų patogiau debug'inti
@@ -26,11 +27,106 @@ class ASTNode:
             else:
                 print('  ' * (indent + 1) + str(child))
 
+# Tingiai analizuojamas mazgas (CONDITIONAL_BLOCK): kol children nepaliesti,
+# saugomas tik kūno tokenų intervalo pradžios indeksas. Kūnas išanalizuojamas pirmą kartą
+# kreipiantis į children; tuo metu rastos klaidos įrašomos į pradinio parserio errors.
+class LazyASTNode(ASTNode):
+    def __init__(self, kind, value, line, parser, body_start):
+        self.kind = kind
+        self.value = value
+        self.line = line
+        self._children = None
+        self._parser = parser
+        self._body_start = body_start
+
+    @property
+    def children(self):
+        if self._children is None:
+            self._children = self._parser.parse_body(self._body_start)
+            self._parser = None
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = children
+        self._parser = None
+
+    @property
+    def materialized(self):
+        return self._children is not None
+
+    def __repr__(self):
+        return f"<{self.kind} val='{self.value}'>"
+
+
+# Medžio indeksas: rūšis -> mazgai (medžio tvarka) ir mazgas -> tėvas.
+# Kuriamas vieną kartą analizės pabaigoje (Parser(..., index=True)).
+# Nematerializuotų tingių mazgų vaikai į indeksą patenka tik po complete().
+class NodeIndex:
+    def __init__(self, root):
+        self.root = root
+        self.build()
+
+    def build(self):
+        self.by_kind = {}
+        self.nodes = []
+        self.parents = {id(self.root): None}
+        self.order = {}
+        self.pending = []
+        self._by_value = {}
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            self.order[id(node)] = len(self.nodes)
+            self.nodes.append(node)
+            self.by_kind.setdefault(node.kind, []).append(node)
+            if isinstance(node, LazyASTNode) and not node.materialized:
+                self.pending.append(node)
+                continue
+            for child in node.children:
+                self.parents[id(child)] = node
+            stack.extend(reversed(node.children))
+
+    # Materializuoja visus tingius mazgus ir perkuria indeksą
+    def complete(self):
+        if not self.pending:
+            return
+        stack = list(self.pending)
+        while stack:
+            stack.extend(stack.pop().children)
+        self.build()
+
+    def kind(self, kind):
+        return self.by_kind.get(kind, [])
+
+    # Rūšies mazgai, kurių reikšmė (be raidžių dydžio) lygi folded_value.
+    # Reikšmių žodynas rūšiai sukuriamas per pirmą užklausą.
+    def kind_with_value(self, kind, folded_value):
+        by_value = self._by_value.get(kind)
+        if by_value is None:
+            by_value = self._by_value[kind] = {}
+            for node in self.kind(kind):
+                if node.value is not None:
+                    by_value.setdefault(str(node.value).casefold(), []).append(node)
+        return by_value.get(folded_value, [])
+
+    def parent(self, node):
+        return self.parents.get(id(node))
+
+
 class Parser:
-    def __init__(self, tokens):
+    # lazy=True: IFNDEF blokų kūnai neanalizuojami iš karto (žr. LazyASTNode). Struktūrų
+    # kūnai analizuojami visada: klaida nario eilutėje atmeta visą STRUCT_DEF elementą,
+    # o tingus mazgas savęs iš tėvo pašalinti negali.
+    # index=True: po parse_program() self.index - medžio NodeIndex
+    def __init__(self, tokens, lazy=False, index=False):
         self.tokens = tokens
         self.current_token_index = 0
         self.errors = []
+        self.lazy = lazy
+        self.build_index = index
+        self.index = None
+        self._block_ends = None
 
     def _error(self, expected_kinds):
         if self.current_token_index < len(self.tokens):
@@ -47,6 +143,12 @@ class Parser:
             return self.tokens[self.current_token_index][0]
         return "EOF" # End Of File
 
+    # Einamojo tokeno eilutė (arba None, jei pasiekta pabaiga)
+    def _line(self):
+        if self.current_token_index < len(self.tokens):
+            return self.tokens[self.current_token_index][2]
+        return None
+
     def _consume(self, expected_kind):
         if self._peek() == expected_kind:
             token = self.tokens[self.current_token_index]
@@ -78,12 +180,23 @@ class Parser:
                 if element:
                     elements.append(element)
             except SyntaxError:
-                # Paprasta klaidų atkūrimo strategija: praleisti dabartinę eilutę/tokeną ir tęsti
-                self.current_token_index = start_index + 1
-                while self._peek() not in ("NEWLINE", "EOF"):
-                    self.current_token_index += 1
+                self._recover(start_index)
         
-        return ASTNode("PROGRAM", children=elements)
+        program = ASTNode("PROGRAM", children=elements)
+        if self.build_index:
+            self.index = NodeIndex(program)
+        return program
+
+    # Paprasta klaidų atkūrimo strategija: praleisti dabartinę eilutę/tokeną ir tęsti.
+    # Skeneris NEWLINE tokenų negrąžina, todėl eilutės pabaigą atpažįstame pagal eilutės numerį.
+    def _recover(self, start_index):
+        self.current_token_index = start_index + 1
+        if start_index >= len(self.tokens):
+            return
+        start_line = self.tokens[start_index][2]
+        while self._peek() not in ("NEWLINE", "EOF") and \
+              self.tokens[self.current_token_index][2] == start_line:
+            self.current_token_index += 1
 
     # <code_element> ::= <comment> | <keyword_definition> | ...
     def parse_code_element(self):
@@ -112,10 +225,9 @@ class Parser:
                self.tokens[self.current_token_index + 1][1].lower() == "struc":
                 return self.parse_structure_definition()
             
-            # 3. <assignment> ::= <identifier> "=" <value>
+            # 3. <assignment> ::= <identifier> ( "=" | "equ" ) <value>
             elif self.current_token_index + 1 < len(self.tokens) and \
-                 self.tokens[self.current_token_index + 1][0] == "OPERATOR" and \
-                 self.tokens[self.current_token_index + 1][1] == "=":
+                 self.tokens[self.current_token_index + 1][1].lower() in ("=", "equ"):
                 return self.parse_assignment()
             
             # Jei neradome nei "struc", nei "=", bandome <keyword_definition>
@@ -126,18 +238,18 @@ class Parser:
             else:
                 return self.parse_keyword_definition()
                 
-        # 4. <keyword_definition> (Jei skeneris atpažįsta teisingai, pvz., "FALSE" yra KEYWORD)
         elif token_kind == "KEYWORD":
-            # Ieškome raktinių žodžių, kurie nėra struc, ends, ifndef, endif (jie turi savo taisykles)
             value = self.tokens[self.current_token_index][1].upper()
+
+            # 4. <conditional_block> ::= "IFNDEF" <identifier> <code_element> "ENDIF"
+            if value == "IFNDEF":
+                return self.parse_conditional_block()
+
+            # 5. <keyword_definition> (Jei skeneris atpažįsta teisingai, pvz., "FALSE" yra KEYWORD)
+            # Ieškome raktinių žodžių, kurie nėra struc, ends, ifndef, endif (jie turi savo taisykles)
             if value in ("FALSE", "TRUE", "NULL", "RECT", "WNDCLASS"):
                  return self.parse_keyword_definition()
         
-        # 5. <conditional_block> ::= "IFNDEF" <identifier> <code_element> "ENDIF"
-        elif token_kind == "KEYWORD":
-            if self.tokens[self.current_token_index][1].upper() == "IFNDEF":
-                return self.parse_conditional_block()
-        
         # 6. <empty_line> (praleista Jūsų BNF, bet būtina realiam apdorojimui)
         elif token_kind == "NEWLINE":
             self._consume("NEWLINE")
@@ -153,7 +265,7 @@ class Parser:
         keyword_token = self._consume("IDENTIFICATOR") # Pritaikyta Jūsų skeneriui (turėtų būti KEYWORD)
         keyword_node = ASTNode("KEYWORD_NAME", value=keyword_token[1])
         
-        node = ASTNode("KEYWORD_DEF", children=[keyword_node])
+        node = ASTNode("KEYWORD_DEF", children=[keyword_node], line=keyword_token[2])
         
         # Tikriname, ar seka <data_type> (dw, dd, db)
         if self._peek() == "KEYWORD": # Jūsų skeneryje dw/dd/db yra KEYWORD
@@ -189,7 +301,6 @@ class Parser:
     def parse_structure_definition(self):
         struct_name_start = self._consume("IDENTIFICATOR")
         self._consume("KEYWORD") # "struc"
-
         members = self.parse_structure_members()
         
         struct_name_end = self._consume("IDENTIFICATOR")
@@ -201,13 +312,16 @@ class Parser:
 
         return ASTNode("STRUCT_DEF", 
                        value=struct_name_start[1], 
-                       children=members)
+                       children=members,
+                       line=struct_name_start[2])
 
     # <structure_members> ::= { <structure_member> }
     def parse_structure_members(self):
         members = []
-        # Tęsti tol, kol nepasiekiam "ends" (FOLLOW(<structure_members>) = "ends" | IDENTIFICATOR)
-        while self._peek() != "KEYWORD" or self.tokens[self.current_token_index][1].lower() != "ends":
+        # Tęsti tol, kol nepasiekiam <identifier> "ends" (FOLLOW(<structure_members>) = IDENTIFICATOR "ends")
+        while not self._at_structure_end():
+            if self._peek() == "EOF":
+                self._error(["ends"])
             members.append(self.parse_structure_member())
             # Po kiekvieno nario turi sekti nauja eilutė, bet BNF to nereikalauja, todėl praleidžiame NEWLINE
             if self._peek() == "NEWLINE":
@@ -215,74 +329,210 @@ class Parser:
             
         return members
 
-    # <structure_member> ::= <identifier> <data_type> [ <constant> ]
+    def _at_structure_end(self):
+        index = self.current_token_index
+        if index + 1 >= len(self.tokens):
+            return False
+        return self.tokens[index][0] == "IDENTIFICATOR" and \
+               self.tokens[index + 1][0] == "KEYWORD" and \
+               self.tokens[index + 1][1].lower() == "ends"
+
+    # <structure_member> ::= [ <identifier> ] <data_type> [ <constant> | <dup_count> "dup" "(" "?" ")" ]
     def parse_structure_member(self):
-        member_name = self._consume("IDENTIFICATOR")
+        # Narys be vardo (pvz., "dd ?") naudojamas vietai rezervuoti
+        member_name = None
+        member_line = self._line()
+        if self._peek() == "IDENTIFICATOR":
+            member_name = self._consume("IDENTIFICATOR")[1]
+        data_type_line = self._line()
         data_type = self.parse_data_type()
         
-        member_node = ASTNode("STRUCT_MEMBER", children=[data_type], value=member_name[1])
+        member_node = ASTNode("STRUCT_MEMBER", children=[data_type], value=member_name, line=member_line)
         
         # [ <constant> ] - neprivaloma dalis (remiamės FOLLOW aibe, kuri yra IDENTIFICATOR arba ends)
-        if self._peek() in ("NUMBER", "OPERATOR") and self.tokens[self.current_token_index][1] == "?":
-            constant_node = self.parse_constant()
-            member_node.children.append(constant_node)
+        token_kind = self._peek()
+        if token_kind == "EOF" or self.tokens[self.current_token_index][2] != data_type_line:
+            return member_node
+        if (token_kind == "OPERATOR" and self.tokens[self.current_token_index][1] == "?") or \
+           (token_kind == "NUMBER" and not self._next_is_dup()):
+            member_node.children.append(self.parse_constant())
+        elif not self._at_structure_end():
+            member_node.children.append(self.parse_dup())
             
         return member_node
 
+    def _next_is_dup(self):
+        index = self.current_token_index + 1
+        return index < len(self.tokens) and self.tokens[index][1].lower() == "dup"
+
+    # <dup> ::= <dup_count> "dup" "(" "?" ")"
+    def parse_dup(self):
+        count = self.parse_dup_count()
+        if self._peek() != "KEYWORD" or self.tokens[self.current_token_index][1].lower() != "dup":
+            self._error(["dup"])
+        self._consume("KEYWORD")
+        self._expect_symbol("(")
+        if self._peek() != "OPERATOR" or self.tokens[self.current_token_index][1] != "?":
+            self._error(["?"])
+        self._consume("OPERATOR")
+        self._expect_symbol(")")
+        return ASTNode("DUP", children=[count])
+
+    # <dup_count> ::= <value> | "size" <identifier> | "(" <dup_count> ")"
+    def parse_dup_count(self):
+        if self._peek() == "SKLIAUSTAI" and self.tokens[self.current_token_index][1] == "(":
+            self._consume("SKLIAUSTAI")
+            count = self.parse_dup_count()
+            self._expect_symbol(")")
+            return count
+        if self._peek() == "IDENTIFICATOR" and self.tokens[self.current_token_index][1].lower() == "size":
+            self._consume("IDENTIFICATOR")
+            struct_name = self._consume("IDENTIFICATOR")
+            return ASTNode("SIZEOF", value=struct_name[1])
+        return self.parse_value()
+
+    def _expect_symbol(self, symbol):
+        if self._peek() != "SKLIAUSTAI" or self.tokens[self.current_token_index][1] != symbol:
+            self._error([symbol])
+        return self._consume("SKLIAUSTAI")
+
     # <conditional_block> ::= "IFNDEF" <identifier> <code_element> "ENDIF"
     def parse_conditional_block(self):
         # PASTABA: BNF apibrėžia 2 alternatyvas, kurios skiriasi tik raidžių dydžiu ("IFNDEF" ir "ifndef")
         # Jūsų skeneris ignoruoja didžiąsias/mažąsias raides (r"\b(struc...|IFNDEF...)\b"), todėl užtenka 1 taisyklės.
-        self._consume("KEYWORD") # IFNDEF
+        guard_index = self.current_token_index
+        guard_line = self._consume("KEYWORD")[2] # IFNDEF
         identifier = self._consume("IDENTIFICATOR")
-        
+
+        body_end = self._block_end(guard_index)
+        if body_end is not None:
+            self.current_token_index = body_end
+            self._consume("KEYWORD") # ENDIF
+            return LazyASTNode("CONDITIONAL_BLOCK", identifier[1], guard_line, self, guard_index + 2)
+
+        block_elements = self.parse_conditional_body()
+        self._consume("KEYWORD") # ENDIF
+
+        return ASTNode("CONDITIONAL_BLOCK", 
+                       value=identifier[1], 
+                       children=block_elements,
+                       line=guard_line)
+
+    # IFNDEF bloko kūnas iki (neįskaitant) ENDIF
+    def parse_conditional_body(self):
         # Rekursyviai kviečiame <code_element> vidinį kodą
         # Čia reikėtų sukurti taisyklę, leidžiančią daug <code_element>
         
         # Čia darome prielaidą, kad IFNDEF viduje gali būti daug <code_element>
         block_elements = []
         while self._peek() != "KEYWORD" or self.tokens[self.current_token_index][1].upper() != "ENDIF":
-            element = self.parse_code_element()
-            if element:
-                block_elements.append(element)
-            
             # Klaidų atveju, kad neužsiciklintume:
             if self.current_token_index >= len(self.tokens):
                 self._error(["ENDIF"])
 
-        self._consume("KEYWORD") # ENDIF
+            # Klaida bloko viduje neturi sugadinti viso bloko
+            start_index = self.current_token_index
+            try:
+                element = self.parse_code_element()
+                if element:
+                    block_elements.append(element)
+            except SyntaxError:
+                self._recover(start_index)
+        return block_elements
 
-        return ASTNode("CONDITIONAL_BLOCK", 
-                       value=identifier[1], 
-                       children=block_elements)
+    ## TINGIOS ANALIZĖS PAGALBINIAI METODAI:
+
+    # Tingiame režime: IFNDEF tokeno indeksas -> jo ENDIF indeksas.
+    # None - analizuoti įprastai (ir pranešti klaidą).
+    def _block_end(self, open_index):
+        if not self.lazy:
+            return None
+        if self._block_ends is None:
+            self._block_ends = self._match_blocks()
+        return self._block_ends.get(open_index)
+
+    # Vienas praėjimas per tokenus: IFNDEF/ENDIF poros su įdėjimu
+    def _match_blocks(self):
+        block_ends = {}
+        open_blocks = []
+        for index, (kind, value, _) in enumerate(self.tokens):
+            if kind != "KEYWORD":
+                continue
+            value = value.lower()
+            if value == "ifndef":
+                open_blocks.append(index)
+            elif value == "endif" and open_blocks:
+                block_ends[open_blocks.pop()] = index
+        return block_ends
+
+    # Tingaus IFNDEF kūno analizė (atskiras parseris, kad nepakistų šio parserio būsena).
+    # Kaip ir įprastame režime, klaidingi elementai praleidžiami, o klaidos įrašomos į
+    # bendrą errors sąrašą. SyntaxError čia galimas tik klaidai praleidus ENDIF eilutę
+    # (klaida jau įrašyta _error) - tada blokas lieka tuščias.
+    def parse_body(self, body_start):
+        parser = Parser(self.tokens, self.lazy)
+        parser.errors = self.errors
+        parser._block_ends = self._block_ends
+        parser.current_token_index = body_start
+        try:
+            return parser.parse_conditional_body()
+        except SyntaxError:
+            return []
     
-    # <assignment> ::= <identifier> "=" <value>
+    # <assignment> ::= <identifier> ( "=" | "equ" ) <value>
     def parse_assignment(self):
         identifier = self._consume("IDENTIFICATOR")
-        self._consume("OPERATOR") # "="
+        if self._peek() == "KEYWORD":
+            self._consume("KEYWORD") # "equ"
+        else:
+            self._consume("OPERATOR") # "="
         value = self.parse_value()
         
         return ASTNode("ASSIGNMENT", 
                        value=identifier[1], 
-                       children=[value])
+                       children=[value],
+                       line=identifier[2])
         
-    # <value> ::= <number> | <identifier> | <data_type>
+    # <value> ::= <operand> { ( "+" | "-" ) <operand> } | <data_type>
     def parse_value(self):
+        if self._peek() == "KEYWORD" and self.tokens[self.current_token_index][1].lower() in ("dw", "dd", "db"):
+            # <data_type> Jūsų skeneryje yra KEYWORD
+            return self.parse_data_type()
+
+        node = self.parse_operand()
+        while self._peek() == "OPERATOR" and self.tokens[self.current_token_index][1] in ("+", "-"):
+            operator = self._consume("OPERATOR")
+            right = self.parse_operand()
+            node = ASTNode("BIN_OP", value=operator[1], children=[node, right])
+        return node
+
+    # <operand> ::= <number> | <hex_number> | <identifier> | "-" <operand> | "(" <value> ")"
+    def parse_operand(self):
         token_kind = self._peek()
         
         if token_kind == "NUMBER":
             num_token = self._consume("NUMBER")
             return ASTNode("VALUE_NUMBER", value=num_token[1])
+
+        elif token_kind == "HEX_NUMBER":
+            hex_token = self._consume("HEX_NUMBER")
+            return ASTNode("VALUE_HEX_NUMBER", value=hex_token[1])
         
         elif token_kind == "IDENTIFICATOR":
             id_token = self._consume("IDENTIFICATOR")
             return ASTNode("VALUE_IDENTIFIER", value=id_token[1])
-        
-        elif token_kind == "KEYWORD" and self.tokens[self.current_token_index][1].lower() in ("dw", "dd", "db"):
-            # <data_type> Jūsų skeneryje yra KEYWORD
-            return self.parse_data_type()
+
+        elif token_kind == "OPERATOR" and self.tokens[self.current_token_index][1] == "-":
+            self._consume("OPERATOR")
+            return ASTNode("NEGATE", children=[self.parse_operand()])
+
+        elif token_kind == "SKLIAUSTAI" and self.tokens[self.current_token_index][1] == "(":
+            self._consume("SKLIAUSTAI")
+            node = self.parse_value()
+            self._expect_symbol(")")
+            return node
             
-        self._error(["NUMBER", "IDENTIFICATOR", "DATA_TYPE"])
+        self._error(["NUMBER", "HEX_NUMBER", "IDENTIFICATOR", "DATA_TYPE"])
 
 
 if __name__ == "__main__":
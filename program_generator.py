@@ -0,0 +1,565 @@
+# Gramatika paremtas atsitiktinių programų generatorius (apkrovos ir greičio testams).
+# Skaito BNF failą (Sample17_BNF.bnf arba lab4/c_subset.bnf) ir išskleidžia
+# taisykles atsitiktinai, ribodamas gylį. Taisyklės, kurių vien gramatika
+# negarantuoja (vardai turi būti apibrėžti prieš naudojant, struktūros pradžios
+# ir pabaigos vardai turi sutapti), pakeičiamos "kabliukais" (hooks).
+# Pagrindinis kartojimas (programos elementai / sakiniai) generuojamas srautu,
+# todėl failo dydis ribojamas tik disku.
+import argparse
+import bisect
+import itertools
+import os
+import random
+import re
+import sys
+import time
+from collections import deque
+
+DEFAULT_MAX_DEPTH = 12
+DEFAULT_REPEAT_MEAN = 1.5
+NAME_WINDOW = 4096         # iš kiek paskutinių vardų renkamasi nuorodoms
+FLUSH_BYTES = 1 << 20
+
+BNF_TOKEN = re.compile(r'\s*(<[A-Za-z0-9_-]+>|::=|"[^"]*"|\'[^\']*\'|[|\[\]{}()])')
+RULE_START = re.compile(r"^\s*<([A-Za-z0-9_-]+)>\s*::=")
+
+
+class GrammarError(Exception):
+    pass
+
+
+# --- Gramatikos skaitymas ---
+# Mazgai: ("lit", tekstas), ("ref", vardas), ("seq", [...]), ("alt", [...]),
+#         ("opt", mazgas), ("rep", mazgas)
+
+def load_grammar(file_name):
+    with open(file_name, "r", encoding="utf-8") as f:
+        return parse_grammar(f.read())
+
+
+def parse_grammar(text):
+    bodies = {}
+    order = []
+    current = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        match = RULE_START.match(line)
+        if match:
+            current = match.group(1)
+            order.append(current)
+            bodies[current] = line[match.end():]
+        elif current is not None:
+            bodies[current] += " " + line # tęsinys (pvz., "| alternatyva")
+
+    rules = {}
+    for name in order:
+        tokens = _tokenize_bnf(bodies[name], name)
+        node, position = _parse_alternatives(tokens, 0, name)
+        if position != len(tokens):
+            raise GrammarError(f"Taisyklėje <{name}>: nelauktas '{tokens[position]}'.")
+        rules[name] = node
+    return rules
+
+
+def _tokenize_bnf(body, rule):
+    tokens = []
+    position = 0
+    body = body.rstrip()
+    while position < len(body):
+        match = BNF_TOKEN.match(body, position)
+        if match is None:
+            raise GrammarError(f"Taisyklėje <{rule}>: neatpažinta '{body[position:].strip()[:20]}'.")
+        tokens.append(match.group(1))
+        position = match.end()
+    return tokens
+
+
+def _parse_alternatives(tokens, position, rule):
+    alternatives = []
+    sequence, position = _parse_sequence(tokens, position, rule)
+    alternatives.append(sequence)
+    while position < len(tokens) and tokens[position] == "|":
+        sequence, position = _parse_sequence(tokens, position + 1, rule)
+        alternatives.append(sequence)
+    return (alternatives[0] if len(alternatives) == 1 else ("alt", alternatives)), position
+
+
+def _parse_sequence(tokens, position, rule):
+    items = []
+    closing = {"[": "]", "{": "}", "(": ")"}
+    while position < len(tokens) and tokens[position] not in ("|", "]", "}", ")"):
+        token = tokens[position]
+        if token in closing:
+            inner, position = _parse_alternatives(tokens, position + 1, rule)
+            if position >= len(tokens) or tokens[position] != closing[token]:
+                raise GrammarError(f"Taisyklėje <{rule}>: trūksta '{closing[token]}'.")
+            items.append({"[": ("opt", inner), "{": ("rep", inner), "(": inner}[token])
+        elif token.startswith("<"):
+            items.append(("ref", token[1:-1]))
+        elif token == "::=":
+            raise GrammarError(f"Taisyklėje <{rule}>: antras '::='.")
+        else:
+            items.append(("lit", token[1:-1]))
+        position += 1
+    return (items[0] if len(items) == 1 else ("seq", items)), position
+
+
+# --- Generatorius ---
+# Gramatika prieš generavimą "sukompiliuojama" į uždarinius (closures): kiekvienas
+# mazgas tampa funkcija f(depth, out), todėl generuojant nereikia tikrinti mazgų tipų.
+
+class ProgramGenerator:
+    def __init__(self, rules, start, stream_rule, seed=17, max_depth=DEFAULT_MAX_DEPTH,
+                 repeat_mean=DEFAULT_REPEAT_MEAN, constant_density=0.5):
+        self.rules = rules
+        self.start = start
+        self.stream_rule = stream_rule
+        self.rng = random.Random(seed)
+        self.max_depth = max_depth
+        self.repeat_mean = repeat_mean
+        self.constant_density = constant_density
+        self.hooks = {}            # "taisyklė" arba "tėvas.taisyklė" -> funkcija(gen, depth, out)
+        self.weights = {}          # taisyklė -> alternatyvų svoriai
+        self.repeat_means = {}     # taisyklė -> vidutinis kartojimų skaičius
+        self.lexical = set()       # taisyklės, kurių išskleidimas - vienas žodis be tarpų
+        self.line_rules = set()    # po šių taisyklių - nauja eilutė
+        self.break_after = set()   # po šių literalų - nauja eilutė
+        self.items = 0             # sugeneruota srauto elementų (sakinių)
+        self._functions = {}       # taisyklė -> sukompiliuota funkcija (be kabliuko)
+        self._bodies = {}          # taisyklė -> jos dešinės pusės funkcija
+
+    def _hooked(self, name):
+        return name in self.hooks or any(key.endswith("." + name) for key in self.hooks)
+
+    # Tikrinamos tik iš pradinės taisyklės pasiekiamos taisyklės, neinant į kabliukus
+    def _check(self):
+        if self.start not in self.rules:
+            raise GrammarError(f"Nėra pradinės taisyklės <{self.start}>.")
+        undefined = set()
+        reachable = {self.start}
+        stack = [self.start]
+        while stack:
+            name = stack.pop()
+            if name in self.hooks:
+                continue
+            if name not in self.rules:
+                if not self._hooked(name):
+                    undefined.add(name)
+                continue
+            for reference in _references(self.rules[name]):
+                if reference not in reachable:
+                    reachable.add(reference)
+                    stack.append(reference)
+        if undefined:
+            raise GrammarError(f"Neapibrėžtos taisyklės: {', '.join(sorted(undefined))}.")
+
+        self._min_depth = self._compute_min_depth()
+        # Taisyklės, per kurias pasiekiamas srauto kartojimas (jos išskleidžiamos srautu)
+        self._stream_parents = set()
+        changed = True
+        while changed:
+            changed = False
+            for name, node in self.rules.items():
+                if name not in self._stream_parents and name not in self.hooks and \
+                   any(ref == self.stream_rule or ref in self._stream_parents for ref in _references(node)):
+                    self._stream_parents.add(name)
+                    changed = True
+
+        self._functions.clear()
+        self._bodies.clear()
+        for name in self.rules: # kabliukai gali naudoti bet kurią taisyklę
+            self._compile_rule(name)
+
+    # Mažiausias gylis, kurio reikia taisyklei išskleisti (kabliukai - terminalai)
+    def _compute_min_depth(self):
+        depth = {name: float("inf") for name in self.rules}
+        for name in self.hooks:
+            depth[name.rsplit(".", 1)[-1]] = 0
+        changed = True
+        while changed:
+            changed = False
+            for name, node in self.rules.items():
+                if name in self.hooks:
+                    continue
+                value = self._node_depth(node, depth) + 1
+                if value < depth[name]:
+                    depth[name] = value
+                    changed = True
+        return depth
+
+    def _node_depth(self, node, depth):
+        kind = node[0]
+        if kind == "lit":
+            return 0
+        if kind == "ref":
+            return depth.get(node[1], 0)
+        if kind == "seq":
+            return max(self._node_depth(item, depth) for item in node[1])
+        if kind == "alt":
+            return min(self._node_depth(item, depth) for item in node[1])
+        return 0 # opt, rep - galima praleisti
+
+    # Kabliukams: išskleidžia taisyklę į žodžių sąrašą 'out'
+    def expand_rule(self, name, depth, out, parent=None):
+        self._reference(parent, name)(depth, out)
+
+    # Kabliukams: išskleidžia taisyklės dešinę pusę, apeinant tos taisyklės kabliuką
+    def expand_body(self, name, depth, out):
+        self._bodies[name](depth + 1, out)
+
+    def _compile_rule(self, name):
+        body = self._compile_node(self.rules[name], name, name)
+        self._bodies[name] = body
+        if name in self.lexical:
+            def function(depth, out):
+                word = []
+                body(depth + 1, word)
+                out.append("".join(word))
+        else:
+            def function(depth, out):
+                body(depth + 1, out)
+        self._functions[name] = self._with_newline(name, function)
+
+    def _with_newline(self, name, function):
+        if name not in self.line_rules:
+            return function
+
+        def with_newline(depth, out):
+            function(depth, out)
+            out.append("\n")
+        return with_newline
+
+    def _reference(self, parent, name):
+        hook = self.hooks.get(f"{parent}.{name}") or self.hooks.get(name)
+        if hook is not None:
+            return self._with_newline(name, lambda depth, out: hook(self, depth, out))
+        functions = self._functions
+        return lambda depth, out: functions[name](depth, out) # rekursija - ieškoma vykdant
+
+    def _compile_node(self, node, rule, weights_rule=None):
+        kind = node[0]
+        rng = self.rng
+        random_value = rng.random
+        max_depth = self.max_depth
+
+        if kind == "lit":
+            text = node[1]
+            if not text:
+                return lambda depth, out: None
+            if text in self.break_after:
+                return lambda depth, out: out.extend((text, "\n"))
+            return lambda depth, out: out.append(text)
+
+        if kind == "ref":
+            return self._reference(rule, node[1])
+
+        if kind == "seq":
+            parts = tuple(self._compile_node(item, rule) for item in node[1])
+
+            def sequence(depth, out):
+                for part in parts:
+                    part(depth, out)
+            return sequence
+
+        if kind == "alt":
+            alternatives = node[1]
+            options = [self._compile_node(item, rule) for item in alternatives]
+            weights = self.weights.get(weights_rule) or [1] * len(options)
+            cumulative = list(itertools.accumulate(weights))
+            total = cumulative[-1]
+            # Gylio riboje - trumpiausiai išsiskleidžiančios (ir neuždraustos) alternatyvos
+            allowed = [i for i, weight in enumerate(weights) if weight > 0]
+            depths = {i: self._node_depth(alternatives[i], self._min_depth) for i in allowed}
+            shallowest = min(depths.values())
+            shallow = [options[i] for i in allowed if depths[i] == shallowest]
+
+            def choose(depth, out):
+                if depth >= max_depth:
+                    shallow[rng.randrange(len(shallow))](depth, out)
+                else:
+                    options[bisect.bisect_right(cumulative, random_value() * total)](depth, out)
+            return choose
+
+        inner = self._compile_node(node[1], rule)
+        if kind == "opt":
+            def optional(depth, out):
+                if depth < max_depth and random_value() < 0.5:
+                    inner(depth, out)
+            return optional
+
+        # rep: geometrinis skirstinys su nurodytu vidurkiu; gylio riboje - 0
+        mean = self.repeat_means.get(rule, self.repeat_mean)
+        continue_probability = mean / (mean + 1)
+
+        def repeat(depth, out):
+            if depth < max_depth:
+                while random_value() < continue_probability:
+                    inner(depth, out)
+        return repeat
+
+    # Generuoja tekstą gabalais. Srauto taisyklės kartojimas tęsiamas, kol
+    # pasiekiamas 'items' elementų arba 'max_bytes' baitų tikslas.
+    def generate(self, items=None, max_bytes=None):
+        self._check()
+        if items is None and max_bytes is None:
+            items = 1000
+        self.items = 0
+        self._written = 0
+        self._pending = 0
+        self._items_target = items
+        self._bytes_target = max_bytes
+        out = []
+        yield from self._stream(("ref", self.start), 0, out, None)
+        if out:
+            if out[-1] != "\n":
+                out.append("\n")
+            yield self._flush(out)
+
+    def _flush(self, out):
+        text = render(out)
+        if not text.endswith("\n"):
+            text += " " # kitas gabalas neturi suklijuoti žodžių
+        self._written += len(text)
+        self._pending = 0
+        out.clear()
+        return text
+
+    def _stream(self, node, depth, out, rule):
+        kind = node[0]
+        if kind == "ref" and node[1] == self.stream_rule:
+            body = self.rules[node[1]]
+            if body[0] != "rep":
+                raise GrammarError(f"Srauto taisyklė <{node[1]}> turi būti {{ ... }} kartojimas.")
+            element = self._compile_node(body[1], node[1])
+            while not self._target_reached():
+                mark = len(out)
+                element(1, out)
+                self.items += 1
+                self._pending += sum(map(len, out[mark:])) + len(out) - mark
+                if self._pending > FLUSH_BYTES:
+                    yield self._flush(out)
+        elif kind == "ref" and node[1] in self._stream_parents:
+            yield from self._stream(self.rules[node[1]], depth + 1, out, node[1])
+        elif kind == "seq":
+            for item in node[1]:
+                yield from self._stream(item, depth, out, rule)
+        else:
+            self._compile_node(node, rule)(depth, out)
+
+    def _target_reached(self):
+        if self._items_target is not None and self.items >= self._items_target:
+            return True
+        if self._bytes_target is not None:
+            return self._written + self._pending >= self._bytes_target
+        return False
+
+
+def _references(node):
+    kind = node[0]
+    if kind == "ref":
+        yield node[1]
+    elif kind in ("seq", "alt"):
+        for item in node[1]:
+            yield from _references(item)
+    elif kind in ("opt", "rep"):
+        yield from _references(node[1])
+
+
+def render(words):
+    return " ".join(words).replace(" \n", "\n").replace("\n ", "\n")
+
+
+# --- Kalbų profiliai ---
+
+class NamePool:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.count = 0
+        self.recent = deque(maxlen=NAME_WINDOW)
+
+    def new(self):
+        self.count += 1
+        return f"{self.prefix}{self.count}"
+
+    def add(self, name):
+        self.recent.append(name)
+
+    def pick(self, rng):
+        return self.recent[rng.randrange(len(self.recent))] if self.recent else None
+
+
+def configure_trm(generator):
+    constants = NamePool("C_")
+    structs = NamePool("S_")
+    members = NamePool("m")
+    guards = NamePool("G_")
+    rng = generator.rng
+
+    def assignment(gen, depth, out):
+        name = constants.new()
+        out.append(name)
+        out.append(rng.choice(("=", "equ")))
+        gen.expand_rule("value", depth, out, "assignment")
+        constants.add(name) # tik po reikšmės, todėl ciklų nebūna
+
+    def structure_definition(gen, depth, out):
+        name = structs.new()
+        out.extend((name, "struc", "\n"))
+        gen.expand_rule("structure_members", depth, out, "structure_definition")
+        out.extend((name, "ends"))
+        structs.add(name)
+
+    def operand_identifier(gen, depth, out):
+        name = constants.pick(rng)
+        out.append(name if name is not None else str(rng.randint(0, 255)))
+
+    def dup_count(gen, depth, out):
+        struct_name = structs.pick(rng)
+        choice = rng.random()
+        if struct_name is not None and choice < 0.2:
+            out.extend(("size", struct_name))
+        elif choice < 0.4:
+            out.extend(("(", str(rng.randint(1, 64)), ")"))
+        else:
+            out.append(str(rng.randint(1, 64)))
+
+    generator.hooks.update({
+        "assignment": assignment,
+        "structure_definition": structure_definition,
+        "dup_count": dup_count,
+        "operand.identifier": operand_identifier,
+        "structure_member.identifier": lambda gen, depth, out: out.append(members.new()),
+        # Kūnas prasideda naujoje eilutėje, kaip tikrame MASM
+        "conditional_block.identifier": lambda gen, depth, out: out.extend((guards.new(), "\n")),
+        "identifier": lambda gen, depth, out: out.append(constants.new()),
+        # Parseris kaip apibrėžimus priima tik šiuos raktinius žodžius (žr. parse_code_element)
+        "keyword": lambda gen, depth, out: out.append(rng.choice(("FALSE", "TRUE", "NULL", "RECT", "WNDCLASS"))),
+        "number": lambda gen, depth, out: out.append(str(rng.randint(0, 65535))),
+        "hex_number": lambda gen, depth, out: out.append(f"0{rng.randint(0, 0xFFFF):X}h"),
+        "comment": lambda gen, depth, out: out.append(f"; komentaras {rng.randint(0, 9999)}"),
+        "empty_line": lambda gen, depth, out: None,
+    })
+    density = generator.constant_density
+    generator.weights.update({
+        "code_element": (1, 1, 1, 2, 12, 1),
+        "value": (1, 0), # "X = dw" konstantų skaičiuoklė neapskaičiuoja
+        "operand": (density * 0.6, density * 0.4, 1 - density, 0.1, 0.15),
+    })
+    generator.repeat_means.update({"structure_members": 4, "value": 1.0})
+    generator.line_rules.update({"code_element", "structure_member"})
+    return generator
+
+
+def configure_c(generator):
+    variables = NamePool("v")
+    rng = generator.rng
+
+    def declaration(gen, depth, out):
+        if rng.random() < 0.1:
+            out.append("const")
+        name = variables.new()
+        out.extend(("int", name, "="))
+        gen.expand_rule("expression", depth, out, "declaration")
+        out.append(";")
+        variables.add(name)
+
+    def existing_variable(gen, depth, out):
+        name = variables.pick(rng)
+        out.append(name if name is not None else str(rng.randint(0, 1000)))
+
+    def printf_call(gen, depth, out):
+        if variables.pick(rng) is None:
+            declaration(gen, depth, out) # nėra ką spausdinti
+            return
+        gen.expand_body("printf_call", depth, out)
+
+    generator.hooks.update({
+        "declaration": declaration,
+        "printf_call": printf_call,
+        "identifier": existing_variable,
+        "header": lambda gen, depth, out: out.append("stdio"),
+        "number": lambda gen, depth, out: out.append(str(rng.randint(0, 1000))),
+    })
+    density = generator.constant_density
+    generator.weights.update({
+        "statement": (9, 1),
+        "factor": (density, 1 - density, 0.15),
+    })
+    generator.repeat_means.update({"program": 0.2, "format_string": 3})
+    generator.lexical.update({"format_string"})
+    generator.line_rules.update({"include", "statement", "return_stmt"})
+    generator.break_after.update({"{"})
+    return generator
+
+
+GRAMMARS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+LANGUAGES = {
+    # kalba: (numatytoji gramatika, pradinė taisyklė, srauto taisyklė, konfigūravimas)
+    "trm": (os.path.join(GRAMMARS_DIRECTORY, "Sample17_BNF.bnf"), "program", "program", configure_trm),
+    "c": (os.path.join(GRAMMARS_DIRECTORY, "lab4", "c_subset.bnf"), "program", "statements", configure_c),
+}
+
+
+def create_generator(language, grammar_file=None, **options):
+    default_grammar, start, stream_rule, configure = LANGUAGES[language]
+    rules = load_grammar(grammar_file or default_grammar)
+    return configure(ProgramGenerator(rules, start, stream_rule, **options))
+
+
+def parse_size(text):
+    units = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30}
+    text = text.strip().lower().rstrip("b")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Atsitiktinių programų generatorius pagal BNF gramatiką.")
+    arg_parser.add_argument("--language", choices=sorted(LANGUAGES), default="trm")
+    arg_parser.add_argument("--grammar", help="BNF failas (numatyta - kalbos gramatika)")
+    arg_parser.add_argument("-o", "--output", help="išvesties failas (numatyta - standartinė išvestis)")
+    arg_parser.add_argument("--seed", type=int, default=17)
+    arg_parser.add_argument("--statements", type=int, default=None,
+                            help="kiek programos elementų (.trm) arba sakinių (C) sugeneruoti")
+    arg_parser.add_argument("--size", type=parse_size, default=None,
+                            help="apytikslis failo dydis, pvz., 10M arba 1G")
+    arg_parser.add_argument("--depth", type=int, default=DEFAULT_MAX_DEPTH, help="didžiausias taisyklių gylis")
+    arg_parser.add_argument("--constant-density", type=float, default=0.5,
+                            help="tikimybė, kad operandas bus skaičius, o ne vardas (0..1)")
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        generator = create_generator(args.language, args.grammar, seed=args.seed, max_depth=args.depth,
+                                     constant_density=args.constant_density)
+        output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    except (OSError, GrammarError) as e:
+        print(f"Klaida: {e}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    written = 0
+    try:
+        for chunk in generator.generate(items=args.statements, max_bytes=args.size):
+            output.write(chunk)
+            written += len(chunk)
+    except GrammarError as e:
+        print(f"Klaida: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Sugeneruota: {generator.items} elementų, {written / 1e6:.1f} MB per {elapsed:.2f} s "
+          f"({written / 1e6 / elapsed if elapsed else 0:.1f} MB/s).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# Nuolatinis simbolių indeksas .trm antraštėms (SQLite).
+# Kiekvienas simbolis (ASSIGNMENT, KEYWORD_DEF, STRUCT_DEF, STRUCT_MEMBER,
+# CONDITIONAL_BLOCK sąlyga) įrašomas su failu, eilute ir rūšimi. Paieška pagal
+# prefiksą - intervalinė užklausa B-medžio indeksu (name >= p AND name < p + '\uffff'),
+# todėl nereikia skenuoti visos lentelės. Atnaujinant perskaitomi tik pasikeitę failai.
+import argparse
+import hashlib
+import os
+import sqlite3
+import sys
+import time
+
+from parser_Sample17 import Parser
+from Sample17_skaneris import scanner
+
+INDEX_VERSION = 1
+INDEXED_KINDS = ("ASSIGNMENT", "KEYWORD_DEF", "STRUCT_DEF", "STRUCT_MEMBER", "CONDITIONAL_BLOCK")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    errors INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    name TEXT NOT NULL,
+    folded TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    line INTEGER,
+    parent TEXT
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name);
+CREATE INDEX IF NOT EXISTS symbols_folded ON symbols(folded);
+CREATE INDEX IF NOT EXISTS symbols_file ON symbols(file_id);
+"""
+
+
+# Surenka (vardas, rūšis, eilutė, tėvas) iš parser_Sample17 AST
+def collect_symbols(ast_root_node):
+    symbols = []
+    stack = [(ast_root_node, None)]
+    while stack:
+        node, parent = stack.pop()
+        kind = node.kind
+        if kind == "KEYWORD_DEF":
+            symbols.append((node.children[0].value, kind, node.line, parent))
+        elif kind in INDEXED_KINDS and node.value is not None:
+            symbols.append((node.value, kind, node.line, parent))
+
+        if kind in ("STRUCT_DEF", "CONDITIONAL_BLOCK"):
+            parent = node.value
+        stack.extend((child, parent) for child in reversed(node.children))
+    return symbols
+
+
+def _prefix_bound(prefix):
+    return prefix + "\uffff"
+
+
+class SymbolIndex:
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, INDEX_VERSION):
+            # Kitos versijos indeksas perkuriamas iš naujo
+            self.connection.executescript("DROP TABLE IF EXISTS symbols; DROP TABLE IF EXISTS files;")
+        self.connection.executescript(SCHEMA)
+        self.connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Atnaujina nurodytus failus. Grąžina (atnaujinta, praleista, pašalinta).
+    # prune=True pašalina indekse esančius failus, kurių nebėra sąraše.
+    def update(self, file_names, prune=False):
+        updated = skipped = removed = 0
+        paths = [os.path.abspath(name) for name in file_names]
+        known = {row[0]: row[1:] for row in
+                 self.connection.execute("SELECT path, id, mtime_ns, size, digest FROM files")}
+
+        with self.connection:
+            for path in paths:
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    if path in known:
+                        self._remove(known[path][0])
+                        removed += 1
+                    continue
+
+                previous = known.get(path)
+                if previous is not None and previous[1] == info.st_mtime_ns and previous[2] == info.st_size:
+                    skipped += 1 # nepasikeitė - net neskaitome
+                    continue
+
+                with open(path, "rb") as f:
+                    data = f.read()
+                digest = hashlib.sha256(data).hexdigest()
+                if previous is not None and previous[3] == digest:
+                    # Pasikeitė tik laikas (pvz., touch) - turinys tas pats
+                    self.connection.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                                            (info.st_mtime_ns, info.st_size, previous[0]))
+                    skipped += 1
+                    continue
+
+                self._index_file(path, data.decode("utf-8", errors="replace"), info, digest, previous)
+                updated += 1
+
+            if prune:
+                wanted = set(paths)
+                for path, (file_id, *_) in known.items():
+                    if path not in wanted:
+                        self._remove(file_id)
+                        removed += 1
+        return updated, skipped, removed
+
+    def _index_file(self, path, code, info, digest, previous):
+        tokens = [token for token in scanner(code) if token[0] != "COMMENT"]
+        parser = Parser(tokens)
+        ast = parser.parse_program() # klaidos atkuriamos viduje, todėl AST gaunamas visada
+
+        if previous is not None:
+            self._remove(previous[0])
+        cursor = self.connection.execute(
+            "INSERT INTO files (path, mtime_ns, size, digest, errors) VALUES (?, ?, ?, ?, ?)",
+            (path, info.st_mtime_ns, info.st_size, digest, len(parser.errors)))
+        file_id = cursor.lastrowid
+        self.connection.executemany(
+            "INSERT INTO symbols (name, folded, kind, file_id, line, parent) VALUES (?, ?, ?, ?, ?, ?)",
+            ((name, name.lower(), kind, file_id, line, parent)
+             for name, kind, line, parent in collect_symbols(ast)))
+
+    def _remove(self, file_id):
+        self.connection.execute("DELETE FROM symbols WHERE file_id = ?", (file_id,))
+        self.connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    # MASM vardai nejautrūs raidžių dydžiui, todėl pagal nutylėjimą ieškoma be jo
+    def lookup(self, name, ignore_case=True):
+        column, key = ("folded", name.lower()) if ignore_case else ("name", name)
+        return self._query(f"{column} = ?", (key,))
+
+    def prefix(self, prefix, ignore_case=True, limit=None):
+        column, key = ("folded", prefix.lower()) if ignore_case else ("name", prefix)
+        return self._query(f"{column} >= ? AND {column} < ?", (key, _prefix_bound(key)), limit)
+
+    def _query(self, condition, parameters, limit=None):
+        sql = ("SELECT symbols.name, symbols.kind, files.path, symbols.line, symbols.parent "
+               "FROM symbols JOIN files ON files.id = symbols.file_id "
+               f"WHERE {condition} ORDER BY symbols.folded, files.path, symbols.line")
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def stats(self):
+        files = self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        symbols = self.connection.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+        return files, symbols
+
+
+def format_symbol(row):
+    name, kind, path, line, parent = row
+    location = f"{os.path.relpath(path)}:{line}" if line is not None else os.path.relpath(path)
+    return f"{location}: {kind} {name}" + (f" (iš {parent})" if parent else "")
+
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Simbolių indeksas .trm failams.")
+    arg_parser.add_argument("database", help="indekso failas (SQLite)")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    update = commands.add_parser("update", help="indeksuoti (tik pasikeitusius) failus")
+    update.add_argument("files", nargs="+")
+    update.add_argument("--prune", action="store_true", help="pašalinti sąraše nesančius failus")
+
+    find = commands.add_parser("find", help="ieškoti simbolio pagal vardą arba prefiksą")
+    find.add_argument("name")
+    find.add_argument("--exact", action="store_true", help="tikslus vardo atitikimas")
+    find.add_argument("--case-sensitive", action="store_true", help="skirti raidžių dydį")
+    find.add_argument("--limit", type=int, default=None)
+    return arg_parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    with SymbolIndex(args.database) as index:
+        if args.command == "update":
+            start = time.perf_counter()
+            updated, skipped, removed = index.update(args.files, prune=args.prune)
+            files, symbols = index.stats()
+            print(f"Atnaujinta: {updated}, nepakito: {skipped}, pašalinta: {removed} "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms). "
+                  f"Indekse {files} failų, {symbols} simbolių.")
+            return 0
+
+        start = time.perf_counter()
+        if args.exact:
+            rows = index.lookup(args.name, ignore_case=not args.case_sensitive)
+        else:
+            rows = index.prefix(args.name, ignore_case=not args.case_sensitive, limit=args.limit)
+        elapsed = time.perf_counter() - start
+        for row in rows:
+            print(format_symbol(row))
+        print(f"Rasta: {len(rows)} ({elapsed * 1000:.3f} ms)", file=sys.stderr)
+        return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())